@@ -0,0 +1,97 @@
+import os
+import threading
+from typing import Dict
+
+import cv2
+import numpy as np
+
+# Adaptive sampling configuration (override via .env)
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "0") == "1"
+ADAPTIVE_MAX_INTERVAL_S = float(os.getenv("ADAPTIVE_MAX_INTERVAL_S", "2.0"))
+PIXEL_DIFF_THRESHOLD = float(os.getenv("PIXEL_DIFF_THRESHOLD", "2.0"))  # Mean abs diff on a 0-255 thumbnail
+
+THUMBNAIL_SIZE = (32, 18)
+GROWTH = 1.5
+STABLE_MOVEMENT = 90.0  # movement_stability at or above this counts as still
+YAW_CHANGE_DEG = 10.0
+
+
+class AdaptiveSampler:
+    """Chooses the next frame to analyze from scene and pose change
+
+    The interval between candidate frames starts at `min_interval_s` and grows
+    while the picture and keypoints stay stable, snapping back as soon as
+    movement or a head turn is seen. Candidates that are near-duplicates of the
+    last analyzed frame (downscaled grayscale difference) are skipped before
+    inference. The decoder thread calls `next_target` / `is_near_duplicate`;
+    the inference thread feeds results back through `observe`.
+    """
+
+    def __init__(self, fps: float, min_interval_s: float, max_interval_s: float = ADAPTIVE_MAX_INTERVAL_S,
+                 pixel_threshold: float = PIXEL_DIFF_THRESHOLD):
+        self.fps = fps
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max(min_interval_s, max_interval_s)
+        self.pixel_threshold = pixel_threshold
+        self.interval_s = min_interval_s
+
+        self.candidates = 0
+        self.skipped = 0
+
+        self._last_thumbnail = None
+        self._last_analyzed = None
+        self._last_yaw = None
+        self._lock = threading.Lock()
+
+    def next_target(self, frame_idx: int) -> int:
+        with self._lock:
+            return frame_idx + max(1, int(round(self.interval_s * self.fps)))
+
+    def _grow(self):
+        self.interval_s = min(self.max_interval_s, self.interval_s * GROWTH)
+
+    def _reset(self):
+        self.interval_s = self.min_interval_s
+
+    def is_near_duplicate(self, frame: np.ndarray, frame_idx: int) -> bool:
+        """True if the frame can be skipped and the last analyzed one carried forward"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+        with self._lock:
+            self.candidates += 1
+            if self._last_thumbnail is not None:
+                diff = float(np.mean(np.abs(thumbnail - self._last_thumbnail)))
+                # Never carry a frame forward for longer than the maximum interval
+                overdue = (frame_idx - self._last_analyzed) / self.fps >= self.max_interval_s
+                if diff < self.pixel_threshold and not overdue:
+                    self.skipped += 1
+                    self._grow()
+                    return True
+                if diff > self.pixel_threshold * 4:
+                    self._reset()
+
+            self._last_thumbnail = thumbnail
+            self._last_analyzed = frame_idx
+            return False
+
+    def observe(self, columns: Dict[str, np.ndarray]):
+        """Adapt the interval from the pose metric columns of an analyzed batch"""
+        yaw = np.asarray(columns["yaw"], dtype=np.float64)
+        if len(yaw) == 0:
+            return
+        # Head turns are compared frame to frame, continuing from the previous batch
+        if self._last_yaw is not None:
+            yaw_steps = np.diff(np.concatenate(([self._last_yaw], yaw)))
+        else:
+            yaw_steps = np.diff(yaw)
+        self._last_yaw = float(yaw[-1])
+
+        moving = bool(np.any(columns["movement_stability"] < STABLE_MOVEMENT) or
+                      np.any(np.abs(yaw_steps) > YAW_CHANGE_DEG))
+
+        with self._lock:
+            if moving:
+                self._reset()
+            else:
+                self._grow()
@@ -0,0 +1,44 @@
+import io
+from typing import Union
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper input rate
+
+AudioSource = Union[str, bytes, np.ndarray]
+
+
+def _decode_with_pyav(source: Union[str, bytes], sample_rate: int) -> np.ndarray:
+    # PyAV ships with faster-whisper and decodes inside this process
+    from faster_whisper.audio import decode_audio as pyav_decode
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return pyav_decode(source, sampling_rate=sample_rate)
+
+
+def _decode_with_ffmpeg_pipe(source: Union[str, bytes], sample_rate: int) -> np.ndarray:
+    import ffmpeg
+
+    stream = ffmpeg.input("pipe:" if isinstance(source, bytes) else source)
+    out, _ = (
+        stream
+        .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=str(sample_rate))
+        .run(input=source if isinstance(source, bytes) else None, capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def decode_audio(source: AudioSource, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode a media file path or in-memory bytes to mono float32 PCM in [-1, 1]
+
+    Decodes in-process with PyAV, falling back to an ffmpeg stdout pipe;
+    nothing is written to disk. Arrays are passed through unchanged.
+    """
+    if isinstance(source, np.ndarray):
+        return source.astype(np.float32, copy=False)
+    try:
+        return _decode_with_pyav(source, sample_rate)
+    except Exception as e:
+        print(f"In-process audio decode failed ({e}), trying ffmpeg pipe")
+        return _decode_with_ffmpeg_pipe(source, sample_rate)
@@ -0,0 +1,107 @@
+import os
+from typing import Dict, Optional
+
+# Runtime configuration (override via .env)
+#   SCORER_DEVICE       auto | cuda | cpu
+#   SCORER_CPU_THREADS  intra-op threads for CPU inference (default: all cores)
+#   YOLO_CPU_FORMAT     onnx | openvino | torch - runtime used for pose on CPU
+#   WHISPER_MODEL       faster-whisper model size
+POSE_WEIGHTS = "models/yolov8n-pose.pt"
+POSE_IMGSZ = 416
+
+
+def cpu_threads() -> int:
+    value = os.getenv("SCORER_CPU_THREADS")
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def select_device(preferred: Optional[str] = None) -> Dict:
+    """Resolve the inference device, falling back to CPU when CUDA is unusable"""
+    preferred = (preferred or os.getenv("SCORER_DEVICE", "auto")).lower()
+    cpu = {"type": "cpu", "index": 0, "name": "cpu", "torch_device": "cpu"}
+
+    if preferred == "cpu":
+        return cpu
+
+    try:
+        import torch
+        cuda_ok = torch.cuda.is_available()
+    except Exception as e:
+        print(f"Torch CUDA probe failed ({e}), using CPU")
+        return cpu
+
+    if not cuda_ok:
+        if preferred == "cuda":
+            debug_info = f"Torch version: {torch.__version__}, CUDA built: {torch.version.cuda}, Devices: {torch.cuda.device_count()}"
+            print(f"CUDA requested but not available, falling back to CPU. Debug info: {debug_info}")
+        return cpu
+
+    # Find NVIDIA GPU (skip Intel GPU at index 0)
+    nvidia_device = 0
+    if torch.cuda.device_count() > 1:
+        for i in range(torch.cuda.device_count()):
+            gpu_name = torch.cuda.get_device_name(i).lower()
+            if 'nvidia' in gpu_name or 'geforce' in gpu_name or 'rtx' in gpu_name or 'gtx' in gpu_name:
+                nvidia_device = i
+                break
+
+    return {
+        "type": "cuda",
+        "index": nvidia_device,
+        "name": torch.cuda.get_device_name(nvidia_device),
+        "torch_device": f"cuda:{nvidia_device}",
+    }
+
+
+def _export_pose_model(fmt: str) -> Optional[str]:
+    """Export the pose weights once for CPU runtimes and return the exported path"""
+    from ultralytics import YOLO
+
+    base, _ = os.path.splitext(POSE_WEIGHTS)
+    exported = f"{base}.onnx" if fmt == "onnx" else f"{base}_openvino_model"
+    if os.path.exists(exported):
+        return exported
+
+    print(f"Exporting {POSE_WEIGHTS} to {fmt} for CPU inference...")
+    try:
+        # Dynamic axes so batched inference keeps working after export
+        return YOLO(POSE_WEIGHTS).export(format=fmt, imgsz=POSE_IMGSZ, dynamic=True)
+    except Exception as e:
+        print(f"Pose export to {fmt} failed ({e}), using PyTorch on CPU")
+        return None
+
+
+def load_pose_model(device: Dict):
+    from ultralytics import YOLO
+
+    if device["type"] == "cuda":
+        model = YOLO(POSE_WEIGHTS)
+        model.to(device["torch_device"])
+        return model
+
+    import torch
+    torch.set_num_threads(cpu_threads())
+
+    fmt = os.getenv("YOLO_CPU_FORMAT", "onnx").lower()
+    if fmt in ("onnx", "openvino"):
+        exported = _export_pose_model(fmt)
+        if exported:
+            return YOLO(exported, task="pose")
+    return YOLO(POSE_WEIGHTS)
+
+
+def load_whisper_model(device: Dict, model_size: Optional[str] = None):
+    from faster_whisper import WhisperModel
+
+    from .transcription import TRANSCRIBE_WORKERS
+
+    model_size = model_size or os.getenv("WHISPER_MODEL", "large-v3")
+    # One CTranslate2 replica per worker so speech chunks transcribe concurrently
+    workers = max(1, TRANSCRIBE_WORKERS)
+    if device["type"] == "cuda":
+        return WhisperModel(model_size, device="cuda", device_index=device["index"], compute_type="int8",
+                            num_workers=workers)
+    return WhisperModel(model_size, device="cpu", compute_type="int8",
+                        cpu_threads=max(1, cpu_threads() // workers), num_workers=workers)
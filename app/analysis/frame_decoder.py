@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .adaptive_sampler import AdaptiveSampler
+from .device import POSE_IMGSZ
+
+# Sampling configuration (override via .env)
+ANALYSIS_FPS = float(os.getenv("ANALYSIS_FPS", "3"))  # Frames analyzed per second of video
+DECODE_QUEUE_BATCHES = int(os.getenv("DECODE_QUEUE_BATCHES", "4"))
+SEEK_THRESHOLD_S = 2.0  # Seek instead of grabbing when the next sample is further away than this
+FALLBACK_FPS = 30.0  # Used when the container reports no usable frame rate
+
+Batch = Tuple[List[np.ndarray], List[int], List[float]]
+
+_DONE = object()
+
+
+class FrameDecoder:
+    """Decodes time-sampled frames on a producer thread into a bounded queue of batches
+
+    Frames that will not be analyzed are skipped with grab() (no colour
+    conversion) or, for long gaps, a seek. Iterating yields
+    (frames, frame_indices, timestamps) batches resized for the pose model,
+    so decoding of the next batch overlaps inference on the current one.
+    The sample schedule is defined on the whole video, so decoding a range
+    [start_frame, end_frame) picks exactly the frames a full pass would.
+    With `adaptive=True` an AdaptiveSampler (exposed as `sampler`) picks the
+    frames instead, starting at `analysis_fps` density.
+    """
+
+    def __init__(self, video_path: str, analysis_fps: float = ANALYSIS_FPS, batch_size: int = 16,
+                 imgsz: int = POSE_IMGSZ, start_frame: int = 0, end_frame: Optional[int] = None,
+                 queue_batches: int = DECODE_QUEUE_BATCHES, adaptive: bool = False):
+        self.video_path = video_path
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        # Browser recordings (webm) often report 0 or 1000 fps
+        self.fps = fps if 0 < fps <= 240 else FALLBACK_FPS
+        self.step = max(1.0, self.fps / analysis_fps)
+        self.sampler = AdaptiveSampler(self.fps, self.step / self.fps) if adaptive else None
+
+        self.frames_grabbed = 0
+        self.frames_sampled = 0
+        self.decode_s = 0.0  # Producer time spent decoding and resizing (excludes waiting on a full queue)
+        self.wait_s = 0.0  # Consumer time spent waiting for the next batch
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_batches))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _target(self, k: int) -> int:
+        return int(round(k * self.step))
+
+    def __iter__(self) -> Iterator[Batch]:
+        self._thread = threading.Thread(target=self._produce, name="frame-decoder", daemon=True)
+        self._thread.start()
+        while True:
+            started = time.perf_counter()
+            item = self._queue.get()
+            self.wait_s += time.perf_counter() - started
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def _put(self, item) -> bool:
+        # Block while the consumer is behind, but give up promptly once closed
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            k = max(0, int(self.start_frame / self.step) - 1)
+            while self._target(k) < self.start_frame:
+                k += 1
+
+            pos = 0
+            if self.start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+                pos = self.start_frame
+
+            seek_gap = int(SEEK_THRESHOLD_S * self.fps)
+            frames, indices, timestamps = [], [], []
+
+            target = self._target(k)
+            started = time.perf_counter()
+            while not self._stop.is_set():
+                if self.end_frame is not None and target >= self.end_frame:
+                    break
+
+                if target - pos > seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    pos = target
+
+                # Skip unused frames without converting them
+                ended = False
+                while pos < target:
+                    if not cap.grab():
+                        ended = True
+                        break
+                    pos += 1
+                    self.frames_grabbed += 1
+                if ended or not cap.grab():
+                    break
+                pos += 1
+                self.frames_grabbed += 1
+
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+
+                current = target
+                if self.sampler is not None:
+                    # Near-duplicates are carried forward instead of analyzed
+                    duplicate = self.sampler.is_near_duplicate(frame, current)
+                    target = self.sampler.next_target(current)
+                    if duplicate:
+                        continue
+                else:
+                    k += 1
+                    target = self._target(k)
+
+                # Pre-process frame for YOLO (resize)
+                # Note: YOLOv8 handles resizing internally but pre-resizing
+                # saves PCIe bandwidth if frames are 4K
+                frames.append(cv2.resize(frame, (self.imgsz, self.imgsz)))
+                indices.append(current)
+                timestamps.append(current / self.fps)
+                self.frames_sampled += 1
+
+                if len(frames) >= self.batch_size:
+                    self.decode_s += time.perf_counter() - started
+                    if not self._put((frames, indices, timestamps)):
+                        return
+                    started = time.perf_counter()
+                    frames, indices, timestamps = [], [], []
+
+            self.decode_s += time.perf_counter() - started
+            if frames:
+                self._put((frames, indices, timestamps))
+        except BaseException as e:
+            self._put(e)
+        finally:
+            cap.release()
+            self._put(_DONE)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,211 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# COCO keypoint indices used by the scoring heuristics
+NOSE = 0
+LEFT_EYE = 1
+RIGHT_EYE = 2
+LEFT_SHOULDER = 5
+RIGHT_SHOULDER = 6
+LEFT_HIP = 11
+RIGHT_HIP = 12
+
+NUM_KEYPOINTS = 17
+VISIBLE = 0.5  # Keypoint confidence threshold
+
+# Gaze-derived metrics that cheap analysis profiles skip
+FULL_METRICS_ONLY = ("attention", "engagement", "eye_contact_quality")
+
+
+def extract_batch(results_list) -> Dict[str, np.ndarray]:
+    """Move a whole YOLO batch to host memory in one transfer per tensor type
+
+    Returns keypoints as an (N, 17, 3) array holding the first detected person
+    of every frame (zeros when nobody was found) plus per-frame presence,
+    person count and best person box confidence. Results may hold torch
+    tensors (YOLO) or NumPy arrays (benchmark stubs).
+    """
+    n = len(results_list)
+    keypoints = np.zeros((n, NUM_KEYPOINTS, 3), dtype=np.float64)
+    present = np.zeros(n, dtype=bool)
+    person_count = np.zeros(n, dtype=np.int64)
+    confidence = np.zeros(n, dtype=np.float64)
+
+    kp_frames, kp_tensors = [], []
+    box_frames, box_tensors = [], []
+    for i, result in enumerate(results_list):
+        if result.keypoints is not None and len(result.keypoints.data) > 0:
+            kp_frames.append(i)
+            kp_tensors.append(result.keypoints.data[0])
+        if result.boxes is not None and len(result.boxes.data) > 0:
+            box_frames.extend([i] * len(result.boxes.data))
+            box_tensors.append(result.boxes.data)
+
+    if kp_tensors:
+        keypoints[kp_frames] = _to_host(kp_tensors, stack=True)
+        present[kp_frames] = True
+
+    if box_tensors:
+        boxes = _to_host(box_tensors, stack=False).astype(np.float64)
+        frame_ids = np.asarray(box_frames)
+        is_person = boxes[:, 5] == 0
+        np.add.at(person_count, frame_ids[is_person], 1)
+        np.maximum.at(confidence, frame_ids[is_person], boxes[is_person, 4])
+        confidence = np.minimum(100.0, confidence * 100)
+
+    return {
+        "keypoints": keypoints,
+        "present": present,
+        "person_count": person_count,
+        "confidence": confidence,
+    }
+
+
+def _to_host(tensors: List, stack: bool) -> np.ndarray:
+    """Stack (or concatenate) per-frame tensors and copy them to host memory at once"""
+    if isinstance(tensors[0], np.ndarray):
+        return np.stack(tensors) if stack else np.concatenate(tensors)
+    import torch
+    return (torch.stack(tensors) if stack else torch.cat(tensors)).cpu().numpy()
+
+
+def _visible(keypoints: np.ndarray, index: int) -> np.ndarray:
+    return keypoints[:, index, 2] >= VISIBLE
+
+
+def head_orientation(keypoints: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Yaw, pitch and roll in degrees (rounded to 0.01), zero when the face is not visible"""
+    nose = keypoints[:, NOSE]
+    left_eye = keypoints[:, LEFT_EYE]
+    right_eye = keypoints[:, RIGHT_EYE]
+
+    valid = present & _visible(keypoints, NOSE) & _visible(keypoints, LEFT_EYE) & _visible(keypoints, RIGHT_EYE)
+
+    eye_center_x = (left_eye[:, 0] + right_eye[:, 0]) / 2
+    eye_center_y = (left_eye[:, 1] + right_eye[:, 1]) / 2
+
+    # Simplified orientation calculation
+    yaw = np.degrees(np.arctan2(nose[:, 0] - eye_center_x, 100))  # Left-right
+    pitch = np.degrees(np.arctan2(nose[:, 1] - eye_center_y, 100))  # Up-down
+    roll = np.degrees(np.arctan2(right_eye[:, 1] - left_eye[:, 1], right_eye[:, 0] - left_eye[:, 0]))
+
+    zero = np.zeros(len(keypoints))
+    return (
+        np.where(valid, np.round(yaw, 2), zero),
+        np.where(valid, np.round(pitch, 2), zero),
+        np.where(valid, np.round(roll, 2), zero),
+    )
+
+
+def attention(yaw: np.ndarray, pitch: np.ndarray, present: np.ndarray) -> np.ndarray:
+    # Looking at the camera (yaw ~ 0, pitch ~ 0) means high attention;
+    # 0 deviation = 100 score, 45+ deviation = 0 score
+    deviation = np.sqrt(yaw ** 2 + pitch ** 2)
+    score = np.maximum(0.0, 100 - deviation * 2.2)
+    return np.where(present, score, 0.0)
+
+
+def posture(keypoints: np.ndarray, present: np.ndarray) -> np.ndarray:
+    left_shoulder = keypoints[:, LEFT_SHOULDER]
+    right_shoulder = keypoints[:, RIGHT_SHOULDER]
+    left_hip = keypoints[:, LEFT_HIP]
+    right_hip = keypoints[:, RIGHT_HIP]
+
+    shoulders_ok = present & _visible(keypoints, LEFT_SHOULDER) & _visible(keypoints, RIGHT_SHOULDER)
+    hips_ok = (left_hip[:, 2] > VISIBLE) & (right_hip[:, 2] > VISIBLE)
+
+    shoulder_diff = np.abs(left_shoulder[:, 1] - right_shoulder[:, 1]) / 100
+    shoulder_score = np.maximum(0.0, 1 - shoulder_diff)
+
+    # Spine straightness: angle of the shoulder-center to hip-center line from vertical
+    shoulder_center_x = (left_shoulder[:, 0] + right_shoulder[:, 0]) / 2
+    shoulder_center_y = (left_shoulder[:, 1] + right_shoulder[:, 1]) / 2
+    hip_center_x = (left_hip[:, 0] + right_hip[:, 0]) / 2
+    hip_center_y = (left_hip[:, 1] + right_hip[:, 1]) / 2
+    angle = np.degrees(np.arctan2(np.abs(shoulder_center_x - hip_center_x),
+                                  np.abs(shoulder_center_y - hip_center_y)))
+    spine_alignment = np.maximum(0.0, 1 - angle / 30)  # 30 degrees max deviation
+
+    score = np.where(hips_ok, shoulder_score * 0.6 + spine_alignment * 0.4, shoulder_score)
+    return np.where(shoulders_ok, np.minimum(100.0, score * 100), 0.0)
+
+
+def engagement(keypoints: np.ndarray, present: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    # Body presence (torso)
+    torso = keypoints[:, [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP], 2] > VISIBLE
+    body_presence = torso.sum(axis=1) / 4
+
+    # Facing factor: with both shoulders visible, use head yaw to judge facing the camera
+    abs_yaw = np.abs(yaw)
+    facing = np.select([abs_yaw < 20, abs_yaw < 45], [1.0, 0.7], 0.3)
+    facing = np.where(torso[:, 0] & torso[:, 1], facing, 0.5)
+
+    score = body_presence * 0.5 + facing * 0.5
+    return np.where(present, np.minimum(100.0, score * 100), 0.0)
+
+
+def eye_contact(yaw: np.ndarray, pitch: np.ndarray, present: np.ndarray) -> np.ndarray:
+    # Facing the camera directly is the proxy for eye contact:
+    # yaw and pitch must both be under 15 degrees, else a low baseline
+    abs_yaw = np.abs(yaw)
+    abs_pitch = np.abs(pitch)
+    looking = (abs_yaw < 15) & (abs_pitch < 15)
+    score = np.where(looking, np.maximum(0.0, 100 - (abs_yaw + abs_pitch) * 2), 20.0)
+    return np.where(present, score, 0.0)
+
+
+def movement_stability(keypoints: np.ndarray, present: np.ndarray,
+                       last_position: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Nose displacement between consecutive frames with a person, as a 0-100 stability score
+
+    Frames without a person, and the very first sighting, score a neutral 50.
+    `last_position` carries the nose position across batches; the updated
+    value is returned alongside the scores.
+    """
+    scores = np.full(len(keypoints), 50.0)
+    idx = np.flatnonzero(present)
+    if idx.size == 0:
+        return scores, last_position
+
+    positions = keypoints[idx, NOSE, :2]
+    if last_position is None:
+        targets = idx[1:]
+        previous = positions[:-1]
+        current = positions[1:]
+    else:
+        targets = idx
+        previous = np.vstack([last_position[None, :], positions[:-1]])
+        current = positions
+
+    movement = np.linalg.norm(current - previous, axis=1)
+    scores[targets] = np.clip(100 - movement * 2, 0.0, 100.0)
+    return scores, positions[-1].copy()
+
+
+def compute_frame_metrics(batch: Dict[str, np.ndarray], last_position: Optional[np.ndarray] = None,
+                          full: bool = True) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    """All per-frame metrics for a batch as column arrays
+
+    With `full=False` the attention, engagement and eye-contact columns are
+    left out (see FULL_METRICS_ONLY).
+    """
+    keypoints = batch["keypoints"]
+    present = batch["present"]
+
+    yaw, pitch, roll = head_orientation(keypoints, present)
+    movement, last_position = movement_stability(keypoints, present, last_position)
+
+    columns = {
+        "confidence": batch["confidence"],
+        "posture": posture(keypoints, present),
+        "movement_stability": movement,
+        "yaw": yaw,
+        "pitch": pitch,
+        "roll": roll,
+        "person_count": batch["person_count"],
+    }
+    if full:
+        columns["attention"] = attention(yaw, pitch, present)
+        columns["engagement"] = engagement(keypoints, present, yaw)
+        columns["eye_contact_quality"] = eye_contact(yaw, pitch, present)
+    return columns, last_position
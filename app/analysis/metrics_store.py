@@ -0,0 +1,170 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .keypoint_metrics import FULL_METRICS_ONLY
+
+# Column layout: one scalar per analyzed frame, ~90 bytes per frame in total
+COLUMNS = {
+    "timestamp": np.float64,
+    "attention": np.float64,
+    "confidence": np.float64,
+    "posture": np.float64,
+    "engagement": np.float64,
+    "movement_stability": np.float64,
+    "eye_contact_quality": np.float64,
+    "pitch": np.float32,
+    "yaw": np.float32,
+    "roll": np.float32,
+    "person_count": np.int16,
+}
+
+# Scores summarized in the report and timeline
+SCORE_METRICS = ("attention", "confidence", "posture", "engagement", "movement_stability", "eye_contact_quality")
+
+INITIAL_CAPACITY = 1024
+PERCENTILES = (10, 50, 90)
+
+
+class RunningStats:
+    """Count, mean, variance and range of a stream, merged one batch at a time (Chan et al.)"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class MetricsStore:
+    """Per-frame metrics in growable NumPy columns with running aggregates
+
+    Columns are preallocated and doubled when full, so storage costs a few
+    bytes per frame instead of a dict per frame. Running mean, variance,
+    range and presence counts are updated as batches are appended;
+    percentiles and the per-second timeline are computed from the columns on
+    demand. Metrics left out by the analysis profile are not stored.
+    """
+
+    def __init__(self, full_metrics: bool = True, capacity: int = INITIAL_CAPACITY):
+        self.names = [name for name in COLUMNS if full_metrics or name not in FULL_METRICS_ONLY]
+        self._data = {name: np.empty(capacity, dtype=COLUMNS[name]) for name in self.names}
+        self._size = 0
+
+        self.stats = {name: RunningStats() for name in SCORE_METRICS if name in self.names}
+        self.presence = {"none": 0, "single": 0, "multiple": 0}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def has(self, name: str) -> bool:
+        return name in self._data
+
+    def column(self, name: str) -> np.ndarray:
+        """View of a column's filled part (do not keep it across appends)"""
+        return self._data[name][:self._size]
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._data.values())
+
+    def _reserve(self, extra: int):
+        capacity = len(self._data["timestamp"])
+        if self._size + extra <= capacity:
+            return
+        while capacity < self._size + extra:
+            capacity *= 2
+        for name, column in self._data.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def append(self, columns: Dict[str, np.ndarray], timestamps: List[float]):
+        """Append one batch of metric columns (see keypoint_metrics.compute_frame_metrics)"""
+        n = len(timestamps)
+        self._reserve(n)
+        end = self._size + n
+        self._data["timestamp"][self._size:end] = timestamps
+        for name in self.names:
+            if name != "timestamp":
+                self._data[name][self._size:end] = columns[name]
+        self._size = end
+
+        for name, stats in self.stats.items():
+            stats.update(np.asarray(columns[name], dtype=np.float64))
+        person_count = np.asarray(columns["person_count"])
+        self.presence["none"] += int(np.count_nonzero(person_count == 0))
+        self.presence["single"] += int(np.count_nonzero(person_count == 1))
+        self.presence["multiple"] += int(np.count_nonzero(person_count > 1))
+
+    def since(self, timestamp: float) -> int:
+        """Index of the first frame at or after `timestamp`"""
+        return int(np.searchsorted(self.column("timestamp"), timestamp, side="left"))
+
+    def statistics(self) -> Dict:
+        """Running aggregates plus percentiles for every stored score"""
+        summary = {}
+        for name, stats in self.stats.items():
+            if not stats.count:
+                continue
+            percentiles = np.percentile(self.column(name), PERCENTILES)
+            summary[name] = {
+                "mean": round(stats.mean, 2),
+                "std": round(stats.std, 2),
+                "min": round(stats.min, 2),
+                "max": round(stats.max, 2),
+                **{f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+            }
+        return {"frames": self._size, "presence": dict(self.presence), "metrics": summary}
+
+    def timeline(self, resolution_s: float = 1.0) -> List[Dict]:
+        """Scores averaged into `resolution_s` buckets; buckets without frames are left out"""
+        if not self._size:
+            return []
+        bins = np.floor(self.column("timestamp") / resolution_s).astype(np.int64)
+        bins -= bins[0]
+        counts = np.bincount(bins)
+        filled = np.nonzero(counts)[0]
+
+        series = {}
+        for name in SCORE_METRICS:
+            if self.has(name):
+                sums = np.bincount(bins, weights=self.column(name), minlength=len(counts))
+                series[name] = np.round(sums[filled] / counts[filled], 1).tolist()
+        present = np.bincount(bins, weights=self.column("person_count") > 0, minlength=len(counts))
+        series["presence"] = np.round(present[filled] / counts[filled], 2).tolist()
+
+        start = math.floor(self.column("timestamp")[0] / resolution_s)
+        times = ((filled + start) * resolution_s).tolist()
+        return [
+            {"t": round(t, 2), **{name: values[i] for name, values in series.items()}}
+            for i, t in enumerate(times)
+        ]
+
+    def window_means(self, start: int) -> Dict[str, Optional[float]]:
+        """Mean of every score from frame index `start` on (None for metrics not stored)"""
+        means = {}
+        for name in SCORE_METRICS:
+            means[name] = round(float(self.column(name)[start:].mean()), 1) if self.has(name) else None
+        return means
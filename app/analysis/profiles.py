@@ -0,0 +1,127 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from .device import POSE_IMGSZ
+from .frame_decoder import ANALYSIS_FPS
+
+# Profile configuration (override via .env)
+#   ANALYSIS_PROFILE   profile used when a request names none
+#   ANALYSIS_PROFILES  profiles accepted per request; their models are preloaded in every analysis worker
+DEFAULT_PROFILE = os.getenv("ANALYSIS_PROFILE", "balanced")
+ENABLED_PROFILES = [
+    name.strip() for name in os.getenv("ANALYSIS_PROFILES", "fast,balanced,accurate").split(",") if name.strip()
+]
+
+# Ordered from cheapest to most thorough. `cost_per_s` is the initial estimate of
+# analysis seconds per second of media used by deadline mode until real runs are seen.
+PROFILES: Dict[str, Dict] = {
+    "fast": {
+        "whisper_model": "base",
+        "beam_size": 1,
+        "imgsz": 320,
+        "analysis_fps": 1.0,
+        "full_metrics": False,
+        "cost_per_s": 0.05,
+    },
+    "balanced": {
+        "whisper_model": os.getenv("WHISPER_MODEL", "large-v3"),
+        "beam_size": 5,
+        "imgsz": POSE_IMGSZ,
+        "analysis_fps": ANALYSIS_FPS,
+        "full_metrics": True,
+        "cost_per_s": 0.3,
+    },
+    "accurate": {
+        "whisper_model": "large-v3",
+        "beam_size": 5,
+        "imgsz": 640,
+        "analysis_fps": 5.0,
+        "full_metrics": True,
+        "cost_per_s": 0.6,
+    },
+}
+
+DEADLINE_OVERHEAD_S = 2.0  # Fixed per-analysis cost (decoder start-up, VAD, scoring)
+COST_SMOOTHING = 0.3  # Weight of the newest run in the learned cost estimate
+
+
+class UnknownProfile(ValueError):
+    pass
+
+
+def available_profiles() -> List[str]:
+    return [name for name in PROFILES if name in ENABLED_PROFILES]
+
+
+def get_profile(name: Optional[str] = None) -> Dict:
+    """Settings of a named profile (the default one when `name` is None)"""
+    name = name or DEFAULT_PROFILE
+    if name not in available_profiles():
+        raise UnknownProfile(f"Unknown analysis profile '{name}'; choose one of {', '.join(available_profiles())}")
+    return {"name": name, **PROFILES[name]}
+
+
+def media_duration(path: str) -> Optional[float]:
+    """Duration of a recording in seconds from its container header, or None if unknown"""
+    try:
+        import av
+        with av.open(path) as container:
+            if container.duration:
+                return container.duration / 1_000_000
+    except Exception:
+        pass
+    try:
+        import cv2
+        cap = cv2.VideoCapture(path)
+        fps, frames = cap.get(cv2.CAP_PROP_FPS), cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        cap.release()
+        if 0 < fps <= 240 and frames > 0:
+            return frames / fps
+    except Exception:
+        pass
+    return None
+
+
+class LatencyModel:
+    """Per-profile analysis cost, seeded from PROFILES and refined from finished runs"""
+
+    def __init__(self):
+        self._cost = {name: settings["cost_per_s"] for name, settings in PROFILES.items()}
+        self._lock = threading.Lock()
+
+    def estimate(self, profile: str, duration_s: float) -> float:
+        with self._lock:
+            return DEADLINE_OVERHEAD_S + self._cost[profile] * duration_s
+
+    def observe(self, profile: str, duration_s: Optional[float], elapsed_s: float):
+        if not duration_s or profile not in self._cost:
+            return
+        observed = max(0.0, elapsed_s - DEADLINE_OVERHEAD_S) / duration_s
+        with self._lock:
+            self._cost[profile] += COST_SMOOTHING * (observed - self._cost[profile])
+
+    def choose(self, duration_s: Optional[float], deadline_s: float) -> str:
+        """Most thorough enabled profile expected to finish within `deadline_s`
+
+        Falls back to the cheapest profile when none fits, and to the default
+        profile when the duration is unknown.
+        """
+        candidates = available_profiles()
+        if duration_s is None:
+            return DEFAULT_PROFILE
+        fitting = [name for name in candidates if self.estimate(name, duration_s) <= deadline_s]
+        return fitting[-1] if fitting else candidates[0]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(cost, 3) for name, cost in self._cost.items()}
+
+
+def preload():
+    """Load the models of every enabled profile so switching profiles costs nothing"""
+    from .. import model_registry
+
+    model_registry.pose_model()
+    for size in sorted({PROFILES[name]["whisper_model"] for name in available_profiles()}):
+        model_registry.whisper_model(size)
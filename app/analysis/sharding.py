@@ -0,0 +1,126 @@
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import keypoint_metrics
+from .device import POSE_IMGSZ
+from .frame_decoder import ANALYSIS_FPS, FrameDecoder
+
+# Parallel analysis configuration (override via .env)
+ANALYSIS_SHARDS = int(os.getenv("ANALYSIS_SHARDS", "1"))  # 1 = serial
+MIN_BATCHES_PER_SHARD = 2
+
+# (pose batch, frame indices, timestamps, inference seconds)
+ShardBatch = Tuple[Dict[str, np.ndarray], List[int], List[float], float]
+
+
+def infer_pose_batch(model, device: str, frames: List[np.ndarray], imgsz: int) -> Dict[str, np.ndarray]:
+    """Run YOLO pose on one batch and bring the keypoints to host memory
+
+    Keypoints come back in pixels of the `imgsz` frames; they are rescaled to
+    POSE_IMGSZ, the frame size the metric thresholds are tuned for, so every
+    profile scores the same video alike.
+    """
+    results_list = model(frames, verbose=False, imgsz=imgsz, device=device)
+    batch = keypoint_metrics.extract_batch(results_list)
+    if imgsz != POSE_IMGSZ:
+        batch["keypoints"][..., :2] *= POSE_IMGSZ / imgsz
+    return batch
+
+
+def plan_shards(video_path: str, shards: int, batch_size: int,
+                analysis_fps: float = ANALYSIS_FPS) -> List[Tuple[int, Optional[int]]]:
+    """Split a video into frame ranges whose boundaries fall on whole sample batches
+
+    Aligning to batches means every shard runs exactly the batches a serial pass
+    would, which keeps the merged result identical to the serial one. Returns a
+    single full range when the video is too short to be worth splitting.
+    """
+    decoder = FrameDecoder(video_path, analysis_fps=analysis_fps, batch_size=batch_size)
+    if shards <= 1 or decoder.frame_count <= 0:
+        return [(0, None)]
+
+    total_samples = math.ceil(decoder.frame_count / decoder.step)
+    total_batches = math.ceil(total_samples / batch_size)
+    shards = min(shards, total_batches // MIN_BATCHES_PER_SHARD)
+    if shards <= 1:
+        return [(0, None)]
+
+    batches_per_shard = math.ceil(total_batches / shards)
+    starts = [decoder._target(i * batches_per_shard * batch_size) for i in range(shards)]
+    starts = [start for start in starts if start < decoder.frame_count]
+    ends = starts[1:] + [None]
+    return list(zip(starts, ends))
+
+
+def _infer_shard(video_path: str, start_frame: int, end_frame: Optional[int], batch_size: int,
+                 analysis_fps: float, imgsz: int) -> Dict:
+    """Runs in a shard worker process; the registry loads the pose model once per worker
+
+    Returns the shard's batches plus its decode counters for the timing breakdown.
+    """
+    from .. import model_registry
+
+    model = model_registry.pose_model()
+    device = model_registry.device()["torch_device"]
+
+    out = []
+    decoder = FrameDecoder(video_path, analysis_fps=analysis_fps, batch_size=batch_size, imgsz=imgsz,
+                           start_frame=start_frame, end_frame=end_frame)
+    try:
+        for frames, indices, timestamps in decoder:
+            started = time.perf_counter()
+            batch = infer_pose_batch(model, device, frames, imgsz)
+            out.append((batch, indices, timestamps, time.perf_counter() - started))
+    finally:
+        decoder.close()
+    return {
+        "batches": out,
+        "frames_decoded": decoder.frames_grabbed,
+        "frames_sampled": decoder.frames_sampled,
+        "decode_s": decoder.decode_s,
+    }
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+# (function, args) run once in every shard worker before it loads any model
+_worker_init: Optional[Tuple[Callable, tuple]] = None
+
+
+def set_worker_initializer(initializer: Optional[Callable], initargs: tuple = ()):
+    """Run `initializer(*initargs)` in every shard worker, e.g. to register stub models there too
+
+    Workers are spawned, so models registered in this process are not seen by
+    them. A running pool is replaced so the change takes effect at once.
+    """
+    global _pool, _worker_init
+    _worker_init = (initializer, initargs) if initializer is not None else None
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def shard_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for shard inference, kept alive between analyses"""
+    global _pool, _pool_size
+    if _pool is None or _pool_size != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        initializer, initargs = _worker_init or (None, ())
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=initializer, initargs=initargs)
+        _pool_size = workers
+    return _pool
+
+
+def submit_shards(video_path: str, ranges: List[Tuple[int, Optional[int]]], batch_size: int,
+                  analysis_fps: float = ANALYSIS_FPS, imgsz: int = POSE_IMGSZ):
+    pool = shard_pool(len(ranges))
+    return [pool.submit(_infer_shard, video_path, start, end, batch_size, analysis_fps, imgsz)
+            for start, end in ranges]
@@ -0,0 +1,106 @@
+import concurrent.futures
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio import SAMPLE_RATE
+
+# Transcription configuration (override via .env)
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))  # Concurrent Whisper chunks
+TRANSCRIBE_CHUNK_S = float(os.getenv("TRANSCRIBE_CHUNK_S", "30"))  # Longest chunk sent to Whisper
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "500"))
+VAD_SPEECH_PAD_MS = 200
+
+Span = Tuple[int, int]  # [start, end) in samples
+
+
+def speech_spans(audio: np.ndarray) -> List[Span]:
+    """Speech regions found by the Silero VAD bundled with faster-whisper"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(min_silence_duration_ms=VAD_MIN_SILENCE_MS, speech_pad_ms=VAD_SPEECH_PAD_MS)
+    return [(ts["start"], ts["end"]) for ts in get_speech_timestamps(audio, options)]
+
+
+def speaking_stats(spans: List[Span], total_samples: int) -> Dict:
+    total_s = total_samples / SAMPLE_RATE
+    durations = [(end - start) / SAMPLE_RATE for start, end in spans]
+    speech_s = sum(durations)
+
+    # Pauses between speech regions, plus leading and trailing silence
+    edges = [0] + [x for span in spans for x in span] + [total_samples]
+    pauses = [(edges[i + 1] - edges[i]) / SAMPLE_RATE for i in range(0, len(edges), 2)]
+
+    return {
+        "duration_s": round(total_s, 2),
+        "speech_s": round(speech_s, 2),
+        "silence_s": round(max(0.0, total_s - speech_s), 2),
+        "speech_ratio": round(speech_s / total_s, 3) if total_s > 0 else 0.0,
+        "speech_segments": len(spans),
+        "avg_segment_s": round(speech_s / len(spans), 2) if spans else 0.0,
+        "longest_pause_s": round(max(pauses), 2) if pauses else 0.0,
+    }
+
+
+def build_chunks(spans: List[Span], max_samples: int) -> List[Span]:
+    """Pack consecutive speech spans into chunks of at most `max_samples`
+
+    Short silences between packed spans stay in the chunk for natural
+    context; long single spans are cut at the limit.
+    """
+    chunks: List[Span] = []
+    for start, end in spans:
+        while end - start > max_samples:
+            chunks.append((start, start + max_samples))
+            start += max_samples
+        if chunks and end - chunks[-1][0] <= max_samples and start - chunks[-1][1] < max_samples // 4:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+def transcribe_chunks(model, audio: np.ndarray, chunks: List[Span], beam_size: int = 5,
+                      workers: int = TRANSCRIBE_WORKERS,
+                      progress_callback: Optional[Callable[[float], None]] = None) -> Tuple[List[Dict], str]:
+    """Transcribe chunks concurrently and stitch segments back onto the recording timeline
+
+    The language is detected on the first chunk and reused for the rest so
+    every chunk decodes consistently. Returns (segments, language).
+    """
+    def run(chunk: Span, language: Optional[str]):
+        start, end = chunk
+        segments, info = model.transcribe(audio[start:end], beam_size=beam_size, language=language)
+        offset = start / SAMPLE_RATE
+        return [
+            {"start": round(seg.start + offset, 2), "end": round(seg.end + offset, 2), "text": seg.text.strip()}
+            for seg in segments
+        ], info.language
+
+    total = sum(end - start for start, end in chunks)
+    done = 0
+
+    def report(chunk: Span):
+        nonlocal done
+        done += chunk[1] - chunk[0]
+        if progress_callback and total:
+            progress_callback(done / total)
+
+    first_segments, language = run(chunks[0], None)
+    report(chunks[0])
+    results = {0: first_segments}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run, chunk, language): i for i, chunk in enumerate(chunks) if i > 0}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()[0]
+                report(chunks[i])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return [seg for i in range(len(chunks)) for seg in results[i]], language
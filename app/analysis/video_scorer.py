@@ -1,438 +1,350 @@
-import cv2
 import numpy as np
-from ultralytics import YOLO
 import tempfile
 import os
-from typing import Dict, List
-import math
-from faster_whisper import WhisperModel
-import ffmpeg
+from typing import Callable, Dict, List, Optional
 import concurrent.futures
 import time
 
+from . import keypoint_metrics
+from .device import POSE_IMGSZ
+from . import profiles
+from . import sharding
+from .adaptive_sampler import ADAPTIVE_SAMPLING
+from . import transcription
+from .audio import SAMPLE_RATE, decode_audio
+from .frame_decoder import FrameDecoder
+from .metrics_store import MetricsStore
+from .. import model_registry
+from .. import telemetry
+
+class AnalysisCancelled(Exception):
+    """Raised from a progress callback to abort a running analysis"""
+
+
+BATCH_SIZE = 16  # YOLO batch size
+
+
+def frame_weights(timestamps: List[float]) -> np.ndarray:
+    """Seconds each analyzed frame represents; the last frame gets the typical gap"""
+    ts = np.asarray(timestamps, dtype=np.float64)
+    if len(ts) < 2:
+        return np.ones(len(ts))
+    gaps = np.diff(ts)
+    weights = np.append(gaps, np.median(gaps))
+    # Guard against duplicate timestamps producing all-zero weights
+    return weights if weights.sum() > 0 else np.ones(len(ts))
+
+
+class ScoreAccumulator:
+    """Per-frame metrics of one recording or live stream, fed a batch at a time
+
+    Movement tracking carries across batches, so feeding a video batch by batch
+    gives exactly the metrics of analyzing it whole. Metrics live in a
+    columnar MetricsStore. `window` summarizes the most recent frames while
+    data is still arriving; `report` produces the final session scores from
+    what has been accumulated, without re-analysis.
+    """
+
+    def __init__(self, full_metrics: bool = True):
+        self.full_metrics = full_metrics
+        self.store = MetricsStore(full_metrics)
+        self._last_position = None  # Nose position carried across batches for movement tracking
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def add_batch(self, batch: Dict[str, np.ndarray], timestamps: List[float]) -> Dict[str, np.ndarray]:
+        """Add the pose results of one batch (see keypoint_metrics.extract_batch); returns its metric columns"""
+        columns, self._last_position = keypoint_metrics.compute_frame_metrics(batch, self._last_position,
+                                                                              self.full_metrics)
+        self.store.append(columns, timestamps)
+        return columns
+
+    def window(self, seconds: float) -> Dict:
+        """Mean metrics over the last `seconds` of accumulated frames"""
+        if not len(self.store):
+            return {"frames": 0}
+        timestamps = self.store.column("timestamp")
+        start = self.store.since(timestamps[-1] - seconds)
+        present = self.store.column("person_count")[start:] > 0
+        return {
+            "frames": len(timestamps) - start,
+            "timestamp": round(float(timestamps[-1]), 2),
+            **self.store.window_means(start),
+            "presence": round(float(present.mean()), 2),
+        }
+
+    def report(self, timeline: bool = False) -> Dict:
+        """Session scores and statistics; `timeline` adds per-second averages"""
+        results = calculate_scores(self.store)
+        if len(self.store):
+            results["statistics"] = self.store.statistics()
+        if timeline:
+            results["timeline"] = self.store.timeline()
+        return results
+
+
+def upload_suffix(content_type: str) -> str:
+    # Determine file extension based on content type
+    return '.wav' if content_type and 'audio' in content_type else '.mp4'
+
+
 class SessionScorer:
     def __init__(self):
-        # Force NVIDIA GPU specifically
-        import torch
-        if not torch.cuda.is_available():
-            debug_info = f"Torch version: {torch.__version__}, CUDA built: {torch.version.cuda}, Devices: {torch.cuda.device_count()}"
-            raise RuntimeError(f"CUDA not available! NVIDIA GPU required. Debug info: {debug_info}")
-        
-        # Find NVIDIA GPU (skip Intel GPU at index 0)
-        nvidia_device = 0
-        if torch.cuda.device_count() > 1:
-            for i in range(torch.cuda.device_count()):
-                gpu_name = torch.cuda.get_device_name(i).lower()
-                if 'nvidia' in gpu_name or 'geforce' in gpu_name or 'rtx' in gpu_name or 'gtx' in gpu_name:
-                    nvidia_device = i
-                    break
-        
-        print(f"Using GPU {nvidia_device}: {torch.cuda.get_device_name(nvidia_device)}")
-        torch.cuda.set_device(nvidia_device)
-        os.environ['CUDA_VISIBLE_DEVICES'] = str(nvidia_device)
-        
+        # Models come from the process-wide registry, so extra scorers cost nothing
+        self.device_info = model_registry.device()
+
         # Store device for monitoring
-        self.device = f'cuda:{nvidia_device}'
-        self.torch = torch
-        
-        self.yolo_model = YOLO("models/yolov8n-pose.pt")
-        self.yolo_model.to(f'cuda:{nvidia_device}')
-        
+        self.device = self.device_info["torch_device"]
+
+        self.yolo_model = model_registry.pose_model()
+
         # Optimize YOLO for speed while maintaining accuracy
         self.yolo_model.conf = 0.25  # Slightly higher confidence for better accuracy
         self.yolo_model.iou = 0.45   # Better IoU threshold
         self.yolo_model.max_det = 1  # Only detect 1 person
-        
-        self.previous_positions = []  # For movement tracking
-        
-        # Provide visual feedback before loading heavy model
-        print("Loading Faster-Whisper model (Int8)...")
-        self.whisper_model = WhisperModel("large-v3", device="cuda", device_index=nvidia_device, compute_type="int8")
-        
-    
+
+        self.whisper_model = model_registry.whisper_model()
+
     def analyze_video(self, video_bytes: bytes, content_type: str = "video/mp4") -> Dict:
-        print(f"Starting analysis for content type: {content_type}")
-        
-        # Determine file extension based on content type
-        suffix = '.wav' if 'audio' in content_type else '.mp4'
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=upload_suffix(content_type)) as tmp_file:
             tmp_file.write(video_bytes)
             tmp_path = tmp_file.name
-            
+
         try:
-            # 1. Start Audio Extraction & Transcription in Background
-            print("Extracting audio...")
-            # If input is already audio, we might not need extraction, but ffmpeg handles copy or re-encode safely
-            audio_path = tmp_path.replace(suffix, '.wav')
-            if suffix == '.wav':
-                 # If it's already a wav/audio file, just use it directly or copy it
-                 # FFmpeg run acts as a standardizer (ensure 16kHz)
-                 pass
-            
-            self._extract_audio(tmp_path, audio_path)
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                # Start transcription immediately
-                print("Starting background transcription...")
-                transcription_future = executor.submit(self._transcribe_audio_file, audio_path)
-                
-                # 2. Run Video Analysis (Main Thread)
-                metrics = []
-                if "video" in content_type:
-                    print("Starting video analysis...")
-                    metrics = self._analyze_video_frames_batched(tmp_path)
-                    print(f"Video analysis complete. Frames: {len(metrics)}")
-                else:
-                    print("Audio-only content detected. Skipping video analysis.")
-                
-                # 3. Wait for Transcription
-                print("Waiting for transcription...")
-                transcription = transcription_future.result()
-                print("Transcription complete.")
-            
-            # Combine video analysis with transcription
-            results = self._calculate_scores(metrics)
-            results["audio_transcription"] = transcription
-            
-            return results
-            
+            return self.analyze_video_file(tmp_path, content_type)
         finally:
             try:
                 os.unlink(tmp_path)
-                if os.path.exists(audio_path):
-                    os.unlink(audio_path)
             except PermissionError:
                 pass  # Ignore Windows file lock issues
 
-    def _extract_audio(self, video_path: str, audio_path: str):
+    def analyze_video_file(self, video_path: str, content_type: str = "video/mp4",
+                           progress_callback: Optional[Callable[[float], None]] = None,
+                           shards: Optional[int] = None, profile: Optional[str] = None,
+                           timeline: bool = False) -> Dict:
+        """Analyze a recording that is already on disk; the caller owns `video_path`
+
+        `progress_callback` receives the overall completion fraction (0-1) as
+        frames and transcript segments are processed. It may raise
+        AnalysisCancelled to abort the analysis. `shards` > 1 splits pose
+        inference across worker processes (default: ANALYSIS_SHARDS).
+        `profile` names the analysis profile (default: ANALYSIS_PROFILE).
+        `timeline` adds per-second metric averages to the result. The result
+        always carries a per-stage `timing` breakdown (see telemetry.StageTimer).
+        """
+        settings = profiles.get_profile(profile)
+        print(f"Starting analysis for content type: {content_type} (profile: {settings['name']})")
+        started = time.perf_counter()
+        timer = telemetry.StageTimer()
+
+        has_video = "video" in content_type
+        stage_progress = {"audio": 0.0, "video": 0.0} if has_video else {"audio": 0.0}
+
+        def report(stage: str, fraction: float):
+            if progress_callback is None:
+                return
+            stage_progress[stage] = min(1.0, fraction)
+            progress_callback(sum(stage_progress.values()) / len(stage_progress))
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            # 1. Decode audio in-process and transcribe in the background
+            print("Starting background transcription...")
+            transcription_future = executor.submit(self._transcribe_media, video_path,
+                                                   lambda fraction: report("audio", fraction), settings, timer)
+
+            # 2. Run Video Analysis (Main Thread)
+            accumulator = ScoreAccumulator(settings["full_metrics"])
+            if has_video:
+                print("Starting video analysis...")
+                accumulator = self._analyze_video_frames_batched(video_path,
+                                                                 lambda fraction: report("video", fraction),
+                                                                 shards, settings, timer)
+                print(f"Video analysis complete. Frames: {len(accumulator)} "
+                      f"({accumulator.store.nbytes() / 1024:.0f} KiB of metrics)")
+            else:
+                print("Audio-only content detected. Skipping video analysis.")
+
+            # 3. Wait for Transcription
+            print("Waiting for transcription...")
+            transcript = transcription_future.result()
+            print("Transcription complete.")
+
+        # Combine video analysis with transcription
+        with timer.stage("scoring"):
+            results = accumulator.report(timeline)
+        elapsed_s = time.perf_counter() - started
+        results["audio_transcription"] = transcript
+        results["analysis_profile"] = {
+            **{key: value for key, value in settings.items() if key != "cost_per_s"},
+            "elapsed_s": round(elapsed_s, 2),
+        }
+        # Audio and video stages overlap, so stage seconds can add up to more than total_s
+        results["timing"] = {"total_s": round(elapsed_s, 3), **timer.breakdown()}
+
+        return results
+
+    def _analyze_video_frames_batched(self, video_path: str,
+                                      progress_callback: Optional[Callable[[float], None]] = None,
+                                      shards: Optional[int] = None,
+                                      settings: Optional[Dict] = None,
+                                      timer: Optional[telemetry.StageTimer] = None) -> ScoreAccumulator:
+        settings = settings or profiles.get_profile()
+        timer = timer or telemetry.StageTimer()
+        analysis_fps, imgsz, full = settings["analysis_fps"], settings["imgsz"], settings["full_metrics"]
+
+        shards = sharding.ANALYSIS_SHARDS if shards is None else shards
+        # Adaptive sampling steers decoding from the metrics of earlier batches, which shards cannot see
+        if shards > 1 and not ADAPTIVE_SAMPLING:
+            ranges = sharding.plan_shards(video_path, shards, BATCH_SIZE, analysis_fps)
+            if len(ranges) > 1:
+                return self._analyze_video_frames_sharded(video_path, ranges, progress_callback, settings, timer)
+
+        accumulator = ScoreAccumulator(full)
+
+        # Decoding runs on its own thread and overlaps with inference below
+        decoder = FrameDecoder(video_path, analysis_fps=analysis_fps, batch_size=BATCH_SIZE, imgsz=imgsz,
+                               adaptive=ADAPTIVE_SAMPLING)
+        started = time.perf_counter()
         try:
-            (
-                ffmpeg
-                .input(video_path)
-                .output(audio_path, acodec='pcm_s16le', ac=1, ar='16000')
-                .overwrite_output()
-                .run(quiet=True)
-            )
+            for batch_frames, batch_indices, batch_timestamps in decoder:
+                batch_columns = self._process_batch(accumulator, batch_frames, batch_timestamps, imgsz, timer)
+                if decoder.sampler is not None:
+                    decoder.sampler.observe(batch_columns)
+                if progress_callback and decoder.frame_count > 0:
+                    progress_callback(batch_indices[-1] / decoder.frame_count)
+        finally:
+            decoder.close()
+
+        timer.add("frame_decode", decoder.decode_s)
+        timer.add("frame_decode_wait", decoder.wait_s)
+        timer.count("frames_decoded", decoder.frames_grabbed)
+        timer.count("frames_sampled", decoder.frames_sampled)
+        if decoder.sampler is not None:
+            timer.count("frames_skipped_adaptive", decoder.sampler.skipped)
+
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            print(f"Analyzed {decoder.frames_sampled} of {decoder.frames_grabbed} decoded frames "
+                  f"in {elapsed:.1f}s ({decoder.frames_sampled / elapsed:.1f} analyzed fps)")
+        if decoder.sampler is not None:
+            print(f"Adaptive sampling skipped {decoder.sampler.skipped} of {decoder.sampler.candidates} candidate frames")
+        if progress_callback:
+            progress_callback(1.0)
+        return accumulator
+
+    def _process_batch(self, accumulator: ScoreAccumulator, frames: List[np.ndarray], timestamps: List[float],
+                       imgsz: int = POSE_IMGSZ, timer: Optional[telemetry.StageTimer] = None) -> Dict[str, np.ndarray]:
+        timer = timer or telemetry.StageTimer()
+        # Run YOLO on batch; one host transfer for the whole batch, vectorized metrics after
+        started = time.perf_counter()
+        batch = sharding.infer_pose_batch(self.yolo_model, self.device, frames, imgsz)
+        timer.batch(len(frames), time.perf_counter() - started)
+        with timer.stage("postprocess"):
+            return accumulator.add_batch(batch, timestamps)
+
+    def _analyze_video_frames_sharded(self, video_path: str, ranges: List,
+                                      progress_callback: Optional[Callable[[float], None]] = None,
+                                      settings: Optional[Dict] = None,
+                                      timer: Optional[telemetry.StageTimer] = None) -> ScoreAccumulator:
+        """Pose inference on time shards in worker processes, merged in timestamp order
+
+        Metrics are computed here, batch by batch in order, exactly as the serial
+        path does, so movement continuity across shard boundaries is preserved
+        and the result is identical to a serial run.
+        """
+        print(f"Analyzing video in {len(ranges)} parallel shards...")
+        settings = settings or profiles.get_profile()
+        timer = timer or telemetry.StageTimer()
+        futures = sharding.submit_shards(video_path, ranges, BATCH_SIZE, settings["analysis_fps"], settings["imgsz"])
+
+        try:
+            finished = 0
+            for future in concurrent.futures.as_completed(futures):
+                future.result()  # Surface worker errors early
+                finished += 1
+                if progress_callback:
+                    progress_callback(finished / len(futures))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        accumulator = ScoreAccumulator(settings["full_metrics"])
+        for future in futures:
+            shard = future.result()
+            # Shard times are summed across processes, so they may exceed wall-clock time
+            timer.add("frame_decode", shard["decode_s"])
+            timer.count("frames_decoded", shard["frames_decoded"])
+            timer.count("frames_sampled", shard["frames_sampled"])
+            for batch, batch_indices, batch_timestamps, infer_s in shard["batches"]:
+                timer.batch(len(batch_indices), infer_s)
+                with timer.stage("postprocess"):
+                    accumulator.add_batch(batch, batch_timestamps)
+        return accumulator
+
+    def _transcribe_media(self, media_path: str,
+                          progress_callback: Optional[Callable[[float], None]] = None,
+                          settings: Optional[Dict] = None,
+                          timer: Optional[telemetry.StageTimer] = None) -> Dict:
+        timer = timer or telemetry.StageTimer()
+        try:
+            # 16 kHz float32 straight from the container, no intermediate WAV
+            with timer.stage("audio_decode"):
+                audio = decode_audio(media_path)
         except Exception as e:
             print(f"Error extracting audio: {e}")
+            return {
+                "text": "",
+                "language": "unknown",
+                "segments": [],
+                "error": str(e)
+            }
+        return self._transcribe_audio(audio, progress_callback, settings, timer)
 
-    def _analyze_video_frames_batched(self, video_path: str) -> List[Dict]:
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        metrics = []
-        frame_idx = 0
-        
-        # Process every 5th frame
-        sample_rate = 5
-        batch_size = 16  # YOLO batch size
-        
-        batch_frames = []
-        batch_indices = []
-        batch_timestamps = []
-        
-        while cap.read()[0]:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Skip frames
-            if frame_idx % sample_rate == 0:
-                # Add to batch
-                timestamp = frame_idx / fps
-                
-                # Pre-process frame for YOLO (resize)
-                # Note: YOLOv8 handles resizing internally but pre-resizing 
-                # saves PCIe bandwidth if frames are 4K
-                processed_frame = cv2.resize(frame, (416, 416))
-                
-                batch_frames.append(processed_frame)
-                batch_indices.append(frame_idx)
-                batch_timestamps.append(timestamp)
-                
-                # Process batch if full
-                if len(batch_frames) >= batch_size:
-                    batch_metrics = self._process_batch(batch_frames, batch_indices, batch_timestamps)
-                    metrics.extend(batch_metrics)
-                    
-                    # Reset batch
-                    batch_frames = []
-                    batch_indices = []
-                    batch_timestamps = []
-                
-            frame_idx += 1
-            
-        # Process remaining frames
-        if batch_frames:
-            batch_metrics = self._process_batch(batch_frames, batch_indices, batch_timestamps)
-            metrics.extend(batch_metrics)
-            
-        cap.release()
-        return metrics
-
-    def _process_batch(self, frames: List[np.ndarray], indices: List[int], timestamps: List[float]) -> List[Dict]:
-        # Run YOLO on batch
-        # verbose=False, imgsz=416 are default but explicit is good
-        results_list = self.yolo_model(frames, verbose=False, imgsz=416)
-        
-        batch_results = []
-        
-        for i, results in enumerate(results_list):
-            frame = frames[i]
-            frame_idx = indices[i]
-            timestamp = timestamps[i]
-            
-            # Simple metrics
-            confidence = self._calculate_confidence([results]) # Helper expects list
-            posture = self._calculate_enhanced_posture([results])
-            movement_score = self._calculate_movement([results])
-            
-            # Expensive CV ops - only occasionally
-            if frame_idx % 10 == 0:
-                attention = self._calculate_enhanced_attention(frame, [results])
-                engagement = self._calculate_enhanced_engagement(frame, [results])
-                eye_contact = self._calculate_eye_contact_from_keypoints([results])
-            else:
-                attention = 60.0
-                engagement = 70.0
-                eye_contact = 50.0
-            
-            # Count persons
-            person_count = self._count_persons([results])
-            
-            batch_results.append({
-                "timestamp": timestamp,
-                "attention": attention,
-                "confidence": confidence,
-                "posture": posture,
-                "engagement": engagement,
-                "movement_stability": movement_score,
-                "head_orientation": self._calculate_head_orientation([results]),
-                "eye_contact_quality": eye_contact,
-                "person_count": person_count
-            })
-            
-        return batch_results
+    def _transcribe_audio(self, audio: np.ndarray,
+                          progress_callback: Optional[Callable[[float], None]] = None,
+                          settings: Optional[Dict] = None,
+                          timer: Optional[telemetry.StageTimer] = None) -> Dict:
+        settings = settings or profiles.get_profile()
+        timer = timer or telemetry.StageTimer()
+        try:
+            # Preloaded per profile by the registry, so switching profiles loads nothing
+            whisper_model = model_registry.whisper_model(settings["whisper_model"])
 
-    
+            # Drop silence first so Whisper only sees speech
+            with timer.stage("vad"):
+                spans = transcription.speech_spans(audio)
+            speaking = transcription.speaking_stats(spans, len(audio))
+            timer.count("audio_s", speaking["duration_s"])
+            timer.count("speech_s", speaking["speech_s"])
+            if not spans:
+                if progress_callback:
+                    progress_callback(1.0)
+                return {"text": "", "language": "unknown", "segments": [], "speaking": speaking}
 
-    
-    def _calculate_enhanced_attention(self, frame, results) -> float:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return 0.0
-            
-        # Use Head Orientation as primary proxy for attention
-        # If looking at camera (yaw ~ 0, pitch ~ 0), attention is high
-        orientation = self._calculate_head_orientation(results)
-        yaw = orientation["yaw"]
-        pitch = orientation["pitch"]
-        
-        # Calculate deviation from center (0,0)
-        deviation = math.sqrt(yaw**2 + pitch**2)
-        
-        # Map deviation to score: 0 deviation = 100 score, 45+ deviation = 0 score
-        attention_score = max(0, 100 - (deviation * 2.2))
-        
-        return float(attention_score)
+            # Bounded chunks transcribed concurrently, stitched back in order
+            chunks = transcription.build_chunks(spans, int(transcription.TRANSCRIBE_CHUNK_S * SAMPLE_RATE))
+            started = time.perf_counter()
+            segments, language = transcription.transcribe_chunks(
+                whisper_model, audio, chunks, beam_size=settings["beam_size"], progress_callback=progress_callback
+            )
+            transcribe_s = time.perf_counter() - started
+            timer.add("transcription", transcribe_s)
+            timer.count("transcription_chunks", len(chunks))
+            if speaking["duration_s"] > 0:
+                timer.count("transcription_rtf", round(transcribe_s / speaking["duration_s"], 4))
+            print(f"Transcribed {speaking['speech_s']:.1f}s of speech ({speaking['duration_s']:.1f}s audio) "
+                  f"in {len(chunks)} chunks, {transcribe_s:.1f}s")
 
-    
-    def _calculate_spine_alignment(self, left_shoulder, right_shoulder, left_hip, right_hip) -> float:
-        # Calculate spine straightness
-        shoulder_center = [(float(left_shoulder[0].cpu()) + float(right_shoulder[0].cpu())) / 2,
-                          (float(left_shoulder[1].cpu()) + float(right_shoulder[1].cpu())) / 2]
-        hip_center = [(float(left_hip[0].cpu()) + float(right_hip[0].cpu())) / 2,
-                     (float(left_hip[1].cpu()) + float(right_hip[1].cpu())) / 2]
-        
-        # Calculate angle deviation from vertical
-        angle = math.atan2(abs(shoulder_center[0] - hip_center[0]), 
-                          abs(shoulder_center[1] - hip_center[1]))
-        angle_degrees = math.degrees(angle)
-        
-        # Good posture = small angle deviation
-        alignment_score = max(0, 1 - (angle_degrees / 30))  # 30 degrees max deviation
-        return alignment_score
-    
-    def _calculate_movement(self, results) -> float:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return 50.0  # Neutral score
-        
-        keypoints = results[0].keypoints.data[0]
-        current_position = [float(keypoints[0][0].cpu()), float(keypoints[0][1].cpu())]  # Nose position
-        
-        if len(self.previous_positions) == 0:
-            self.previous_positions.append(current_position)
-            return 50.0
-        
-        # Calculate movement stability (less movement = more stable)
-        movement = np.linalg.norm(np.array(current_position) - np.array(self.previous_positions[-1]))
-        
-        # Keep last 10 positions for smoothing
-        self.previous_positions.append(current_position)
-        if len(self.previous_positions) > 10:
-            self.previous_positions.pop(0)
-        
-        # Stability score (inverse of movement)
-        stability_score = max(0, 100 - (movement * 2))  # Scale movement
-        return min(100, stability_score)
-    
-    def _calculate_head_orientation(self, results) -> Dict:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return {"pitch": 0, "yaw": 0, "roll": 0}
-        
-        keypoints = results[0].keypoints.data[0]
-        nose = keypoints[0]
-        left_eye = keypoints[1]
-        right_eye = keypoints[2]
-        
-        if nose[2] < 0.5 or left_eye[2] < 0.5 or right_eye[2] < 0.5:
-            return {"pitch": 0, "yaw": 0, "roll": 0}
-        
-        # Calculate head orientation angles
-        eye_center = [(float(left_eye[0].cpu()) + float(right_eye[0].cpu())) / 2,
-                     (float(left_eye[1].cpu()) + float(right_eye[1].cpu())) / 2]
-        nose_pos = [float(nose[0].cpu()), float(nose[1].cpu())]
-        
-        # Simplified orientation calculation
-        yaw = math.degrees(math.atan2(nose_pos[0] - eye_center[0], 100))  # Left-right
-        pitch = math.degrees(math.atan2(nose_pos[1] - eye_center[1], 100))  # Up-down
-        roll = math.degrees(math.atan2(float(right_eye[1].cpu()) - float(left_eye[1].cpu()),
-                                      float(right_eye[0].cpu()) - float(left_eye[0].cpu())))
-        
-        return {"pitch": round(pitch, 2), "yaw": round(yaw, 2), "roll": round(roll, 2)}
-    
-    def _calculate_confidence(self, results) -> float:
-        if not results[0].boxes or len(results[0].boxes.data) == 0:
-            return 0.0
-        
-        # Filter for person detections only (class 0)
-        person_boxes = [box for box in results[0].boxes.data if box[5] == 0]
-        if not person_boxes:
-            return 0.0
-            
-        max_confidence = max([box[4].item() for box in person_boxes])
-        return min(100, max_confidence * 100)
-
-    def _calculate_enhanced_posture(self, results) -> float:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return 0.0
-        
-        keypoints = results[0].keypoints.data[0]
-        left_shoulder = keypoints[5]   # Left shoulder
-        right_shoulder = keypoints[6]  # Right shoulder
-        
-        if left_shoulder[2] < 0.5 or right_shoulder[2] < 0.5:  # Low confidence
-            return 0.0
-        
-        # Enhanced posture with spine alignment
-        shoulder_diff = abs(float(left_shoulder[1].cpu()) - float(right_shoulder[1].cpu())) / 100
-        shoulder_score = max(0, 1 - shoulder_diff)
-        
-        # Add spine alignment (shoulder to hip alignment)
-        left_hip = keypoints[11]
-        right_hip = keypoints[12]
-        
-        if left_hip[2] > 0.5 and right_hip[2] > 0.5:
-            spine_alignment = self._calculate_spine_alignment(left_shoulder, right_shoulder, left_hip, right_hip)
-            posture_score = (shoulder_score * 0.6) + (spine_alignment * 0.4)
-        else:
-            posture_score = shoulder_score
-        
-        return min(100, posture_score * 100)
-
-    def _calculate_enhanced_engagement(self, frame, results) -> float:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return 0.0
-        
-        keypoints = results[0].keypoints.data[0]
-        
-        # Body presence (Torso)
-        left_shoulder = keypoints[5]
-        right_shoulder = keypoints[6]
-        left_hip = keypoints[11]
-        right_hip = keypoints[12]
-        
-        # Count visible body parts
-        visible_parts = sum([
-            float(left_shoulder[2].cpu()) > 0.5,
-            float(right_shoulder[2].cpu()) > 0.5,
-            float(left_hip[2].cpu()) > 0.5,
-            float(right_hip[2].cpu()) > 0.5
-        ])
-        body_presence = visible_parts / 4
-        
-        # Facing Factor (Is user facing camera?)
-        # If facing camera, shoulders are wide apart. If side profile, they are close.
-        # We can also check nose vs shoulders center
-        facing_score = 0.5 # Default
-        if float(left_shoulder[2].cpu()) > 0.5 and float(right_shoulder[2].cpu()) > 0.5:
-             # Calculate shoulder width relative to frame
-             shoulder_width = abs(float(left_shoulder[0].cpu()) - float(right_shoulder[0].cpu()))
-             # Normalize by frame width (assuming single person often centered)
-             # This is a heuristic: wider shoulders = more direct facing
-             # We can also check head orientation
-             orientation = self._calculate_head_orientation(results)
-             if abs(orientation['yaw']) < 20: 
-                 facing_score = 1.0
-             elif abs(orientation['yaw']) < 45:
-                 facing_score = 0.7
-             else:
-                 facing_score = 0.3
-                 
-        engagement_score = (body_presence * 0.5) + (facing_score * 0.5)
-        return min(100, engagement_score * 100)
-
-    def _calculate_eye_contact_from_keypoints(self, results) -> float:
-        if not results[0].keypoints or len(results[0].keypoints.data) == 0:
-            return 0.0
-            
-        # Use Head Orientation (Yaw/Pitch) as proxy for Eye Contact
-        # If I am facing you directly, I am likely making eye contact
-        orientation = self._calculate_head_orientation(results)
-        yaw = abs(orientation["yaw"])
-        pitch = abs(orientation["pitch"])
-        
-        # Strict threshold for eye contact
-        # Yaw must be < 15 degrees, Pitch < 15 degrees
-        if yaw < 15 and pitch < 15:
-            # Score decreases as angle increases
-            score = 100 - (yaw + pitch) * 2
-            return max(0, score)
-        
-        return 20.0 # Low baseline if looking away
-    
-    def _count_persons(self, results) -> int:
-        if not results[0].boxes or len(results[0].boxes.data) == 0:
-            return 0
-        
-        # Count person detections (class 0)
-        person_count = sum(1 for box in results[0].boxes.data if box[5] == 0)
-        return person_count
-    
-    def _transcribe_audio_file(self, audio_path: str) -> Dict:
-        try:
-            # Transcribe with Faster-Whisper
-            # Returns a generator
-            segments, info = self.whisper_model.transcribe(audio_path, beam_size=5)
-            
-            # Convert generator to list immediately
-            segment_list = list(segments)
-            
-            full_text = " ".join([seg.text.strip() for seg in segment_list])
-            
             return {
-                "text": full_text,
-                "language": info.language,
-                "segments": [
-                    {
-                        "start": seg.start,
-                        "end": seg.end,
-                        "text": seg.text.strip()
-                    }
-                    for seg in segment_list
-                ]
+                "text": " ".join(seg["text"] for seg in segments),
+                "language": language,
+                "segments": segments,
+                "speaking": speaking,
             }
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             print(f"Transcription error: {e}")
             return {
@@ -442,64 +354,8 @@ class SessionScorer:
                 "error": str(e)
             }
     
-    def _calculate_scores(self, metrics: List[Dict]) -> Dict:
-        if not metrics:
-            return {
-                "session_analysis": {
-                    "attention_score": 0.0,
-                    "confidence_score": 0.0,
-                    "posture_score": 0.0,
-                    "engagement_score": 0.0,
-                    "movement_stability_score": 0.0,
-                    "eye_contact_quality_score": 0.0,
-                    "overall_score": 0.0,
-                    "note": "Audio-only session. No video analysis performed."
-                },
-                "scoring_formula": self.get_formula_info()["formula"]
-            }
-        
-        # Average scores across all frames
-        avg_attention = np.mean([m["attention"] for m in metrics])
-        avg_confidence = np.mean([m["confidence"] for m in metrics])
-        avg_posture = np.mean([m["posture"] for m in metrics])
-        avg_engagement = np.mean([m["engagement"] for m in metrics])
-        avg_movement = np.mean([m["movement_stability"] for m in metrics])
-        avg_eye_contact = np.mean([m["eye_contact_quality"] for m in metrics])
-        
-        # Person count analysis
-        person_counts = [m["person_count"] for m in metrics]
-        avg_person_count = np.mean(person_counts)
-        single_person_frames = sum(1 for count in person_counts if count == 1)
-        multi_person_frames = sum(1 for count in person_counts if count > 1)
-        no_person_frames = sum(1 for count in person_counts if count == 0)
-        
-        # Adjust scores based on person presence
-        presence_penalty = 1.0
-        if avg_person_count == 0:
-            presence_penalty = 0.3  # Heavy penalty for no person detected
-        elif avg_person_count > 1.5:
-            presence_penalty = 0.8  # Slight penalty for multiple people
-        
-        # Enhanced overall score calculation with presence penalty
-        base_score = (avg_attention * 0.25 + avg_confidence * 0.15 + 
-                     avg_posture * 0.2 + avg_engagement * 0.2 + 
-                     avg_movement * 0.1 + avg_eye_contact * 0.1)
-        overall_score = base_score * presence_penalty
-        
-        return {
-            "session_analysis": {
-                "attention_score": round(avg_attention, 2),
-                "confidence_score": round(avg_confidence, 2),
-                "posture_score": round(avg_posture, 2),
-                "engagement_score": round(avg_engagement, 2),
-                "movement_stability_score": round(avg_movement, 2),
-                "eye_contact_quality_score": round(avg_eye_contact, 2),
-                "overall_score": round(overall_score, 2)
-            },
-            "scoring_formula": self.get_formula_info()["formula"]
-        }
-    
-    def get_formula_info(self) -> Dict:
+    @staticmethod
+    def get_formula_info() -> Dict:
         return {
             "formula": {
                 "overall_score": "0.25 × attention + 0.15 × confidence + 0.2 × posture + 0.2 × engagement + 0.1 × movement + 0.1 × eye_contact",
@@ -534,4 +390,75 @@ class SessionScorer:
                 "Facial expression analysis",
                 "Spine alignment measurement"
             ]
-        }
\ No newline at end of file
+        }
+
+
+def calculate_scores(store: MetricsStore) -> Dict:
+    """Session scores from per-frame metric columns (time-weighted, with presence penalty)"""
+    if not len(store):
+        return {
+            "session_analysis": {
+                "attention_score": 0.0,
+                "confidence_score": 0.0,
+                "posture_score": 0.0,
+                "engagement_score": 0.0,
+                "movement_stability_score": 0.0,
+                "eye_contact_quality_score": 0.0,
+                "overall_score": 0.0,
+                "note": "Audio-only session. No video analysis performed."
+            },
+            "scoring_formula": SessionScorer.get_formula_info()["formula"]
+        }
+
+    # Time-weighted averages: each analyzed frame stands for the time until the next one,
+    # so frames carried forward by adaptive sampling still count for their duration
+    weights = frame_weights(store.column("timestamp"))
+
+    def average(name: str) -> Optional[float]:
+        # None when the analysis profile skipped this metric
+        if not store.has(name):
+            return None
+        return np.average(store.column(name), weights=weights)
+
+    avg_attention = average("attention")
+    avg_confidence = average("confidence")
+    avg_posture = average("posture")
+    avg_engagement = average("engagement")
+    avg_movement = average("movement_stability")
+    avg_eye_contact = average("eye_contact_quality")
+
+    # Person count analysis
+    avg_person_count = np.average(store.column("person_count"), weights=weights)
+
+    # Adjust scores based on person presence
+    presence_penalty = 1.0
+    if avg_person_count == 0:
+        presence_penalty = 0.3  # Heavy penalty for no person detected
+    elif avg_person_count > 1.5:
+        presence_penalty = 0.8  # Slight penalty for multiple people
+
+    # Enhanced overall score calculation with presence penalty
+    if avg_attention is not None:
+        base_score = (avg_attention * 0.25 + avg_confidence * 0.15 + 
+                     avg_posture * 0.2 + avg_engagement * 0.2 + 
+                     avg_movement * 0.1 + avg_eye_contact * 0.1)
+    else:
+        # Profiles without gaze metrics: same weights renormalized over what was measured
+        base_score = (avg_confidence * 0.15 + avg_posture * 0.2 + avg_movement * 0.1) / 0.45
+    overall_score = base_score * presence_penalty
+
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 2)
+
+    return {
+        "session_analysis": {
+            "attention_score": rounded(avg_attention),
+            "confidence_score": rounded(avg_confidence),
+            "posture_score": rounded(avg_posture),
+            "engagement_score": rounded(avg_engagement),
+            "movement_stability_score": rounded(avg_movement),
+            "eye_contact_quality_score": rounded(avg_eye_contact),
+            "overall_score": round(overall_score, 2)
+        },
+        "scoring_formula": SessionScorer.get_formula_info()["formula"]
+    }
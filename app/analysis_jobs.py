@@ -0,0 +1,268 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from .analysis.video_scorer import AnalysisCancelled
+
+# Worker pool configuration (override via .env)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "1"))
+JOB_RESULT_TTL_S = float(os.getenv("JOB_RESULT_TTL_S", "3600"))
+
+# Per-worker-process state, set up by _init_worker
+_worker_scorer = None
+_worker_progress = None
+_worker_cancel = None
+
+
+def _init_worker(progress, cancel):
+    """Load the scoring models once per worker process"""
+    global _worker_scorer, _worker_progress, _worker_cancel
+    from .analysis.video_scorer import SessionScorer
+    from .analysis import profiles
+
+    _worker_progress = progress
+    _worker_cancel = cancel
+    print(f"Analysis worker {os.getpid()} loading SessionScorer...")
+    _worker_scorer = SessionScorer()
+    profiles.preload()
+
+
+def _run_job(job_id: str, video_path: str, content_type: str, profile: Optional[str] = None) -> Dict:
+    def report(fraction: float):
+        if job_id in _worker_cancel:
+            raise AnalysisCancelled(job_id)
+        _worker_progress[job_id] = fraction
+
+    report(0.0)
+    # The timeline is always computed so cached results can serve requests with and without it
+    return _worker_scorer.analyze_video_file(video_path, content_type, progress_callback=report, profile=profile,
+                                             timeline=True)
+
+
+class AnalysisJobManager:
+    """Runs SessionScorer analyses in a local process pool and keeps results for a TTL"""
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, result_ttl: float = JOB_RESULT_TTL_S,
+                 result_cache=None):
+        self.workers = max(1, workers)
+        self.result_cache = result_cache  # Optional ResultCache that finished results are written to
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Dict] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._cancel = None
+        self._pool_lock = threading.Lock()  # The pool is replaced from the pool's own callback thread
+        # SQLite writes of finished results, kept off the event loop and the pool's callback thread
+        self._cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+
+    def _ensure_pool(self):
+        with self._pool_lock:
+            if self._executor is None:
+                self._start_pool()
+
+    def _start_pool(self):
+        # Spawn so workers never inherit a CUDA context from the web process
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._progress = self._manager.dict()
+        self._cancel = self._manager.dict()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._progress, self._cancel),
+        )
+
+    def submit(self, video_path: str, content_type: str, cache_key: Optional[str] = None,
+               profile: Optional[str] = None) -> str:
+        """Queue an analysis; the job takes ownership of `video_path` and deletes it when done"""
+        self._evict_expired()
+        self._ensure_pool()
+
+        job_id = uuid.uuid4().hex
+        try:
+            executor = self._executor
+            future = executor.submit(_run_job, job_id, video_path, content_type, profile)
+        except BrokenProcessPool:
+            # A worker died since the last job finished; start over with a fresh pool
+            self._reset_pool(executor)
+            self._ensure_pool()
+            executor = self._executor
+            future = executor.submit(_run_job, job_id, video_path, content_type, profile)
+        self.jobs[job_id] = {
+            "future": future,
+            "executor": executor,
+            "video_path": video_path,
+            "content_type": content_type,
+            "cache_key": cache_key,
+            "created_at": time.time(),
+            "finished_at": None,
+            "discard": False,
+        }
+        future.add_done_callback(lambda _: self._on_done(job_id))
+        return job_id
+
+    def complete(self, result: Dict) -> str:
+        """Register an already-known result (e.g. a cache hit) as a finished job"""
+        self._evict_expired()
+        job_id = uuid.uuid4().hex
+        future = Future()
+        future.set_result(result)
+        now = time.time()
+        self.jobs[job_id] = {
+            "future": future,
+            "video_path": None,
+            "content_type": None,
+            "cache_key": None,
+            "executor": None,
+            "created_at": now,
+            "finished_at": now,
+            "discard": False,
+        }
+        return job_id
+
+    def future(self, job_id: str) -> Optional[Future]:
+        job = self.jobs.get(job_id)
+        return job["future"] if job else None
+
+    def discard(self, job_id: str):
+        """Forget a job whose result went straight back to its caller instead of keeping it for the TTL
+
+        A job still running is dropped once it finishes, after its upload is cleaned up.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if job["future"].done() and job["finished_at"] is not None:
+            del self.jobs[job_id]
+        else:
+            job["discard"] = True
+
+    def _on_done(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job["finished_at"] = time.time()
+        try:
+            os.unlink(job["video_path"])
+        except (FileNotFoundError, PermissionError):
+            pass
+        if job["discard"]:
+            self.jobs.pop(job_id, None)
+
+        future = job["future"]
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # A worker crashed (e.g. killed for memory); every job in that pool has failed with it
+            self._reset_pool(job["executor"])
+            return
+        if (self.result_cache is not None and job["cache_key"] and not future.cancelled()
+                and future.exception() is None and job_id not in self._cancel
+                and self.result_cache.cacheable(future.result(), job["content_type"])):
+            self._cache_writer.submit(self._write_cache, job["cache_key"], future.result())
+        if self._progress is not None:
+            self._progress.pop(job_id, None)
+            self._cancel.pop(job_id, None)
+
+    def _write_cache(self, cache_key: str, result: Dict):
+        try:
+            self.result_cache.put(cache_key, result)
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+
+    def _reset_pool(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker died, unless that already happened"""
+        with self._pool_lock:
+            if self._executor is not broken:
+                return
+            print("Analysis worker pool broke; starting a new one for later jobs")
+            self._stop_pool()
+
+    def _stop_pool(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self._manager.shutdown()
+        except Exception as e:
+            print(f"Analysis pool manager shutdown failed: {e}")
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancel = None
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        self._evict_expired()
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+
+        future = job["future"]
+        error = None
+        progress = 0.0
+        if future.cancelled():
+            state = "cancelled"
+        elif future.done():
+            exc = future.exception()
+            if exc is None:
+                state, progress = "completed", 1.0
+            elif isinstance(exc, AnalysisCancelled):
+                state = "cancelled"
+            elif isinstance(exc, BrokenProcessPool):
+                state, error = "failed", "Analysis worker crashed (out of memory?); the job was not completed"
+            else:
+                state, error = "failed", str(exc)
+        elif job_id in self._cancel:
+            state = "cancelling"
+        elif job_id in self._progress:
+            state, progress = "running", self._progress.get(job_id, 0.0)
+        else:
+            state = "queued"
+
+        return {
+            "job_id": job_id,
+            "status": state,
+            "progress": round(progress * 100, 1),
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+            "error": error,
+        }
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        """Finished analysis result, or None if the job is unknown or not completed"""
+        job = self.jobs.get(job_id)
+        if job is None or not job["future"].done() or job["future"].cancelled():
+            return None
+        if job["future"].exception() is not None:
+            return None
+        return job["future"].result()
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job["future"].done():
+            return False
+        # Queued jobs are dropped outright; running ones stop at their next progress report
+        if not job["future"].cancel():
+            self._cancel[job_id] = True
+        return True
+
+    def _evict_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > self.result_ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def queue_depth(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job["future"].done())
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._executor is not None:
+                self._stop_pool()
+        self._cache_writer.shutdown(wait=True)
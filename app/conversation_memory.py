@@ -0,0 +1,161 @@
+import collections
+import os
+import re
+from typing import Deque, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from . import telemetry
+
+load_dotenv()
+
+# Conversation memory limits (override via .env)
+#   CONVERSATION_MAX_MESSAGES   latest messages kept word for word; older ones are folded into the summary
+#   CONVERSATION_SUMMARY_CHARS  length of the rolling summary of folded messages
+#   LLM_PROMPT_TOKENS           estimated prompt size a turn may use; older history is left out beyond it
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "6"))
+CONVERSATION_SUMMARY_CHARS = int(os.getenv("CONVERSATION_SUMMARY_CHARS", "600"))
+LLM_PROMPT_TOKENS = int(os.getenv("LLM_PROMPT_TOKENS", "1024"))
+
+SUMMARY_LINE_CHARS = 120  # Longest gist kept of one folded message
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separator tokens the chat template adds per message
+USER_MESSAGE_MIN_TOKENS = 256  # Part of the budget a system prompt can never take from the user's message
+SPEAKERS = {"user": "User", "assistant": "Alex"}
+
+LLM_PROMPT_TOKENS_USED = telemetry.histogram("llm_prompt_tokens", "Estimated prompt tokens per conversation turn",
+                                             buckets=(64, 128, 256, 512, 1024, 2048, 4096))
+CONVERSATION_MESSAGES_DROPPED = telemetry.counter("conversation_messages_dropped_total",
+                                                  "Remembered messages left out of a prompt to stay in budget")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a message
+
+    The backends use different tokenizers (Groq's Llama, any OpenAI-compatible
+    server, the local model), so one shared estimate of ~4 characters per
+    token for English text stands in for all of them.
+    """
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def _clip(text: str, tokens: int) -> str:
+    """`text` cut to fit an estimated `tokens`"""
+    return text[:max(0, tokens - MESSAGE_OVERHEAD_TOKENS) * 4]
+
+
+def _gist(text: str) -> str:
+    """First sentence of a message, clipped to SUMMARY_LINE_CHARS"""
+    text = " ".join(text.split())
+    first = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return first
+
+
+class ConversationMemory:
+    """Recent messages word for word in a ring buffer, older ones as a compact rolling summary
+
+    Messages evicted from the buffer leave one line each (speaker and first
+    sentence) in the summary, whose oldest lines go once it outgrows
+    `summary_chars`. Memory per session is bounded whatever its length.
+    """
+
+    def __init__(self, max_messages: int = CONVERSATION_MAX_MESSAGES,
+                 summary_chars: int = CONVERSATION_SUMMARY_CHARS):
+        self.max_messages = max(1, max_messages)
+        self.summary_chars = summary_chars
+        # (message, estimated tokens), oldest first; counted once when the message arrives
+        self.recent: Deque[Tuple[Dict, int]] = collections.deque()
+        self._summary: Deque[str] = collections.deque()
+        self._summary_len = 0
+        self.summary_tokens = 0
+
+    def append(self, role: str, content: str):
+        self.recent.append(({"role": role, "content": content}, estimate_tokens(content)))
+        while len(self.recent) > self.max_messages:
+            self._fold(self.recent.popleft()[0])
+
+    def _fold(self, message: Dict):
+        line = f"{SPEAKERS.get(message['role'], message['role'])}: {_gist(message['content'])}"
+        self._summary.append(line)
+        self._summary_len += len(line) + 1
+        while self._summary and self._summary_len > self.summary_chars:
+            self._summary_len -= len(self._summary.popleft()) + 1
+        self.summary_tokens = estimate_tokens(self.summary) if self._summary else 0
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self._summary)
+
+    def messages(self) -> List[Dict]:
+        return [message for message, _ in self.recent]
+
+    def clear(self):
+        self.recent.clear()
+        self._summary.clear()
+        self._summary_len = 0
+        self.summary_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+    def memory_bytes(self) -> int:
+        return self._summary_len + sum(len(message["content"]) for message, _ in self.recent)
+
+
+class PromptBuilder:
+    """Assembles turn prompts within a token budget from system prompts compiled once per session
+
+    `system_prompts` maps each conversation mode to its finished system
+    prompt. A turn gets that prompt, the newest remembered messages that fit
+    the budget, the rolling summary if there is still room, and the user's
+    message (clipped if it alone would overflow). A system prompt is trimmed
+    so that at least USER_MESSAGE_MIN_TOKENS are always left for the user.
+    """
+
+    def __init__(self, system_prompts: Dict[str, str], budget_tokens: int = LLM_PROMPT_TOKENS):
+        self.budget_tokens = budget_tokens
+        system_budget = max(MESSAGE_OVERHEAD_TOKENS, budget_tokens - USER_MESSAGE_MIN_TOKENS)
+        self.system_prompts = {}
+        for mode, prompt in system_prompts.items():
+            if estimate_tokens(prompt) > system_budget:
+                prompt = self._trim(prompt, system_budget)
+            self.system_prompts[mode] = (prompt, estimate_tokens(prompt))
+
+    @staticmethod
+    def _trim(prompt: str, tokens: int) -> str:
+        """Keep the start (who and what topic) and the end (the rules) of an oversized system prompt"""
+        marker = "\n...\n"
+        keep = len(_clip(prompt, tokens)) - len(marker)
+        if keep <= 0:
+            return _clip(prompt, tokens)
+        return prompt[:keep - keep // 2] + marker + prompt[len(prompt) - keep // 2:]
+
+    def build(self, mode: str, memory: ConversationMemory, user_message: str) -> List[Dict]:
+        system, used = self.system_prompts[mode]
+
+        user_tokens = estimate_tokens(user_message)
+        if used + user_tokens > self.budget_tokens:
+            user_message = _clip(user_message, self.budget_tokens - used)
+            user_tokens = estimate_tokens(user_message)
+        used += user_tokens
+
+        history: List[Dict] = []
+        for message, tokens in reversed(memory.recent):
+            if used + tokens > self.budget_tokens:
+                break
+            history.append(message)
+            used += tokens
+        history.reverse()
+        dropped = len(memory.recent) - len(history)
+        if dropped:
+            CONVERSATION_MESSAGES_DROPPED.inc(dropped)
+
+        if memory.summary_tokens and not dropped and used + memory.summary_tokens <= self.budget_tokens:
+            system = f"{system}\n\nEarlier in this conversation:\n{memory.summary}"
+            used += memory.summary_tokens
+
+        LLM_PROMPT_TOKENS_USED.observe(used)
+        return [{"role": "system", "content": system}, *history, {"role": "user", "content": user_message}]
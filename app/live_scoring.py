@@ -0,0 +1,161 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from . import model_registry
+from . import telemetry
+from .analysis import profiles, sharding
+from .analysis.audio import SAMPLE_RATE
+from .analysis.video_scorer import ScoreAccumulator, SessionScorer
+
+# Live scoring configuration (override via .env)
+LIVE_UPDATE_S = float(os.getenv("LIVE_UPDATE_S", "1.0"))  # How often rolling metrics are pushed
+LIVE_WINDOW_S = float(os.getenv("LIVE_WINDOW_S", "5.0"))  # Span the rolling metrics average over
+LIVE_MAX_PENDING = int(os.getenv("LIVE_MAX_PENDING", "8"))  # Frames buffered per stream before the oldest are dropped
+LIVE_MAX_AUDIO_S = float(os.getenv("LIVE_MAX_AUDIO_S", "1800"))  # Microphone audio kept per stream (~58 MB at 30 min)
+
+LIVE_FRAMES = telemetry.counter("live_scoring_frames_total", "Frames received by live scoring", ["outcome"])
+
+# Pose inference for every live stream shares one thread, so streams never contend for the model
+_inference = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-pose")
+
+
+def decode_frame(data: bytes, imgsz: int) -> Optional[np.ndarray]:
+    """JPEG/PNG bytes from the browser to a BGR frame sized for the pose model"""
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    return cv2.resize(frame, (imgsz, imgsz))
+
+
+class LiveScoringSession:
+    """Scores a live stream of camera frames as they arrive
+
+    Frames are timestamped on arrival and buffered; whatever is buffered is
+    decoded and run through pose inference as one batch, so a slow model
+    lowers the analyzed frame rate instead of building a backlog. Metrics go
+    into a ScoreAccumulator, which yields rolling metrics during the session
+    and the final report at the end. Frames come either encoded (/ws/score)
+    or already decoded (WebRTC); microphone PCM added with `add_audio` is
+    transcribed when the session finishes.
+    """
+
+    def __init__(self, profile: Optional[str] = None):
+        settings = profiles.get_profile(profile)
+        self.profile = settings["name"]
+        self.imgsz = settings["imgsz"]
+        self.analysis_fps = settings["analysis_fps"]
+        self.accumulator = ScoreAccumulator(settings["full_metrics"])
+
+        self.started = time.monotonic()
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_invalid = 0
+
+        self._pending: List[Tuple[Union[bytes, np.ndarray], float]] = []
+        self._audio: List[np.ndarray] = []  # 16 kHz mono int16 chunks
+        self.audio_samples = 0
+        self.audio_samples_dropped = 0
+        self.max_audio_samples = int(LIVE_MAX_AUDIO_S * SAMPLE_RATE)
+        self._arrived = asyncio.Event()
+        self._closed = False
+
+    def add_frame(self, data: Union[bytes, np.ndarray]):
+        """Queue a frame: JPEG/PNG bytes or a decoded BGR array"""
+        self.frames_received += 1
+        self._pending.append((data, time.monotonic() - self.started))
+        if len(self._pending) > LIVE_MAX_PENDING:
+            dropped = len(self._pending) - LIVE_MAX_PENDING
+            del self._pending[:dropped]
+            self.frames_dropped += dropped
+            LIVE_FRAMES.inc(dropped, outcome="dropped")
+        self._arrived.set()
+
+    def add_audio(self, samples: np.ndarray):
+        """Append 16 kHz mono int16 PCM from the microphone; beyond LIVE_MAX_AUDIO_S it is dropped"""
+        room = self.max_audio_samples - self.audio_samples
+        if len(samples) > room:
+            self.audio_samples_dropped += len(samples) - max(0, room)
+            samples = samples[:max(0, room)]
+        if len(samples):
+            self._audio.append(samples)
+            self.audio_samples += len(samples)
+
+    def _infer(self, pending: List[Tuple[Union[bytes, np.ndarray], float]]):
+        frames, timestamps = [], []
+        for data, timestamp in pending:
+            if isinstance(data, np.ndarray):
+                frame = cv2.resize(data, (self.imgsz, self.imgsz))
+            else:
+                frame = decode_frame(data, self.imgsz)
+            if frame is None:
+                self.frames_invalid += 1
+                LIVE_FRAMES.inc(outcome="invalid")
+                continue
+            frames.append(frame)
+            timestamps.append(timestamp)
+        if frames:
+            model = model_registry.pose_model()
+            started = time.perf_counter()
+            batch = sharding.infer_pose_batch(model, model_registry.device()["torch_device"], frames, self.imgsz)
+            telemetry.POSE_BATCH_SECONDS.observe(time.perf_counter() - started, source="live")
+            telemetry.POSE_BATCH_SIZE.observe(len(frames), source="live")
+            self.accumulator.add_batch(batch, timestamps)
+            LIVE_FRAMES.inc(len(frames), outcome="analyzed")
+
+    async def process_pending(self):
+        # Always goes through the executor, so it also waits for a batch still in flight
+        pending, self._pending = self._pending, []
+        self._arrived.clear()
+        await asyncio.get_running_loop().run_in_executor(_inference, self._infer, pending)
+
+    async def run(self, send: Callable[[Dict], Awaitable[None]]):
+        """Process frames as they arrive and push rolling metrics every LIVE_UPDATE_S until closed"""
+        last_update = time.monotonic()
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout=LIVE_UPDATE_S)
+            except asyncio.TimeoutError:
+                pass
+            await self.process_pending()
+            if time.monotonic() - last_update >= LIVE_UPDATE_S and len(self.accumulator):
+                last_update = time.monotonic()
+                await send(self.snapshot())
+
+    def snapshot(self) -> Dict:
+        return {"type": "live_metrics", "window_s": LIVE_WINDOW_S, **self.accumulator.window(LIVE_WINDOW_S)}
+
+    async def finish(self) -> Dict:
+        """Score whatever is still buffered and return the end-of-session report"""
+        self._closed = True
+        await self.process_pending()
+        report = self.accumulator.report()
+        if not len(self.accumulator):
+            report["session_analysis"]["note"] = "No frames received. No video analysis performed."
+        if self._audio:
+            # Straight from the received PCM; nothing is written to disk
+            report["audio_transcription"] = await asyncio.get_running_loop().run_in_executor(None, self._transcribe)
+        report["live"] = {
+            "profile": self.profile,
+            "duration_s": round(time.monotonic() - self.started, 2),
+            "frames_received": self.frames_received,
+            "frames_analyzed": len(self.accumulator),
+            "frames_dropped": self.frames_dropped,
+            "frames_invalid": self.frames_invalid,
+            "audio_s": round(self.audio_samples / SAMPLE_RATE, 2),
+            "audio_dropped_s": round(self.audio_samples_dropped / SAMPLE_RATE, 2),
+        }
+        return {"type": "live_report", **report}
+
+    def _transcribe(self) -> Dict:
+        audio = np.concatenate(self._audio).astype(np.float32) / 32768.0
+        return SessionScorer()._transcribe_audio(audio, settings=profiles.get_profile(self.profile))
+
+    def close(self):
+        self._closed = True
+        self._arrived.set()
@@ -0,0 +1,315 @@
+import abc
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from . import model_registry
+from . import telemetry
+from .llm_client import LLMClient, pooled_http_client, shared_client
+
+load_dotenv()
+
+# Backend configuration (override via .env)
+#   LLM_BACKENDS        enabled backends: groq, openai (any OpenAI-compatible server), local (in-process)
+#   LLM_ROUTES          per turn kind, backends in the order they are tried, e.g.
+#                       "short_turn=local,groq;turn=groq,local" - kinds left out use LLM_BACKENDS order
+#   LLM_LATENCY_BUDGET_S  time to first token after which the next backend in the route is started too
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+OPENAI_BASE_URL = os.getenv("OPENAI_COMPAT_BASE_URL", "http://127.0.0.1:8000/v1")
+OPENAI_MODEL = os.getenv("OPENAI_COMPAT_MODEL", "llama-3.1-8b-instruct")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+LLM_BACKENDS = [name.strip() for name in os.getenv("LLM_BACKENDS", "groq").split(",") if name.strip()]
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+LLM_LATENCY_BUDGET_S = float(os.getenv("LLM_LATENCY_BUDGET_S", "2.0"))
+LLM_SHORT_TURN_CHARS = int(os.getenv("LLM_SHORT_TURN_CHARS", "80"))  # User turns up to this long are "short_turn"
+
+FAILURES_BEFORE_COOLDOWN = 3
+BACKEND_COOLDOWN_S = 30.0  # A backend that keeps failing is skipped for this long
+
+TURN_KINDS = ("greeting", "short_turn", "turn")
+
+LLM_ROUTED = telemetry.counter("llm_routed_total", "LLM replies by the backend that served them", ["backend", "kind"])
+LLM_FAILOVERS = telemetry.counter("llm_failovers_total", "LLM requests moved on to the next backend",
+                                  ["backend", "reason"])
+
+
+class UnknownBackend(ValueError):
+    pass
+
+
+class LLMBackend(abc.ABC):
+    """A chat model that streams text deltas; `stream_chat` is all the router needs"""
+
+    name = "backend"
+    model = ""
+
+    @abc.abstractmethod
+    def stream_chat(self, messages: List[Dict], max_tokens: int = 80) -> AsyncIterator[str]:
+        """Stream the reply to `messages` as text deltas"""
+
+    def describe(self) -> Dict:
+        return {"model": self.model}
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, model: str = GROQ_MODEL, client: Optional[LLMClient] = None):
+        self.model = model
+        self.client = client or shared_client()
+
+    def stream_chat(self, messages: List[Dict], max_tokens: int = 80) -> AsyncIterator[str]:
+        return self.client.stream_chat(messages, model=self.model, max_tokens=max_tokens)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server speaking the OpenAI chat API (vLLM, llama.cpp server, Ollama, LM Studio...)"""
+
+    name = "openai"
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, model: str = OPENAI_MODEL, api_key: Optional[str] = None):
+        import openai
+
+        self.base_url = base_url
+        self.model = model
+        sdk = openai.AsyncOpenAI(base_url=base_url, api_key=api_key or os.getenv("OPENAI_COMPAT_API_KEY", "local"),
+                                 max_retries=0, http_client=pooled_http_client())
+        # Same pooling, queueing and retry rules as the Groq client
+        self.client = LLMClient(sdk, retryable=(openai.RateLimitError, openai.APIConnectionError,
+                                                openai.InternalServerError))
+
+    def stream_chat(self, messages: List[Dict], max_tokens: int = 80) -> AsyncIterator[str]:
+        return self.client.stream_chat(messages, model=self.model, max_tokens=max_tokens)
+
+    def describe(self) -> Dict:
+        return {"model": self.model, "base_url": self.base_url}
+
+
+# In-process generation runs one reply at a time, off the event loop
+_generation = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-llm")
+
+
+class LocalTransformersBackend(LLMBackend):
+    """Small instruction-tuned model run in this process with transformers
+
+    Loaded through the model registry on first use. Text is streamed back
+    as it is generated; a reply whose consumer goes away stops generating.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_LLM_MODEL):
+        self.model = model
+
+    def _load(self):
+        def load():
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(self.model)
+            llm = AutoModelForCausalLM.from_pretrained(self.model, torch_dtype="auto")
+            return tokenizer, llm.to(model_registry.device()["torch_device"]).eval()
+
+        return model_registry.registry.get(f"llm:{self.model}", load)
+
+    def _generate(self, messages: List[Dict], max_tokens: int, emit, stop: threading.Event):
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+        tokenizer, llm = self._load()
+
+        class Emitter(TextStreamer):
+            def on_finalized_text(self, text: str, stream_end: bool = False):
+                if text:
+                    emit(text)
+
+        class Stop(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs) -> bool:
+                return stop.is_set()
+
+        inputs = tokenizer.apply_chat_template(messages, add_generation_prompt=True, return_tensors="pt")
+        llm.generate(inputs.to(llm.device), max_new_tokens=max_tokens, do_sample=True, temperature=0.7,
+                     streamer=Emitter(tokenizer, skip_prompt=True, skip_special_tokens=True),
+                     stopping_criteria=StoppingCriteriaList([Stop()]),
+                     pad_token_id=tokenizer.eos_token_id)
+
+    async def stream_chat(self, messages: List[Dict], max_tokens: int = 80) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def emit(text: str):
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        def run():
+            try:
+                self._generate(messages, max_tokens, emit, stop)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        generation = loop.run_in_executor(_generation, run)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await generation  # Surface generation errors
+        finally:
+            stop.set()
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "openai": OpenAICompatibleBackend,
+    "local": LocalTransformersBackend,
+}
+
+
+class BackendHealth:
+    """Consecutive failures of one backend; after a run of them it sits out a cooldown"""
+
+    def __init__(self):
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def succeeded(self):
+        self.failures = 0
+
+    def failed(self):
+        self.failures += 1
+        if self.failures >= FAILURES_BEFORE_COOLDOWN:
+            self.cooldown_until = time.monotonic() + BACKEND_COOLDOWN_S
+            self.failures = 0
+
+
+def parse_routes(spec: str, backends: List[str]) -> Dict[str, List[str]]:
+    """"kind=a,b;kind=c" to {kind: [backend, ...]}; unnamed kinds get every backend in order"""
+    routes = {kind: list(backends) for kind in TURN_KINDS}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        kind, _, names = entry.partition("=")
+        kind = kind.strip()
+        order = [name.strip() for name in names.split(",") if name.strip()]
+        if kind not in TURN_KINDS:
+            raise ValueError(f"Unknown turn kind '{kind}' in LLM_ROUTES; choose from {', '.join(TURN_KINDS)}")
+        unknown = set(order) - set(backends)
+        if unknown:
+            raise UnknownBackend(f"LLM_ROUTES uses backends not in LLM_BACKENDS: {', '.join(sorted(unknown))}")
+        routes[kind] = order
+    return routes
+
+
+class LLMRouter:
+    """Sends each turn to the first healthy backend of its route, failing over down the route
+
+    A backend that errors before its first token is replaced by the next one.
+    One that has produced nothing within the latency budget keeps running,
+    but the next backend is started alongside and whichever speaks first
+    answers. Once text is streaming the turn stays on that backend.
+    """
+
+    def __init__(self, backends: Dict[str, LLMBackend], routes: Optional[Dict[str, List[str]]] = None,
+                 latency_budget_s: float = LLM_LATENCY_BUDGET_S):
+        self.backends = backends
+        self.routes = routes or parse_routes("", list(backends))
+        self.latency_budget_s = latency_budget_s
+        self.health = {name: BackendHealth() for name in backends}
+
+    @classmethod
+    def from_env(cls) -> "LLMRouter":
+        unknown = set(LLM_BACKENDS) - set(BACKENDS)
+        if unknown:
+            raise UnknownBackend(f"Unknown LLM backends {', '.join(sorted(unknown))}; choose from {', '.join(BACKENDS)}")
+        backends = {name: BACKENDS[name]() for name in LLM_BACKENDS}
+        return cls(backends, parse_routes(LLM_ROUTES, LLM_BACKENDS))
+
+    def route(self, kind: str) -> List[LLMBackend]:
+        """Backends to try for `kind`, those cooling down last (so a turn is never left without one)"""
+        order = self.routes.get(kind) or list(self.backends)
+        healthy = [name for name in order if self.health[name].available]
+        return [self.backends[name] for name in healthy + [name for name in order if name not in healthy]]
+
+    def describe(self) -> Dict:
+        return {
+            "backends": {name: backend.describe() for name, backend in self.backends.items()},
+            "routes": self.routes,
+            "latency_budget_s": self.latency_budget_s,
+            "cooling_down": [name for name, health in self.health.items() if not health.available],
+        }
+
+    async def stream_chat(self, messages: List[Dict], kind: str = "turn", max_tokens: int = 80) -> AsyncIterator[str]:
+        candidates = self.route(kind)
+        pending: Dict[asyncio.Task, tuple] = {}
+        next_index = 0
+
+        def start_next():
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            stream = backend.stream_chat(messages, max_tokens).__aiter__()
+            pending[asyncio.ensure_future(stream.__anext__())] = (backend, stream)
+
+        start_next()
+        winner = None
+        error: Optional[BaseException] = None
+        try:
+            while winner is None and pending:
+                # Only a backend left to fall back on makes waiting on the budget worthwhile
+                timeout = self.latency_budget_s if next_index < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    for backend, _ in pending.values():
+                        LLM_FAILOVERS.inc(backend=backend.name, reason="latency")
+                    start_next()
+                    continue
+                for task in done:
+                    backend, stream = pending.pop(task)
+                    if task.exception() is None or isinstance(task.exception(), StopAsyncIteration):
+                        winner = (backend, stream, None if task.exception() else task.result())
+                        break
+                    error = task.exception()
+                    print(f"LLM backend {backend.name} failed: {error}")
+                    self.health[backend.name].failed()
+                    LLM_FAILOVERS.inc(backend=backend.name, reason="error")
+                if winner is None and not pending and next_index < len(candidates):
+                    start_next()
+        finally:
+            # Attempts that lost the race (or every attempt, if we were cancelled); being slower is not a failure
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for _, stream in pending.values():
+                await stream.aclose()
+
+        if winner is None:
+            raise error
+
+        backend, stream, first = winner
+        self.health[backend.name].succeeded()
+        LLM_ROUTED.inc(backend=backend.name, kind=kind)
+        if first is None:
+            return
+        try:
+            yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+
+
+_router: Optional[LLMRouter] = None
+
+
+def shared_router() -> LLMRouter:
+    """Process-wide router built from LLM_BACKENDS and LLM_ROUTES"""
+    global _router
+    if _router is None:
+        _router = LLMRouter.from_env()
+    return _router
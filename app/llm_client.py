@@ -0,0 +1,286 @@
+import asyncio
+import collections
+import os
+import random
+import time
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from groq import APIConnectionError, AsyncGroq, InternalServerError, RateLimitError
+
+from . import telemetry
+
+load_dotenv()
+
+# LLM client configuration (override via .env); GROQ_BASE_URL points the client at another server
+#   LLM_MAX_CONCURRENCY   completions in flight at once; further requests wait in FIFO order
+#   LLM_MAX_CONNECTIONS   HTTP connections kept in the shared pool
+#   LLM_MAX_RETRIES       retries of a failed or rate-limited request before the error reaches the user
+#   LLM_HEDGE             1 = send a second request when the first has no token after the recent p95
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.25"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_S = float(os.getenv("LLM_HEDGE_MIN_S", "0.3"))  # Never hedge sooner than this
+
+HEDGE_PERCENTILE = 95
+HEDGE_WINDOW = 200  # Recent first-token latencies the hedge threshold is taken from
+HEDGE_MIN_SAMPLES = 20  # No hedging until this many latencies have been seen
+
+LLM_TTFT_SECONDS = telemetry.histogram("llm_time_to_first_token_seconds", "LLM time to first streamed token", ["model"])
+LLM_RESPONSE_SECONDS = telemetry.histogram("llm_response_seconds", "LLM time to the complete reply", ["model"])
+LLM_REQUESTS = telemetry.counter("llm_requests_total", "LLM completion requests", ["model", "status"])
+LLM_QUEUE_SECONDS = telemetry.histogram("llm_queue_wait_seconds", "Time LLM requests waited for a concurrency slot")
+LLM_ATTEMPT_SECONDS = telemetry.histogram("llm_attempt_seconds", "Time to first token or failure of each LLM attempt",
+                                          ["model", "outcome"])
+LLM_RETRIES = telemetry.counter("llm_retries_total", "LLM requests retried", ["model", "reason"])
+LLM_HEDGES = telemetry.counter("llm_hedged_requests_total", "Hedged second LLM requests", ["result"])
+
+# Errors worth retrying with the Groq SDK; other OpenAI-style SDKs pass their own equivalents
+RETRYABLE = (RateLimitError, APIConnectionError, InternalServerError)
+
+# (open stream, its iterator, first text delta or None for an empty reply)
+Opened = Tuple[object, AsyncIterator, Optional[str]]
+
+
+class FairLimiter:
+    """Concurrency limit whose waiters are served strictly in arrival order"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter  # The releasing request hands its slot over directly
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Slot was handed over just as we were cancelled
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def try_acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def _delta(chunk) -> Optional[str]:
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content or None
+
+
+def _rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header), if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def pooled_http_client() -> httpx.AsyncClient:
+    """HTTP client for an LLM SDK: one keep-alive pool of LLM_MAX_CONNECTIONS"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+        timeout=LLM_TIMEOUT_S,
+    )
+
+
+class LLMClient:
+    """Shared chat-completion client: one connection pool, a fair concurrency limit,
+    rate-limit-aware retries and optional hedged requests
+
+    Retries and hedging cover the time before the first token; once text has
+    been streamed to the user a failure is raised rather than repeated.
+    `client` may be any SDK with the OpenAI streaming interface (Groq by
+    default); `retryable` names its transient error types.
+    """
+
+    def __init__(self, client: Optional[AsyncGroq] = None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, hedge: bool = LLM_HEDGE, retryable: Tuple[type, ...] = RETRYABLE):
+        self.client = client or AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=0,  # Retried by stream_chat, which knows whether text has been streamed yet
+            timeout=LLM_TIMEOUT_S,
+            http_client=pooled_http_client(),
+        )
+        self.retryable = retryable
+        self.limiter = FairLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self._ttft: Deque[float] = collections.deque(maxlen=HEDGE_WINDOW)
+
+    def hedge_after_s(self) -> Optional[float]:
+        """Recent p95 time to first token, or None while hedging is off or there is too little data"""
+        if not self.hedge or len(self._ttft) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._ttft)
+        index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))
+        return max(LLM_HEDGE_MIN_S, ordered[index])
+
+    async def stream_chat(self, messages: List[Dict], model: str, max_tokens: int = 80) -> AsyncIterator[str]:
+        """Stream the reply's text deltas, holding one concurrency slot for the whole reply"""
+        started = time.perf_counter()
+        await self.limiter.acquire()
+        try:
+            LLM_QUEUE_SECONDS.observe(time.perf_counter() - started)
+            try:
+                stream, iterator, first = await self._open_with_retries(messages, model, max_tokens)
+            except Exception:
+                LLM_REQUESTS.inc(model=model, status="error")
+                raise
+
+            try:
+                if first is not None:
+                    LLM_TTFT_SECONDS.observe(time.perf_counter() - started, model=model)
+                    yield first
+                async for chunk in iterator:
+                    delta = _delta(chunk)
+                    if delta:
+                        yield delta
+            except Exception:
+                LLM_REQUESTS.inc(model=model, status="error")
+                raise
+            finally:
+                await stream.close()
+            LLM_REQUESTS.inc(model=model, status="ok")
+            LLM_RESPONSE_SECONDS.observe(time.perf_counter() - started, model=model)
+        finally:
+            self.limiter.release()
+
+    async def _open(self, messages: List[Dict], model: str, max_tokens: int) -> Opened:
+        """Start one streamed completion and read up to its first text delta"""
+        started = time.perf_counter()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            iterator = stream.__aiter__()
+            first = None
+            try:
+                while first is None:
+                    first = _delta(await iterator.__anext__())
+            except StopAsyncIteration:
+                pass
+            except BaseException:
+                await stream.close()
+                raise
+        except asyncio.CancelledError:
+            LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, model=model, outcome="cancelled")
+            raise
+        except Exception as e:
+            outcome = "rate_limited" if _rate_limited(e) else "error"
+            LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+            raise
+
+        elapsed = time.perf_counter() - started
+        LLM_ATTEMPT_SECONDS.observe(elapsed, model=model, outcome="ok")
+        self._ttft.append(elapsed)
+        return stream, iterator, first
+
+    async def _open_with_retries(self, messages: List[Dict], model: str, max_tokens: int) -> Opened:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._open_hedged(messages, model, max_tokens)
+            except self.retryable as e:
+                if attempt == self.max_retries:
+                    raise
+                reason = "rate_limited" if _rate_limited(e) else type(e).__name__
+                LLM_RETRIES.inc(model=model, reason=reason)
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter, so rate-limited sessions do not retry in lockstep
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, LLM_BACKOFF_MAX_S))
+        return delay
+
+    async def _open_hedged(self, messages: List[Dict], model: str, max_tokens: int) -> Opened:
+        """Open a completion; past the hedge threshold a second copy races the first"""
+        primary = asyncio.create_task(self._open(messages, model, max_tokens))
+        threshold = self.hedge_after_s()
+        if threshold is None:
+            return await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+        except BaseException:
+            primary.cancel()
+            raise
+        # Only hedge with a free slot; queuing the copy behind other users would defeat its purpose
+        if done or not self.limiter.try_acquire():
+            return await primary
+
+        hedge = asyncio.create_task(self._open(messages, model, max_tokens))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    LLM_HEDGES.inc(result="won" if winner is hedge else "lost")
+                    pending |= done - {winner}  # A copy finishing in the same instant is closed below
+                    return winner.result()
+            # Both attempts failed; report the original request's error
+            LLM_HEDGES.inc(result="failed")
+            raise primary.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await self._close_losers(pending)
+            self.limiter.release()
+
+    @staticmethod
+    async def _close_losers(tasks):
+        """Wait out cancelled attempts, closing any stream that opened regardless"""
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, tuple):
+                await result[0].close()
+
+
+_shared: Optional[LLMClient] = None
+
+
+def shared_client() -> LLMClient:
+    """Process-wide client, so every conversation shares one pool and one concurrency limit"""
+    global _shared
+    if _shared is None:
+        _shared = LLMClient()
+    return _shared
@@ -1,19 +1,48 @@
-from fastapi import FastAPI, WebSocket, Request
+from fastapi import FastAPI, WebSocket, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import json
 import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+from . import llm_backends, response_cache
 from .session_manager import AISessionManager
-from .webrtc_handler import WebRTCHandler
-from .analysis.video_scorer import SessionScorer
+from .session_registry import SessionRegistry
+from .webrtc_handler import InvalidSignal, WebRTCHandler
+from .analysis.video_scorer import AnalysisCancelled, SessionScorer, upload_suffix
+from .analysis import profiles
+from .live_scoring import LiveScoringSession
+from .analysis_jobs import AnalysisJobManager
+from .result_cache import ResultCache
+from . import model_registry
+from . import telemetry
 from fastapi import UploadFile, File
 
+# Upload limits for /analyze-session
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "1024"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 app = FastAPI()
 
 # Mount static first
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the header before the body is parsed
+    if request.url.path in ("/analyze-session", "/analysis-jobs"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": f"Upload exceeds {MAX_UPLOAD_MB} MB limit"})
+    return await call_next(request)
+
 @app.get("/ui")
 async def home(request: Request):
     print("WebRTC UI endpoint hit!")
@@ -33,79 +62,341 @@ async def startup_event():
     print("Startup: Registered Routes:")
     for route in app.routes:
         print(f" - {route.path} [{route.methods if hasattr(route, 'methods') else 'WebSocket'}]")
+    asyncio.create_task(sweep_sessions())
+    # Eager model loading and warmup (PRELOAD_MODELS); lazy otherwise
+    await run_in_threadpool(model_registry.preload)
+
+async def sweep_sessions():
+    while True:
+        await asyncio.sleep(60)
+        session_registry.sweep()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await webrtc_handler.close_all()
+    job_manager.shutdown()
 
-session_manager = AISessionManager()
+# One LLM router (backends, their connection pools, limits and retries) shared by every conversation
+llm_router = llm_backends.shared_router()
+session_registry = SessionRegistry(lambda: AISessionManager(client=llm_router))
 webrtc_handler = WebRTCHandler()
-scorer = None
+result_cache = ResultCache()
+job_manager = AnalysisJobManager(result_cache=result_cache)
+latency_model = profiles.LatencyModel()
+
+# Scrape-time gauges for state owned by the objects above
+telemetry.gauge("websocket_connections", "Open conversation WebSockets").set_function(
+    session_registry.active_connections)
+telemetry.gauge("conversation_sessions", "Conversations held in memory").set_function(lambda: len(session_registry))
+
+def llm_limiters() -> Dict:
+    """Concurrency limiter of each configured LLM backend that has a client (the local backend has none)"""
+    return {name: backend.client.limiter for name, backend in llm_router.backends.items()
+            if getattr(backend, "client", None) is not None}
+
+telemetry.gauge("llm_requests_in_flight", "LLM completions holding a concurrency slot", ["backend"]).set_function(
+    lambda: {name: limiter.active for name, limiter in llm_limiters().items()})
+telemetry.gauge("llm_requests_queued", "LLM completions waiting for a concurrency slot", ["backend"]).set_function(
+    lambda: {name: limiter.waiting for name, limiter in llm_limiters().items()})
+telemetry.gauge("analysis_queue_depth", "Analysis jobs queued or running").set_function(job_manager.queue_depth)
+ANALYSIS_JOBS = telemetry.counter("analysis_jobs_total", "Finished analysis jobs", ["status"])
+ANALYSIS_CACHE_LOOKUPS = telemetry.counter("analysis_cache_lookups_total", "Result cache lookups", ["result"])
+LIVE_STREAMS = telemetry.gauge("live_scoring_streams", "Open live scoring WebSockets")
+telemetry.gauge("webrtc_peer_connections", "Open WebRTC peer connections").set_function(
+    lambda: len(webrtc_handler.peer_connections))
 
-def get_scorer():
-    global scorer
-    if scorer is None:
-        print("Initializing SessionScorer (GPU)...")
-        scorer = SessionScorer()
-        scorer = SessionScorer()
-    return scorer
 
 
+async def stream_ai_response(websocket: WebSocket, session_manager: AISessionManager, stream):
+    """Forward reply deltas as they arrive, then a final ai_response with the full text"""
+    parts = []
+    async for delta in stream:
+        parts.append(delta)
+        await websocket.send_text(json.dumps({
+            "type": "ai_response_delta",
+            "content": delta
+        }))
+    await websocket.send_text(json.dumps({
+        "type": "ai_response",
+        "content": "".join(parts),
+        "speak": True,
+        "final": True,
+        "ttft_ms": session_manager.last_ttft_ms
+    }))
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    
+
+    # Reconnecting clients pass their previous session_id to resume the conversation
+    session_id, session_manager, resumed = session_registry.acquire(websocket.query_params.get("session_id"))
+    await websocket.send_text(json.dumps({
+        "type": "session",
+        "session_id": session_id,
+        "resumed": resumed
+    }))
+
+    async def send(message):
+        await websocket.send_text(json.dumps(message))
+
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
+            session_registry.touch(session_id)
             
             if message["type"] == "start_session":
-                response = await session_manager.start_session(
+                await stream_ai_response(websocket, session_manager, session_manager.start_session_stream(
                     message["title"], 
                     message["description"]
-                )
-                await websocket.send_text(json.dumps({
-                    "type": "ai_response",
-                    "content": response,
-                    "speak": True
-                }))
+                ))
             
-            elif message["type"] == "user_message":
-                response = await session_manager.process_user_input(message["content"])
-                await websocket.send_text(json.dumps({
-                    "type": "ai_response",
-                    "content": response,
-                    "speak": True
-                }))
+            elif message["type"] in ("user_message", "voice_message"):
+                await stream_ai_response(websocket, session_manager,
+                                         session_manager.process_user_input_stream(message["content"]))
             
-            elif message["type"] == "voice_message":
-                response = await session_manager.process_user_input(message["content"])
-                await websocket.send_text(json.dumps({
-                    "type": "ai_response",
-                    "content": response,
-                    "speak": True
-                }))
+            elif message["type"] == "end_session":
+                # The conversation is gone, so this socket has nothing left to serve
+                session_registry.remove(session_id)
+                await websocket.close()
+                break
             
             elif message["type"] == "webrtc_offer":
-                answer = await webrtc_handler.handle_offer(message["sdp"])
+                # Camera and microphone tracks are scored as they arrive; rolling metrics come back here
+                try:
+                    answer = await webrtc_handler.handle_offer(session_id, message.get("sdp"), send,
+                                                               message.get("profile"))
+                except (profiles.UnknownProfile, InvalidSignal) as e:
+                    await send({"type": "webrtc_error", "detail": str(e)})
+                    continue
                 await websocket.send_text(json.dumps({
                     "type": "webrtc_answer",
                     "sdp": answer
                 }))
+
+            elif message["type"] == "ice_candidate":
+                try:
+                    await webrtc_handler.handle_ice_candidate(session_id, message.get("candidate"))
+                except InvalidSignal as e:
+                    await send({"type": "webrtc_error", "detail": str(e)})
+
+            elif message["type"] == "webrtc_end":
+                report = await webrtc_handler.finish_connection(session_id)
+                if report is not None:
+                    await send(report)
                 
     except Exception as e:
         print(f"WebSocket error: {e}")
-    # Remove the finally block that was causing double close
+    finally:
+        # Only detach here; closing the socket twice was the old double-close bug
+        session_registry.release(session_id)
+        await webrtc_handler.close_connection(session_id)
+
+@app.websocket("/ws/score")
+async def live_score_endpoint(websocket: WebSocket):
+    """Live scoring: binary messages are camera frames (JPEG/PNG), {"type": "end"} asks for the report"""
+    await websocket.accept()
+    try:
+        live = LiveScoringSession(websocket.query_params.get("profile"))
+    except profiles.UnknownProfile as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    async def send(message):
+        await websocket.send_text(json.dumps(message))
+
+    worker = asyncio.create_task(live.run(send))
+    LIVE_STREAMS.inc()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if worker.done():
+                worker.result()  # Surface inference errors instead of silently dropping frames
+            if message.get("bytes"):
+                live.add_frame(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                # Report straight from the accumulated metrics; nothing is re-analyzed
+                live.close()
+                await worker
+                await send(await live.finish())
+                await websocket.close()
+                break
+    except Exception as e:
+        print(f"Live scoring error: {e}")
+    finally:
+        LIVE_STREAMS.dec()
+        live.close()
+        if not worker.done():
+            worker.cancel()
+
+async def save_upload(video: UploadFile) -> Tuple[str, str]:
+    """Stream an upload to a temp file in fixed-size chunks, enforcing the size limit
+
+    Returns the temp file path and the SHA-256 of the content, hashed as it streams in.
+    """
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=upload_suffix(video.content_type))
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        while True:
+            chunk = await video.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_MB} MB limit")
+            digest.update(chunk)
+            await run_in_threadpool(tmp_file.write, chunk)
+        tmp_file.close()
+        if total == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        return tmp_file.name, digest.hexdigest()
+    except BaseException:
+        tmp_file.close()
+        os.unlink(tmp_file.name)
+        raise
+
+def resolve_profile(profile: Optional[str], deadline_s: Optional[float], duration_s: Optional[float]) -> str:
+    """Requested analysis profile, or the one expected to meet `deadline_s`"""
+    if profile is None and deadline_s is not None:
+        profile = latency_model.choose(duration_s, deadline_s)
+    try:
+        return profiles.get_profile(profile)["name"]
+    except profiles.UnknownProfile as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def submit_upload(video: UploadFile, no_cache: bool, profile: Optional[str] = None,
+                        deadline_s: Optional[float] = None) -> Tuple[str, bool]:
+    """Start an analysis job for an upload, or answer it from the result cache
+
+    Returns (job_id, cache_hit). `no_cache` skips the lookup; the fresh
+    result still replaces the cached one. Without an explicit `profile`,
+    `deadline_s` picks the most thorough profile expected to finish in time.
+    """
+    content_type = video.content_type or "video/mp4"
+    video_path, content_sha256 = await save_upload(video)
+    try:
+        duration_s = await run_in_threadpool(profiles.media_duration, video_path)
+        profile = resolve_profile(profile, deadline_s, duration_s)
+    except BaseException:
+        os.unlink(video_path)
+        raise
+    cache_key = ResultCache.key(content_sha256, content_type, profile=profile)
+
+    if not no_cache:
+        started = time.perf_counter()
+        cached = await run_in_threadpool(result_cache.get, cache_key)
+        ANALYSIS_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            os.unlink(video_path)
+            cached["cache_hit"] = True
+            # The stored timings describe the run that filled the cache, not this request
+            cached["analysis_profile"].pop("elapsed_s", None)
+            cached["timing"] = {"cache_hit": True, "total_s": round(time.perf_counter() - started, 3)}
+            return job_manager.complete(cached), True
+
+    job_id = job_manager.submit(video_path, content_type, cache_key=cache_key, profile=profile)
+    job_manager.future(job_id).add_done_callback(lambda future: record_analysis(future, profile, duration_s))
+    return job_id, False
+
+def record_analysis(future, profile: str, duration_s: Optional[float]):
+    if future.cancelled() or isinstance(future.exception(), AnalysisCancelled):
+        ANALYSIS_JOBS.inc(status="cancelled")
+        return
+    if future.exception() is not None:
+        ANALYSIS_JOBS.inc(status="failed")
+        return
+    ANALYSIS_JOBS.inc(status="completed")
+    result = future.result()
+    elapsed_s = result["analysis_profile"]["elapsed_s"]
+    # Real run times refine the estimates deadline mode chooses from
+    latency_model.observe(profile, duration_s, elapsed_s)
+    # Worker processes keep no metrics of their own; their timing breakdown is folded in here
+    telemetry.record_analysis(result.get("timing", {}), profile, elapsed_s)
+
+def optional_fields(result: Dict, timeline: bool, timing: bool) -> Dict:
+    # Results always carry the timeline and timing breakdown; only return them when asked for
+    hidden = {name for name, wanted in (("timeline", timeline), ("timing", timing)) if not wanted}
+    return {key: value for key, value in result.items() if key not in hidden}
 
 @app.post("/analyze-session")
-async def analyze_session(video: UploadFile = File(...)):
-    current_scorer = get_scorer()
-    video_bytes = await video.read()
-    results = current_scorer.analyze_video(video_bytes, video.content_type)
-    return results
+async def analyze_session(video: UploadFile = File(...), no_cache: bool = False,
+                          profile: Optional[str] = None, deadline_s: Optional[float] = None,
+                          timeline: bool = False, timing: bool = False):
+    # Runs in the worker pool so the event loop keeps serving /ws and /health
+    job_id, _ = await submit_upload(video, no_cache, profile, deadline_s)
+    try:
+        return optional_fields(await asyncio.wrap_future(job_manager.future(job_id)), timeline, timing)
+    except asyncio.CancelledError:
+        job_manager.cancel(job_id)
+        raise
+    finally:
+        # Nobody can poll for this job, so it is not kept for the result TTL
+        job_manager.discard(job_id)
+
+@app.post("/analysis-jobs", status_code=202)
+async def submit_analysis_job(video: UploadFile = File(...), no_cache: bool = False,
+                              profile: Optional[str] = None, deadline_s: Optional[float] = None):
+    job_id, cache_hit = await submit_upload(video, no_cache, profile, deadline_s)
+    return {**job_manager.status(job_id), "cache_hit": cache_hit}
+
+@app.get("/analysis-jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return status
+
+@app.get("/analysis-jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str, timeline: bool = False, timing: bool = False):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if status["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    return optional_fields(job_manager.result(job_id), timeline, timing)
+
+@app.delete("/analysis-jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    if job_manager.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    job_manager.cancel(job_id)
+    return job_manager.status(job_id)
 
 @app.get("/scoring-formula")
 def get_scoring_formula():
-    current_scorer = get_scorer()
-    return current_scorer.get_formula_info()
+    return SessionScorer.get_formula_info()
+
+@app.get("/analysis-profiles")
+def get_analysis_profiles():
+    return {
+        "default": profiles.DEFAULT_PROFILE,
+        "profiles": {name: profiles.get_profile(name) for name in profiles.available_profiles()},
+        "estimated_cost_per_s": latency_model.stats(),
+    }
+
+@app.get("/llm-backends")
+def get_llm_backends():
+    return llm_router.describe()
+
+@app.get("/greeting-cache")
+def greeting_cache_stats():
+    return response_cache.greeting_cache().stats()
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(telemetry.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models")
+async def loaded_models():
+    # Models loaded in this (web) process; analysis workers hold their own copies
+    return {"device": model_registry.device(), "models": model_registry.registry.stats()}
+
+@app.get("/analysis-cache")
+async def analysis_cache_stats():
+    return result_cache.stats()
 
 
 
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Startup behaviour (override via .env)
+#   PRELOAD_MODELS  comma separated: pose, whisper, stt, tts, speaker - or "all"
+#   WARMUP_MODELS   run one dummy inference after loading (1/0)
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "")
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+
+SPEAKER_EMBEDDING_PATH = "models/speaker_embedding.npy"
+SPEAKER_EMBEDDING_INDEX = 7306  # cmu-arctic-xvectors validation split
+SPEAKER_EMBEDDING_DIM = 512
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _cuda_bytes() -> int:
+    try:
+        import torch
+        return torch.cuda.memory_allocated() if torch.cuda.is_available() else 0
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, so each one is loaded exactly once"""
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, name: str, loader: Callable[[], object], warmup: Optional[Callable[[object], None]] = None):
+        """Return the model called `name`, loading it with `loader` on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            if name in self._models:
+                return self._models[name]
+
+            print(f"Loading model {name}...")
+            rss_before, cuda_before = _rss_bytes(), _cuda_bytes()
+            started = time.perf_counter()
+            model = loader()
+            load_s = time.perf_counter() - started
+
+            stats = {
+                "load_s": round(load_s, 3),
+                "rss_mb": round((_rss_bytes() - rss_before) / 2**20, 1),
+                "cuda_mb": round((_cuda_bytes() - cuda_before) / 2**20, 1),
+                "warmup_s": None,
+            }
+            if warmup is not None and WARMUP_MODELS:
+                started = time.perf_counter()
+                try:
+                    warmup(model)
+                    stats["warmup_s"] = round(time.perf_counter() - started, 3)
+                except Exception as e:
+                    print(f"Warmup of {name} failed: {e}")
+
+            print(f"Model {name} ready in {load_s:.1f}s")
+            self._stats[name] = stats
+            self._models[name] = model
+            return model
+
+    def register(self, name: str, model: object):
+        """Install an already-built model under `name` (e.g. a stub for benchmarks)"""
+        with self._guard:
+            self._models[name] = model
+            self._stats[name] = {"load_s": 0.0, "rss_mb": 0.0, "cuda_mb": 0.0, "warmup_s": None}
+
+    def loaded(self) -> List[str]:
+        return list(self._models)
+
+    def stats(self) -> Dict[str, Dict]:
+        return dict(self._stats)
+
+
+registry = ModelRegistry()
+
+_device = None
+
+
+def device() -> Dict:
+    """Inference device shared by every model in this process"""
+    global _device
+    if _device is None:
+        from .analysis.device import select_device
+        _device = select_device()
+        if _device["type"] == "cuda":
+            import torch
+            print(f"Using GPU {_device['index']}: {_device['name']}")
+            torch.cuda.set_device(_device["index"])
+            os.environ['CUDA_VISIBLE_DEVICES'] = str(_device["index"])
+        else:
+            from .analysis.device import cpu_threads
+            print(f"Using CPU inference ({cpu_threads()} threads)")
+    return _device
+
+
+def pose_model():
+    from .analysis.device import load_pose_model, POSE_IMGSZ
+
+    def warmup(model):
+        import numpy as np
+        model([np.zeros((POSE_IMGSZ, POSE_IMGSZ, 3), dtype=np.uint8)], verbose=False,
+              imgsz=POSE_IMGSZ, device=device()["torch_device"])
+
+    return registry.get("pose", lambda: load_pose_model(device()), warmup)
+
+
+def whisper_model(model_size: Optional[str] = None):
+    """faster-whisper model used for session transcription"""
+    from .analysis.device import load_whisper_model
+
+    model_size = model_size or os.getenv("WHISPER_MODEL", "large-v3")
+
+    def warmup(model):
+        import numpy as np
+        segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+        list(segments)
+
+    return registry.get(f"faster-whisper:{model_size}", lambda: load_whisper_model(device(), model_size), warmup)
+
+
+def stt_model(model_size: str = "base"):
+    """openai-whisper model used for conversational speech-to-text"""
+    def load():
+        import whisper
+        return whisper.load_model(model_size, device=device()["torch_device"])
+
+    return registry.get(f"openai-whisper:{model_size}", load)
+
+
+def tts_models():
+    """(processor, SpeechT5 model, HiFi-GAN vocoder)"""
+    def load():
+        from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
+        from .voice_service import TTS_MODEL_PATH, TTS_VOCODER_PATH
+        torch_device = device()["torch_device"]
+        return (
+            SpeechT5Processor.from_pretrained(TTS_MODEL_PATH),
+            SpeechT5ForTextToSpeech.from_pretrained(TTS_MODEL_PATH).to(torch_device),
+            SpeechT5HifiGan.from_pretrained(TTS_VOCODER_PATH).to(torch_device),
+        )
+
+    return registry.get("speecht5", load)
+
+
+def fetch_speaker_embedding(path: str = SPEAKER_EMBEDDING_PATH) -> str:
+    """Regenerate the committed speaker x-vector at `path` from the cmu-arctic-xvectors dataset"""
+    import numpy as np
+    from datasets import load_dataset
+
+    embeddings_dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
+    xvector = np.asarray(embeddings_dataset[SPEAKER_EMBEDDING_INDEX]["xvector"], dtype=np.float32)
+    if xvector.shape != (SPEAKER_EMBEDDING_DIM,):
+        raise ValueError(f"Expected a {SPEAKER_EMBEDDING_DIM}-float x-vector, got shape {xvector.shape}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, xvector)
+    return path
+
+
+def speaker_embedding():
+    """Speaker x-vector as a (1, 512) tensor, read from the file committed under models/
+
+    Nothing is downloaded while the server runs; `python -m app.model_registry
+    --fetch-speaker-embedding` regenerates the file.
+    """
+    def load():
+        import numpy as np
+        import torch
+
+        if not os.path.exists(SPEAKER_EMBEDDING_PATH):
+            raise FileNotFoundError(f"{SPEAKER_EMBEDDING_PATH} is missing; regenerate it with "
+                                    "`python -m app.model_registry --fetch-speaker-embedding`")
+        xvector = np.load(SPEAKER_EMBEDDING_PATH)
+        return torch.tensor(xvector).unsqueeze(0).to(device()["torch_device"])
+
+    return registry.get("speaker-embedding", load)
+
+
+def preload(names: Optional[str] = PRELOAD_MODELS):
+    """Eagerly load (and warm up) the models listed in PRELOAD_MODELS"""
+    wanted = {name.strip() for name in (names or "").split(",") if name.strip()}
+    if "all" in wanted:
+        wanted = {"pose", "whisper", "stt", "tts", "speaker"}
+    loaders = {
+        "pose": pose_model,
+        "whisper": whisper_model,
+        "stt": stt_model,
+        "tts": tts_models,
+        "speaker": speaker_embedding,
+    }
+    for name in sorted(wanted):
+        if name in loaders:
+            loaders[name]()
+        else:
+            print(f"Unknown model in PRELOAD_MODELS: {name}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m app.model_registry",
+                                     description="Regenerate model files committed under models/")
+    parser.add_argument("--fetch-speaker-embedding", action="store_true",
+                        help=f"Download the TTS speaker x-vector to {SPEAKER_EMBEDDING_PATH}")
+    args = parser.parse_args()
+    if not args.fetch_speaker_embedding:
+        parser.error("nothing to do; pass --fetch-speaker-embedding")
+    print(f"Saved {fetch_speaker_embedding()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from . import telemetry
+
+load_dotenv()
+
+# Cache limits (override via .env); GREETING_CACHE_ITEMS=0 turns the cache off
+GREETING_CACHE_ITEMS = int(os.getenv("GREETING_CACHE_ITEMS", "512"))
+GREETING_CACHE_VARIANTS = int(os.getenv("GREETING_CACHE_VARIANTS", "3"))
+GREETING_CACHE_TTL_S = float(os.getenv("GREETING_CACHE_TTL_S", "86400"))
+
+GREETING_LOOKUPS = telemetry.counter("greeting_cache_lookups_total", "Session greetings by response cache outcome",
+                                     ["result"])
+
+
+def normalize(text: str) -> str:
+    """Case and whitespace differences do not change what the model is asked"""
+    return " ".join((text or "").split()).casefold()
+
+
+class ResponseCache:
+    """Generated replies per prompt key, several variants each, with TTL and LRU eviction
+
+    A key is only served from once it holds `variants` replies; until then
+    lookups miss, so the first sessions on a topic each generate (and store)
+    a reply and later ones pick among them at random. A repeated reply still
+    counts towards filling the key, so a model that always words a greeting
+    the same way is cached after `variants` sessions all the same.
+    """
+
+    def __init__(self, max_items: int = GREETING_CACHE_ITEMS, variants: int = GREETING_CACHE_VARIANTS,
+                 ttl_s: float = GREETING_CACHE_TTL_S):
+        self.max_items = max_items
+        self.variants = max(1, variants)
+        self.ttl_s = ttl_s
+        # key -> [(reply, stored_at)], least recently used key first
+        self._entries: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\0".join(normalize(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _fresh(self, key: str) -> List[Tuple[str, float]]:
+        """Variants of `key` still inside the TTL, dropping expired ones"""
+        variants = self._entries.get(key)
+        if variants is None:
+            return []
+        cutoff = time.monotonic() - self.ttl_s
+        variants[:] = [variant for variant in variants if variant[1] >= cutoff]
+        if not variants:
+            del self._entries[key]
+        return variants
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        variants = self._fresh(key)
+        if len(variants) < self.variants:
+            self.misses += 1
+            GREETING_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        GREETING_LOOKUPS.inc(result="hit")
+        return random.choice(variants)[0]
+
+    def put(self, key: str, reply: str):
+        reply = reply.strip()
+        if not self.enabled or not reply:
+            return
+        variants = self._fresh(key)
+        variants.append((reply, time.monotonic()))
+        del variants[:-self.variants]  # Sessions that missed at the same moment may overfill a key
+        self._entries[key] = variants
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "keys": len(self._entries),
+            "replies": sum(len(variants) for variants in self._entries.values()),
+            "variants_per_key": self.variants,
+            "ttl_s": self.ttl_s,
+        }
+
+
+_greetings: Optional[ResponseCache] = None
+
+
+def greeting_cache() -> ResponseCache:
+    """Process-wide greeting cache shared by every conversation"""
+    global _greetings
+    if _greetings is None:
+        _greetings = ResponseCache()
+    return _greetings
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Cache configuration (override via .env)
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "cache/results.sqlite3")
+RESULT_CACHE_MB = float(os.getenv("RESULT_CACHE_MB", "512"))
+
+# Bump when scoring logic changes so stale results are never served
+RESULT_CACHE_VERSION = 6
+
+
+def analysis_config(profile: Optional[str] = None) -> Dict:
+    """Settings that change an analysis result for the same input bytes"""
+    from .analysis.adaptive_sampler import ADAPTIVE_SAMPLING
+    from .analysis.device import POSE_WEIGHTS
+    from .analysis.profiles import get_profile
+    from .analysis.transcription import TRANSCRIBE_CHUNK_S
+
+    settings = get_profile(profile)
+    return {
+        "version": RESULT_CACHE_VERSION,
+        "profile": settings["name"],
+        "pose": POSE_WEIGHTS,
+        "imgsz": settings["imgsz"],
+        "whisper": settings["whisper_model"],
+        "beam_size": settings["beam_size"],
+        "analysis_fps": settings["analysis_fps"],
+        "full_metrics": settings["full_metrics"],
+        "adaptive": ADAPTIVE_SAMPLING,
+        "transcribe_chunk_s": TRANSCRIBE_CHUNK_S,
+    }
+
+
+class ResultCache:
+    """Content-addressed store of analysis results in SQLite with LRU size eviction"""
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_mb: float = RESULT_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Results are stored from the job pool's callback thread as well as the event loop
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def key(content_sha256: str, content_type: str, config: Optional[Dict] = None,
+            profile: Optional[str] = None) -> str:
+        config = analysis_config(profile) if config is None else config
+        has_video = bool(content_type) and "video" in content_type
+        material = json.dumps({"content": content_sha256, "video": has_video, "config": config}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cacheable(result: Dict, content_type: str) -> bool:
+        """Whether a finished result is complete enough to serve again for the same upload
+
+        A transcription that failed, or a video in which no frame was
+        analyzed, may be a one-off decode or model error; caching it would
+        repeat that error on every later upload of the file.
+        """
+        if "error" in result.get("audio_transcription", {}):
+            return False
+        if content_type and "video" in content_type:
+            counters = result.get("timing", {}).get("counters", {})
+            if not counters.get("frames_sampled"):
+                return False
+        return True
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, result: Dict):
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used results until back under the limit
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -1,26 +1,46 @@
-import asyncio
-import os
-from typing import Dict, List
-from groq import AsyncGroq
+import time
+from typing import AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 
+from .conversation_memory import ConversationMemory, PromptBuilder
+from .llm_backends import LLM_SHORT_TURN_CHARS, LLMRouter, shared_router
+from .response_cache import ResponseCache, greeting_cache
+
 load_dotenv()
 
+# Bump when the greeting prompt changes so cached greetings written for the old one are not served
+GREETING_PROMPT_VERSION = 1
+
+TURN_DESCRIPTION_CHARS = 1000  # Longest description repeated in every turn's system prompt
+
+MODE_CONTEXTS = {
+    "gitter": "Be exploratory and engaging. Ask thoughtful questions and share interesting insights.",
+    "bargain": "Be decisive and solution-oriented. Provide clear recommendations and help them make decisions.",
+}
+
 class AISessionManager:
-    def __init__(self):
-        self.client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+    def __init__(self, client: Optional[LLMRouter] = None, greetings: Optional[ResponseCache] = None):
+        # Every session shares one router, and through it the backends' connection pools and limits
+        self.client = client or shared_router()
+        self.greetings = greetings if greetings is not None else greeting_cache()
         self.session_title = ""
         self.session_description = ""
-        self.conversation_history: List[Dict] = []
+        self.memory = ConversationMemory()
+        self.prompts: Optional[PromptBuilder] = None
         self.session_active = False
         self.session_context = ""
         self.conversation_mode = "gitter"
+        self.last_ttft_ms: Optional[float] = None  # Time to first token of the latest reply
 
     async def start_session(self, title: str, description: str) -> str:
+        return "".join([delta async for delta in self.start_session_stream(title, description)])
+
+    async def start_session_stream(self, title: str, description: str) -> AsyncIterator[str]:
+        """Open a session, yielding the welcome message as it is generated"""
         self.session_title = title
         self.session_description = description.strip() if description else ""
         self.session_active = True
-        self.conversation_history = []
+        self.memory.clear()
         self.conversation_mode = "gitter"
 
         # Check if description is provided
@@ -51,15 +71,73 @@ ABSOLUTE RULES:
 
 Your sole purpose is discussing {title}. Introduce {title} and ask what aspects they'd like to explore. NO formatting."""
 
-        response = await self.client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "system", "content": self.session_context}],
-            max_tokens=80
-        )
+        # Turn prompts only change with the mode, so both are written once per session
+        self.prompts = PromptBuilder({
+            mode: self._turn_prompt(title, self._short_description(), mode_context)
+            for mode, mode_context in MODE_CONTEXTS.items()
+        })
+
+        # The greeting depends on nothing but the title and description, so popular topics are answered from cache
+        cache_key = self.greetings.key(str(GREETING_PROMPT_VERSION), title, self.session_description)
+        greeting = self.greetings.get(cache_key)
+        if greeting is not None:
+            self.last_ttft_ms = 0.0
+            yield greeting
+        else:
+            parts = []
+            async for delta in self._stream_completion([{"role": "system", "content": self.session_context}],
+                                                       "greeting"):
+                parts.append(delta)
+                yield delta
+            greeting = "".join(parts)
+            self.greetings.put(cache_key, greeting)
+
+        self.memory.append("assistant", greeting)
+
+    def _short_description(self) -> str:
+        description = self.session_description
+        if len(description) <= TURN_DESCRIPTION_CHARS:
+            return description
+        return description[:TURN_DESCRIPTION_CHARS].rsplit(" ", 1)[0] + "..."
+
+    @staticmethod
+    def _turn_prompt(title: str, description: str, mode_context: str) -> str:
+        """System prompt for user turns: the topic rules once, without the greeting instructions"""
+        role = "an AI session leader" if description else "an AI conversation partner"
+        topic = f"Your ONLY allowed topic is: {title}"
+        if description:
+            topic += f"\n\nDescription: {description}"
+        return f"""You are Alex, {role}. {topic}
+
+{mode_context}
+
+ABSOLUTE RULES:
+- You can ONLY discuss {title} - nothing else
+- NEVER discuss any other topic under any circumstances
+- If user asks about anything else, respond: "I'm here to focus specifically on {title}. Let's explore that topic instead. What aspect of {title} interests you?"
+
+Respond about {title} only. Keep it brief (2-3 sentences). NO formatting."""
+
+    async def _stream_completion(self, messages: List[Dict], kind: str) -> AsyncIterator[str]:
+        """Stream completion text deltas, recording time to first token (queueing, retries and failover included)
+
+        `kind` (greeting, short_turn or turn) picks the backend route.
+        """
+        started = time.perf_counter()
+        self.last_ttft_ms = None
 
-        ai_response = response.choices[0].message.content
-        self.conversation_history.append({"role": "assistant", "content": ai_response})
-        return ai_response
+        async for delta in self.client.stream_chat(messages, kind=kind, max_tokens=80):
+            if self.last_ttft_ms is None:
+                self.last_ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield delta
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the conversation state held by this session"""
+        return (
+            len(self.session_title) + len(self.session_description) + len(self.session_context)
+            + (sum(len(prompt) for prompt, _ in self.prompts.system_prompts.values()) if self.prompts else 0)
+            + self.memory.memory_bytes()
+        )
 
     def _classify_message(self, message: str) -> str:
         """Classify message to determine conversation mode"""
@@ -83,8 +161,17 @@ Your sole purpose is discussing {title}. Introduce {title} and ask what aspects
         return "gitter"
 
     async def process_user_input(self, user_message: str) -> str:
+        return "".join([delta async for delta in self.process_user_input_stream(user_message)])
+
+    async def process_user_input_stream(self, user_message: str) -> AsyncIterator[str]:
+        """Answer a user turn, yielding the reply as it is generated
+
+        History is only updated once the full reply has arrived, so an
+        interrupted stream leaves the conversation unchanged.
+        """
         if not self.session_active:
-            return "Please start a session first by providing a title and description."
+            yield "Please start a session first by providing a title and description."
+            return
 
         # Classify the conversation mode based on user input
         detected_mode = self._classify_message(user_message)
@@ -93,39 +180,12 @@ Your sole purpose is discussing {title}. Introduce {title} and ask what aspects
         if detected_mode != self.conversation_mode:
             self.conversation_mode = detected_mode
 
-        self.conversation_history.append({"role": "user", "content": user_message})
-
-        # Build smart system prompt
-        mode_context = self._get_mode_context()
-        
-        system_prompt = f"""{self.session_context}
-
-{mode_context}
-
-ABSOLUTE RULE: You can ONLY discuss {self.session_title}. NEVER discuss any other topic.
-
-If user asks about anything else, respond: "I'm here to focus specifically on {self.session_title}. Let's explore that topic instead. What aspect of {self.session_title} interests you?"
-
-You are FORBIDDEN from discussing any topic other than {self.session_title}. Always redirect to {self.session_title}.
-
-Respond about {self.session_title} only. Keep it brief (2-3 sentences). NO formatting."""
+        kind = "short_turn" if len(user_message) <= LLM_SHORT_TURN_CHARS else "turn"
+        parts = []
+        async for delta in self._stream_completion(
+                self.prompts.build(self.conversation_mode, self.memory, user_message), kind):
+            parts.append(delta)
+            yield delta
 
-        response = await self.client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *self.conversation_history[-6:]  # Keep recent context
-            ],
-            max_tokens=80
-        )
-
-        ai_response = response.choices[0].message.content
-        self.conversation_history.append({"role": "assistant", "content": ai_response})
-        return ai_response
-
-    def _get_mode_context(self) -> str:
-        """Get context for current conversation mode"""
-        if self.conversation_mode == "bargain":
-            return "Be decisive and solution-oriented. Provide clear recommendations and help them make decisions."
-        else:
-            return "Be exploratory and engaging. Ask thoughtful questions and share interesting insights."
\ No newline at end of file
+        self.memory.append("user", user_message)
+        self.memory.append("assistant", "".join(parts))
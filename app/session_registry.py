@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from .session_manager import AISessionManager
+
+# Registry limits (override via .env)
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+SESSION_MEMORY_MB = float(os.getenv("SESSION_MEMORY_MB", "256"))
+
+
+class SessionRegistry:
+    """Conversation state per session id, with idle-TTL, LRU and memory-cap eviction
+
+    Sessions outlive their WebSocket for `idle_ttl` seconds so a client that
+    reconnects with the same id resumes its conversation. Each session's
+    memory is measured when it is created, touched or released, and a
+    running total of those measurements is what the memory cap checks.
+    """
+
+    def __init__(self, factory: Optional[Callable[[], AISessionManager]] = None,
+                 idle_ttl: float = SESSION_IDLE_TTL_S, max_sessions: int = MAX_SESSIONS,
+                 max_memory_mb: float = SESSION_MEMORY_MB):
+        self.factory = factory or AISessionManager
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        # Least recently used first
+        self.sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._memory_bytes = 0
+
+    def acquire(self, session_id: Optional[str] = None) -> Tuple[str, AISessionManager, bool]:
+        """Attach a connection to an existing session, or create a new one
+
+        Returns (session_id, manager, resumed).
+        """
+        self.sweep()
+
+        entry = self.sessions.get(session_id) if session_id else None
+        if entry is not None:
+            entry["connections"] += 1
+            self.touch(session_id)
+            return session_id, entry["manager"], True
+
+        session_id = uuid.uuid4().hex
+        entry = {
+            "manager": self.factory(),
+            "connections": 1,
+            "last_seen": time.monotonic(),
+            "memory_bytes": 0,
+        }
+        self.sessions[session_id] = entry
+        self._measure(entry)
+        self._enforce_limits()
+        return session_id, self.sessions[session_id]["manager"], False
+
+    def touch(self, session_id: str):
+        entry = self.sessions.get(session_id)
+        if entry is not None:
+            entry["last_seen"] = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            self._measure(entry)
+
+    def release(self, session_id: str):
+        """Detach a closed connection; the session stays resumable until it idles out"""
+        entry = self.sessions.get(session_id)
+        if entry is not None:
+            entry["connections"] = max(0, entry["connections"] - 1)
+            entry["last_seen"] = time.monotonic()
+            self._measure(entry)
+
+    def remove(self, session_id: str):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None:
+            self._memory_bytes -= entry["memory_bytes"]
+
+    def sweep(self):
+        """Drop detached sessions idle for longer than the TTL"""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = [
+            session_id for session_id, entry in self.sessions.items()
+            if entry["connections"] == 0 and entry["last_seen"] < cutoff
+        ]
+        for session_id in expired:
+            self.remove(session_id)
+        self._enforce_limits()
+
+    def _measure(self, entry: Dict):
+        """Re-measure one session and fold the change into the running total"""
+        size = entry["manager"].memory_bytes()
+        self._memory_bytes += size - entry["memory_bytes"]
+        entry["memory_bytes"] = size
+
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def _enforce_limits(self):
+        # Evict least recently used, detached sessions first. Evicting a connected
+        # session only makes it non-resumable; its socket keeps its own reference.
+        for detached_only in (True, False):
+            for session_id in list(self.sessions):
+                if len(self.sessions) <= self.max_sessions and self._memory_bytes <= self.max_memory_bytes:
+                    return
+                if detached_only and self.sessions[session_id]["connections"] > 0:
+                    continue
+                self.remove(session_id)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def active_connections(self) -> int:
+        return sum(entry["connections"] for entry in self.sessions.values())
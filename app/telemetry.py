@@ -0,0 +1,305 @@
+import abc
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a single small batch up to a long analysis
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name} has no labels {sorted(unknown)}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines of this metric in the Prometheus text format"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {_format_value(v)}" for key, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], object]):
+        """Read the value from `function` at scrape time
+
+        For a labelled gauge `function` returns {label value (or tuple of
+        them, in labelnames order): value}.
+        """
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                values = self._function()
+                if not self.labelnames:
+                    return [f"{self.name} {_format_value(values)}"]
+                return [f"{self.name}{self._labels(key if isinstance(key, tuple) else (str(key),))} "
+                        f"{_format_value(v)}" for key, v in sorted(values.items())]
+            except Exception as e:
+                print(f"Gauge {self.name} failed: {e}")
+                return []
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {_format_value(v)}" for key, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[LabelKey, list] = {}
+
+    def _series(self, key: LabelKey) -> list:
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return series
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series(key)
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels) -> Dict:
+        """Bucket counts, sum and count of one label set, for shipping across processes"""
+        with self._lock:
+            counts, total, count = self._series(self._key(labels))
+            return {"buckets": list(counts), "sum": total, "count": count}
+
+    def merge(self, snapshot: Dict, **labels):
+        """Add a snapshot taken from a histogram with the same buckets (e.g. in a worker process)"""
+        if len(snapshot["buckets"]) != len(self.buckets) + 1:
+            raise ValueError(f"{self.name}: bucket layout mismatch")
+        with self._lock:
+            series = self._series(self._key(labels))
+            series[0] = [a + b for a, b in zip(series[0], snapshot["buckets"])]
+            series[1] += snapshot["sum"]
+            series[2] += snapshot["count"]
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of named metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda m: m.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+
+# Analysis metrics, fed in the web process from the breakdown each worker returns
+ANALYSIS_STAGE_SECONDS = histogram("analysis_stage_seconds", "Time spent per analysis stage", ["stage"])
+ANALYSIS_SECONDS = histogram("analysis_seconds", "Wall-clock time of complete analyses", ["profile"])
+ANALYSIS_FRAMES = counter("analysis_frames_total", "Video frames processed by analyses", ["kind"])
+POSE_BATCH_SECONDS = histogram("pose_batch_inference_seconds", "Pose inference time per batch", ["source"])
+POSE_BATCH_SIZE = histogram("pose_batch_size", "Frames per pose inference batch", ["source"],
+                            buckets=(1, 2, 4, 8, 16, 32, 64))
+TRANSCRIPTION_RTF = histogram("transcription_real_time_factor", "Transcription time divided by audio duration",
+                              buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0))
+
+
+class StageTimer:
+    """Per-analysis timing breakdown: seconds and calls per stage plus counters
+
+    Thread-safe, since transcription and frame analysis run concurrently.
+    `breakdown()` is plain data that travels with the analysis result and is
+    folded into this process's metrics with `record_analysis`.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._batches = Histogram("pose_batch_inference_seconds", "")
+        self._batch_sizes = Histogram("pose_batch_size", "", buckets=POSE_BATCH_SIZE.buckets)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        with self._lock:
+            total = self._stages.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += calls
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def batch(self, size: int, seconds: float):
+        """Record one pose inference batch"""
+        self.add("pose_inference", seconds)
+        self._batches.observe(seconds)
+        self._batch_sizes.observe(size)
+        self.count("frames_inferred", size)
+
+    def breakdown(self) -> Dict:
+        with self._lock:
+            stages = {name: {"seconds": round(s, 4), "calls": int(c)} for name, (s, c) in self._stages.items()}
+            counters = dict(self._counters)
+        batches = self._batches.snapshot()
+        if batches["count"]:
+            counters["inference_ms_per_batch"] = round(batches["sum"] / batches["count"] * 1000, 2)
+        return {
+            "stages": stages,
+            "counters": counters,
+            "batch_seconds": batches,
+            "batch_sizes": self._batch_sizes.snapshot(),
+        }
+
+
+def record_analysis(breakdown: Dict, profile: str, elapsed_s: float):
+    """Fold an analysis's timing breakdown into this process's metrics"""
+    for stage, totals in breakdown.get("stages", {}).items():
+        ANALYSIS_STAGE_SECONDS.observe(totals["seconds"], stage=stage)
+    ANALYSIS_SECONDS.observe(elapsed_s, profile=profile)
+
+    counters = breakdown.get("counters", {})
+    for kind in ("frames_decoded", "frames_sampled", "frames_inferred"):
+        if kind in counters:
+            ANALYSIS_FRAMES.inc(counters[kind], kind=kind.split("_", 1)[1])
+    if "transcription_rtf" in counters:
+        TRANSCRIPTION_RTF.observe(counters["transcription_rtf"])
+    if breakdown.get("batch_seconds", {}).get("count"):
+        POSE_BATCH_SECONDS.merge(breakdown["batch_seconds"], source="upload")
+        POSE_BATCH_SIZE.merge(breakdown["batch_sizes"], source="upload")
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Cache limits (override via .env)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "cache/tts")
+TTS_CACHE_MEMORY_ITEMS = int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "256"))
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "200"))
+
+
+class PhraseCache:
+    """Two-tier cache of synthesized PCM: in-memory LRU over a size-bounded directory"""
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, memory_items: int = TTS_CACHE_MEMORY_ITEMS,
+                 disk_mb: float = TTS_CACHE_DISK_MB):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_bytes_limit = int(disk_mb * 1024 * 1024)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        if self.disk_bytes_limit > 0:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def key(clean_text: str, speaker_fingerprint: str, model_version: str) -> str:
+        return hashlib.sha256(f"{model_version}\0{speaker_fingerprint}\0{clean_text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pcm"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return pcm
+
+            if key in self._disk:
+                try:
+                    with open(self._path(key), "rb") as f:
+                        pcm = f.read()
+                    os.utime(self._path(key))
+                except OSError:
+                    self._drop_disk(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, pcm)
+                    self.hits_disk += 1
+                    return pcm
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, pcm: bytes):
+        with self._lock:
+            self._remember(key, pcm)
+            if self.disk_bytes_limit <= 0 or key in self._disk or len(pcm) > self.disk_bytes_limit:
+                return
+            try:
+                # Write then rename so readers never see a partial file
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(pcm)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"TTS cache write failed: {e}")
+                return
+            self._disk[key] = len(pcm)
+            self._disk_bytes += len(pcm)
+            while self._disk_bytes > self.disk_bytes_limit:
+                oldest = next(iter(self._disk))
+                self._drop_disk(oldest)
+
+    def _remember(self, key: str, pcm: bytes):
+        self._memory[key] = pcm
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _drop_disk(self, key: str):
+        self._disk_bytes -= self._disk.pop(key, 0)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 3) if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
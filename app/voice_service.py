@@ -1,41 +1,84 @@
 import asyncio
+import hashlib
 import io
 import os
+import re
+import tempfile
+from typing import AsyncIterable, AsyncIterator, List, Union
 from dotenv import load_dotenv
 import torch
-from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
 import soundfile as sf
 import numpy as np
-import whisper
+
+from . import model_registry
+from . import telemetry
+from .analysis.audio import AudioSource, decode_audio
+from .tts_cache import PhraseCache
 
 load_dotenv()
 
+SAMPLE_RATE = 16000  # SpeechT5/HiFi-GAN output rate
+TTS_MODEL_PATH = "models/speecht5_tts"
+TTS_VOCODER_PATH = "models/speecht5_hifigan"
+MAX_CHUNK_CHARS = 200  # Longer sentences are split again at clause boundaries
+
+STT_SECONDS = telemetry.histogram("stt_seconds", "Speech-to-text time per utterance")
+TTS_SECONDS = telemetry.histogram("tts_synthesis_seconds", "SpeechT5 synthesis time per sentence")
+TTS_PHRASES = telemetry.counter("tts_phrases_total", "Synthesized sentences by phrase cache outcome", ["cache"])
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, breaking overly long ones at clause boundaries"""
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if len(sentence) <= MAX_CHUNK_CHARS:
+            if sentence:
+                chunks.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            if current and len(current) + len(clause) + 1 > MAX_CHUNK_CHARS:
+                chunks.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}" if current else clause
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def to_pcm16(speech: np.ndarray) -> bytes:
+    """Float waveform in [-1, 1] to little-endian 16-bit PCM"""
+    return (np.clip(speech, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
 class VoiceService:
     def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        
-        # Load local Whisper model
-        print("Loading Whisper model...")
-        self.whisper_model = whisper.load_model("base", device=self.device)
-        print(f"Whisper model loaded on {self.device}")
+        self.device = model_registry.device()["torch_device"]
         
-        # Load SpeechT5 models
-        print("Loading SpeechT5 TTS models...")
-        self.processor = SpeechT5Processor.from_pretrained("models/speecht5_tts")
-        self.model = SpeechT5ForTextToSpeech.from_pretrained("models/speecht5_tts").to(self.device)
-        self.vocoder = SpeechT5HifiGan.from_pretrained("models/speecht5_hifigan").to(self.device)
+        # Models are shared through the registry with any other service in this process
+        self.whisper_model = model_registry.stt_model("base")
+        self.processor, self.model, self.vocoder = model_registry.tts_models()
+        self.speaker_embeddings = model_registry.speaker_embedding()
         
-        # Load speaker embeddings
-        from datasets import load_dataset
-        embeddings_dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
-        self.speaker_embeddings = torch.tensor(embeddings_dataset[7306]["xvector"]).unsqueeze(0).to(self.device)
+        # Cached audio is only valid for the same models and voice
+        self.tts_model_version = f"{TTS_MODEL_PATH}|{TTS_VOCODER_PATH}|{SAMPLE_RATE}"
+        self.speaker_fingerprint = hashlib.sha256(self.speaker_embeddings.cpu().numpy().tobytes()).hexdigest()
+        self.phrase_cache = PhraseCache()
         
         print("SpeechT5 TTS ready")
     
-    async def speech_to_text(self, audio_file_path: str) -> str:
-        """Convert speech to text using local Whisper"""
+    async def speech_to_text(self, audio: AudioSource) -> str:
+        """Convert speech to text using local Whisper
+
+        `audio` may be a file path, encoded bytes (e.g. a webm blob) or 16 kHz
+        float32 samples; it is decoded in memory and never written to disk.
+        """
         def transcribe():
-            result = self.whisper_model.transcribe(audio_file_path)
+            with STT_SECONDS.time():
+                result = self.whisper_model.transcribe(decode_audio(audio))
             return result["text"]
         
         loop = asyncio.get_event_loop()
@@ -69,29 +112,78 @@ class VoiceService:
         
         return text
     
-    async def text_to_speech(self, text: str, output_path: str = "output.wav") -> str:
-        """Convert text to speech using SpeechT5"""
-        clean_text = self.clean_text_for_speech(text)
-        
-        def generate_speech():
-            try:
-                inputs = self.processor(text=clean_text, return_tensors="pt").to(self.device)
-                
-                with torch.no_grad():
-                    speech = self.model.generate_speech(
-                        inputs["input_ids"], 
-                        self.speaker_embeddings, 
-                        vocoder=self.vocoder
-                    )
-                
-                # Convert to numpy and save
-                speech_np = speech.cpu().numpy()
-                sf.write(output_path, speech_np, samplerate=16000)
-                    
-            except Exception as e:
-                print(f"SpeechT5 TTS generation failed: {e}")
-        
+    def _synthesize(self, clean_text: str) -> np.ndarray:
+        """Run SpeechT5 + HiFi-GAN on already-cleaned text, returning a float32 waveform"""
+        inputs = self.processor(text=clean_text, return_tensors="pt").to(self.device)
+
+        with torch.no_grad(), TTS_SECONDS.time():
+            speech = self.model.generate_speech(
+                inputs["input_ids"], 
+                self.speaker_embeddings, 
+                vocoder=self.vocoder
+            )
+
+        return speech.cpu().numpy().astype(np.float32)
+
+    async def text_to_speech(self, text: str, output_path: str = None) -> str:
+        """Convert text to speech using SpeechT5, writing a WAV file
+
+        Each call gets its own temp file unless `output_path` is given, so
+        concurrent requests never overwrite each other.
+        """
+        if output_path is None:
+            fd, output_path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+
+        chunks = [chunk async for chunk in self.synthesize_stream(text)]
+        speech = np.frombuffer(b"".join(chunks), dtype='<i2')
+        sf.write(output_path, speech, samplerate=SAMPLE_RATE, subtype='PCM_16')
+
+        return output_path
+
+    async def synthesize_stream(self, text: Union[str, AsyncIterable[str]]) -> AsyncIterator[bytes]:
+        """Yield 16 kHz 16-bit mono PCM, one chunk per sentence or clause
+
+        `text` may be a complete reply or an async stream of LLM tokens; with a
+        token stream each sentence is synthesized as soon as it is complete.
+        Nothing touches the disk.
+        """
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, generate_speech)
-        
-        return output_path
\ No newline at end of file
+        async for sentence in self._iter_sentences(text):
+            clean_text = self.clean_text_for_speech(sentence)
+            if not clean_text:
+                continue
+
+            # Repeated phrases (redirects, welcomes, acknowledgements) skip the models
+            key = PhraseCache.key(clean_text, self.speaker_fingerprint, self.tts_model_version)
+            pcm = self.phrase_cache.get(key)
+            TTS_PHRASES.inc(cache="miss" if pcm is None else "hit")
+            if pcm is None:
+                try:
+                    speech = await loop.run_in_executor(None, self._synthesize, clean_text)
+                except Exception as e:
+                    print(f"SpeechT5 TTS generation failed: {e}")
+                    continue
+                pcm = to_pcm16(speech)
+                self.phrase_cache.put(key, pcm)
+            yield pcm
+
+    async def _iter_sentences(self, text: Union[str, AsyncIterable[str]]) -> AsyncIterator[str]:
+        if isinstance(text, str):
+            for sentence in split_sentences(text):
+                yield sentence
+            return
+
+        buffer = ""
+        async for token in text:
+            buffer += token
+            pieces = split_sentences(buffer)
+            # The last piece may still be growing unless the buffer ends on a boundary
+            if pieces and not re.search(r'[.!?]\s+$', buffer):
+                buffer = pieces.pop()
+            else:
+                buffer = ""
+            for piece in pieces:
+                yield piece
+        if buffer.strip():
+            yield buffer.strip()
\ No newline at end of file
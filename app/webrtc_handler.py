@@ -1,27 +1,175 @@
-import json
-from typing import Dict, Optional
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from aiortc import RTCConfiguration, RTCIceServer, RTCPeerConnection, RTCSessionDescription
+from aiortc.mediastreams import MediaStreamError
+from aiortc.sdp import candidate_from_sdp
+
+from .analysis.audio import SAMPLE_RATE
+from .live_scoring import LiveScoringSession
+
+# WebRTC configuration (override via .env)
+#   WEBRTC_ICE_SERVERS  comma separated STUN/TURN URLs; empty = host candidates only
+WEBRTC_ICE_SERVERS = [url.strip() for url in os.getenv("WEBRTC_ICE_SERVERS", "").split(",") if url.strip()]
+
+MAX_SDP_CHARS = 64 * 1024  # Browser offers are a few kilobytes
+
+Send = Callable[[Dict], Awaitable[None]]
+
+
+class InvalidSignal(ValueError):
+    """An offer or ICE candidate from the client that cannot be used"""
+
+
+async def _discard(message: Dict):
+    pass
+
+
+class PeerSession:
+    """One browser peer: its connection, the tasks reading its tracks and the scoring session they feed"""
+
+    def __init__(self, pc: RTCPeerConnection, live: LiveScoringSession, send: Send):
+        self.pc = pc
+        self.live = live
+        self.consumers: List[asyncio.Task] = []
+        self.worker = asyncio.create_task(live.run(send))
+
 
 class WebRTCHandler:
+    """Receives camera and microphone tracks over WebRTC and scores them as they arrive
+
+    Video frames are sampled at the analysis profile's rate and handed to a
+    LiveScoringSession already decoded; frames in between are never
+    converted. Microphone audio is resampled to 16 kHz mono PCM and
+    transcribed when the connection finishes. Nothing is written to disk.
+    """
+
     def __init__(self):
-        self.peer_connections: Dict[str, dict] = {}
-        
-    async def handle_offer(self, sdp: str) -> str:
-        # Simplified WebRTC handling - in production use aiortc or similar
-        # This is a mock implementation for the basic structure
-        
-        # Process the SDP offer
-        answer_sdp = self._create_answer(sdp)
-        
-        return answer_sdp
-    
-    def _create_answer(self, offer_sdp: str) -> str:
-        # Mock SDP answer - replace with actual WebRTC implementation
-        return f"v=0\no=- 0 0 IN IP4 127.0.0.1\ns=-\nt=0 0\na=group:BUNDLE 0\nm=video 9 UDP/TLS/RTP/SAVPF 96\nc=IN IP4 0.0.0.0\na=rtcp:9 IN IP4 0.0.0.0\na=ice-ufrag:mock\na=ice-pwd:mockpassword\na=fingerprint:sha-256 mock:fingerprint\na=setup:active\na=mid:0\na=sendrecv"
-    
-    async def handle_ice_candidate(self, candidate: dict) -> bool:
-        # Handle ICE candidates for WebRTC connection
+        self.peer_connections: Dict[str, PeerSession] = {}
+
+    async def handle_offer(self, connection_id: str, sdp: str, send: Optional[Send] = None,
+                           profile: Optional[str] = None) -> str:
+        """Answer a browser offer; `send` receives rolling live_metrics messages
+
+        A new offer for an existing `connection_id` replaces that peer.
+        Raises profiles.UnknownProfile for an unknown `profile` and
+        InvalidSignal for an SDP that is not a usable offer.
+        """
+        if not isinstance(sdp, str) or not sdp.startswith("v=0") or len(sdp) > MAX_SDP_CHARS:
+            raise InvalidSignal("Offer must be an SDP session description")
+        await self.close_connection(connection_id)
+        live = LiveScoringSession(profile)
+        pc = RTCPeerConnection(RTCConfiguration(iceServers=[RTCIceServer(urls=url) for url in WEBRTC_ICE_SERVERS]))
+        peer = PeerSession(pc, live, send or _discard)
+        self.peer_connections[connection_id] = peer
+
+        @pc.on("track")
+        def on_track(track):
+            consume = self._consume_video if track.kind == "video" else self._consume_audio
+            peer.consumers.append(asyncio.create_task(consume(track, live)))
+
+        @pc.on("connectionstatechange")
+        async def on_connection_state():
+            if pc.connectionState == "failed" and self.peer_connections.get(connection_id) is peer:
+                print(f"WebRTC connection {connection_id} failed")
+                await self.close_connection(connection_id)
+
+        try:
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type="offer"))
+            # aiortc gathers its candidates here, so the answer needs no trickle ICE
+            await pc.setLocalDescription(await pc.createAnswer())
+        except Exception as e:
+            await self.close_connection(connection_id)
+            raise InvalidSignal(f"Invalid offer: {e}") from e
+        except BaseException:
+            await self.close_connection(connection_id)
+            raise
+        return pc.localDescription.sdp
+
+    @staticmethod
+    async def _consume_video(track, live: LiveScoringSession):
+        interval = 1.0 / live.analysis_fps
+        next_sample = 0.0
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                return
+            # Only sampled frames are converted to arrays; the rest are dropped still in YUV
+            now = time.monotonic()
+            if now < next_sample:
+                continue
+            next_sample = max(next_sample + interval, now)
+            live.add_frame(frame.to_ndarray(format="bgr24"))
+
+    @staticmethod
+    async def _consume_audio(track, live: LiveScoringSession):
+        import av
+
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                return
+            for resampled in resampler.resample(frame):
+                live.add_audio(resampled.to_ndarray().reshape(-1))
+
+    async def handle_ice_candidate(self, connection_id: str, candidate: dict) -> bool:
+        """Add a trickled browser candidate (RTCIceCandidate.toJSON())
+
+        Returns False when there is no peer or the candidate is empty (the
+        end-of-candidates marker); raises InvalidSignal for a malformed one.
+        """
+        peer = self.peer_connections.get(connection_id)
+        if not isinstance(candidate, dict):
+            raise InvalidSignal("ICE candidate must be an object")
+        line = candidate.get("candidate")
+        if peer is None or not line:
+            return False
+        if not isinstance(line, str) or not line.startswith("candidate:"):
+            raise InvalidSignal("ICE candidate must be an SDP 'candidate:' line")
+        try:
+            ice = candidate_from_sdp(line.split(":", 1)[1])
+            ice.sdpMid = candidate.get("sdpMid")
+            ice.sdpMLineIndex = candidate.get("sdpMLineIndex")
+            await peer.pc.addIceCandidate(ice)
+        except Exception as e:
+            raise InvalidSignal(f"Invalid ICE candidate: {e}") from e
         return True
-    
+
+    async def finish_connection(self, connection_id: str) -> Optional[Dict]:
+        """Stop receiving, close the peer and return its live_report (None if unknown)"""
+        peer = self.peer_connections.pop(connection_id, None)
+        if peer is None:
+            return None
+        try:
+            await self._stop_receiving(peer)
+            peer.live.close()
+            await peer.worker
+            return await peer.live.finish()
+        finally:
+            await peer.pc.close()
+
     async def close_connection(self, connection_id: str):
-        if connection_id in self.peer_connections:
-            del self.peer_connections[connection_id]
\ No newline at end of file
+        """Close a peer and release its tracks without producing a report"""
+        peer = self.peer_connections.pop(connection_id, None)
+        if peer is None:
+            return
+        await self._stop_receiving(peer)
+        peer.live.close()
+        peer.worker.cancel()
+        await asyncio.gather(peer.worker, return_exceptions=True)
+        await peer.pc.close()
+
+    async def close_all(self):
+        for connection_id in list(self.peer_connections):
+            await self.close_connection(connection_id)
+
+    @staticmethod
+    async def _stop_receiving(peer: PeerSession):
+        for task in peer.consumers:
+            task.cancel()
+        await asyncio.gather(*peer.consumers, return_exceptions=True)
@@ -0,0 +1,79 @@
+"""Drive the shared LLM client with concurrent conversations and report latency and errors
+
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=mock python -m benchmarks.llm_load --requests 200 --concurrency 50
+
+Point GROQ_BASE_URL at benchmarks.mock_llm to see how the concurrency limit,
+retries and hedging (LLM_* settings) shape latency under injected tail
+latency and 429s.
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from app import llm_client
+from app.llm_backends import GROQ_MODEL
+
+
+async def run(requests: int, concurrency: int, model: str, hedge: Optional[bool]) -> dict:
+    client = llm_client.LLMClient(hedge=llm_client.LLM_HEDGE if hedge is None else hedge)
+    ttft: List[float] = []
+    total: List[float] = []
+    errors: List[str] = []
+    gate = asyncio.Semaphore(concurrency)  # Simulated users, independent of the client's own limit
+
+    async def one(i: int):
+        async with gate:
+            started = time.perf_counter()
+            first = None
+            try:
+                async for _ in client.stream_chat([{"role": "user", "content": f"Question {i}"}], model=model):
+                    if first is None:
+                        first = time.perf_counter() - started
+            except Exception as e:
+                errors.append(type(e).__name__)
+                return
+            ttft.append(first or 0.0)
+            total.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    def percentiles(values: List[float]) -> dict:
+        if not values:
+            return {}
+        return {f"p{p}_ms": round(float(np.percentile(values, p)) * 1000, 1) for p in (50, 95, 99)}
+
+    return {
+        "requests": requests,
+        "ok": len(total),
+        "errors": {name: errors.count(name) for name in sorted(set(errors))},
+        "seconds": round(elapsed, 2),
+        "ttft": percentiles(ttft),
+        "total": percentiles(total),
+        "retries": {reason: llm_client.LLM_RETRIES.value(model=model, reason=reason)
+                    for reason in ("rate_limited", "APIConnectionError", "APITimeoutError", "InternalServerError")},
+        "hedges": {result: llm_client.LLM_HEDGES.value(result=result) for result in ("won", "lost", "failed")},
+        "hedge_after_s": client.hedge_after_s(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.llm_load", description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Simulated users sending at once")
+    parser.add_argument("--model", default=GROQ_MODEL)
+    parser.add_argument("--hedge", choices=("on", "off"), help="Override LLM_HEDGE")
+    args = parser.parse_args()
+
+    hedge = None if args.hedge is None else args.hedge == "on"
+    result = asyncio.run(run(args.requests, args.concurrency, args.model, hedge))
+    for key, value in result.items():
+        print(f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
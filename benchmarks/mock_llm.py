@@ -0,0 +1,97 @@
+"""Local OpenAI/Groq-compatible chat server that injects latency and rate limits
+
+    python -m benchmarks.mock_llm --port 8090 --latency-ms 300 --tail-ratio 0.05 --rate-limit-ratio 0.1
+    GROQ_BASE_URL=http://127.0.0.1:8090 python -m benchmarks.llm_load
+
+Serves streamed chat completions on /openai/v1/chat/completions (the path
+the Groq SDK uses) and /v1/chat/completions (OpenAI-compatible clients).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = "Thanks for sharing that. Which part of the topic would you like to look at next?"
+
+
+def create_app(latency_ms: float = 200.0, jitter_ms: float = 50.0, tail_ratio: float = 0.0, tail_ms: float = 2000.0,
+               rate_limit_ratio: float = 0.0, retry_after_s: float = 0.5, token_ms: float = 10.0,
+               seed: int = 0, rate_limit_first: int = 0) -> FastAPI:
+    """First token after `latency_ms` (+ jitter, or `tail_ms` for `tail_ratio` of requests);
+    the first `rate_limit_first` requests and `rate_limit_ratio` of the rest get HTTP 429
+    with a Retry-After header"""
+    app = FastAPI()
+    rng = random.Random(seed)
+    counters = {"requests": 0, "rate_limited": 0, "slow": 0}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        if counters["requests"] <= rate_limit_first or rng.random() < rate_limit_ratio:
+            counters["rate_limited"] += 1
+            return JSONResponse(status_code=429, headers={"retry-after": str(retry_after_s)},
+                                content={"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}})
+
+        slow = rng.random() < tail_ratio
+        counters["slow"] += slow
+        delay = (tail_ms if slow else latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        words = REPLY.split(" ")[:max(1, int(body.get("max_tokens") or 80))]
+        created = int(time.time())
+
+        def chunk(content: Dict, finish=None) -> str:
+            payload = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                       "model": body.get("model", "mock"),
+                       "choices": [{"index": 0, "delta": content, "finish_reason": finish}]}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(max(0.0, delay))
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                yield chunk({"content": word if i == 0 else " " + word})
+                await asyncio.sleep(token_ms / 1000)
+            yield chunk({}, finish="stop")
+            yield "data: [DONE]\n\n"
+
+        if not body.get("stream"):
+            await asyncio.sleep(max(0.0, delay))
+            return {"id": "chatcmpl-mock", "object": "chat.completion", "created": created,
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": " ".join(words)}}]}
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: dict(counters), methods=["GET"])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_llm", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Typical time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tail-ratio", type=float, default=0.0, help="Share of requests answered after --tail-ms")
+    parser.add_argument("--tail-ms", type=float, default=2000.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rate-limit-first", type=int, default=0, help="Answer this many first requests with 429")
+    parser.add_argument("--retry-after-s", type=float, default=0.5)
+    parser.add_argument("--token-ms", type=float, default=10.0, help="Delay between streamed words")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.tail_ratio, args.tail_ms, args.rate_limit_ratio,
+                           args.retry_after_s, args.token_ms, args.seed, args.rate_limit_first),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Benchmark the session analysis pipeline stage by stage on synthetic media
+
+    python -m benchmarks.run --duration 60 --resolution 1280x720 --fps 30 --output bench.json
+    python -m benchmarks.run --stub-models --baseline bench.json --fail-on-regression
+
+Stages: decode, inference, postprocess, aggregation, transcription and
+end_to_end (SessionScorer.analyze_video_file). Each reports throughput,
+p50/p95 latency per unit of work and peak RSS. Everything runs on the CPU.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# Benchmarks are CPU-only; must be set before the app resolves its device
+os.environ.setdefault("SCORER_DEVICE", "cpu")
+
+import numpy as np
+
+from app import model_registry, result_cache, telemetry
+from app.analysis import profiles, sharding
+from app.analysis.frame_decoder import FrameDecoder
+from app.analysis.video_scorer import BATCH_SIZE, ScoreAccumulator, SessionScorer
+
+from . import synthetic
+from .stubs import install_stub_models
+
+STAGES = ("decode", "inference", "postprocess", "aggregation", "transcription", "end_to_end")
+
+
+def _reset_peak_rss():
+    """Reset the kernel's high-water mark so each stage reports its own peak (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+
+
+class StageResult:
+    """Latencies of one stage over all repeats, summarized as throughput and percentiles"""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0.0
+        self.run_seconds: List[float] = []
+        self.latencies: List[float] = []
+        self.peak_rss_mb = 0.0
+
+    def summary(self) -> Dict:
+        seconds = float(np.median(self.run_seconds)) if self.run_seconds else 0.0
+        latencies = np.asarray(self.latencies) * 1000
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "seconds": round(seconds, 4),
+            "throughput": round(self.items / seconds, 2) if seconds else None,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3) if len(latencies) else None,
+            "samples": len(latencies),
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+def measure(name: str, unit: str, repeat: int, warmup: int, run: Callable[[StageResult], float]) -> StageResult:
+    """Call `run` warmup + repeat times; it appends per-item latencies and returns the item count"""
+    result = StageResult(name, unit)
+    for _ in range(warmup):
+        run(StageResult(name, unit))
+    _reset_peak_rss()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result.items = run(result)
+        result.run_seconds.append(time.perf_counter() - started)
+    result.peak_rss_mb = _peak_rss_mb()
+    return result
+
+
+def bench_pipeline(video_path: str, audio: np.ndarray, settings: Dict, repeat: int, warmup: int,
+                   shards: int, stages: List[str]) -> Dict[str, StageResult]:
+    imgsz, analysis_fps, full = settings["imgsz"], settings["analysis_fps"], settings["full_metrics"]
+    results = {}
+
+    # Batches are decoded once up front; inference and post-processing then run on them in isolation
+    decoded = [(frames, timestamps) for frames, _, timestamps in
+               FrameDecoder(video_path, analysis_fps=analysis_fps, batch_size=BATCH_SIZE, imgsz=imgsz)]
+    model = model_registry.pose_model()
+    device = model_registry.device()["torch_device"]
+    inferred = [(sharding.infer_pose_batch(model, device, frames, imgsz), timestamps) for frames, timestamps in decoded]
+    frame_total = sum(len(timestamps) for _, timestamps in decoded)
+
+    def decode(result: StageResult) -> float:
+        decoder = FrameDecoder(video_path, analysis_fps=analysis_fps, batch_size=BATCH_SIZE, imgsz=imgsz)
+        sampled = 0
+        last = time.perf_counter()
+        try:
+            for frames, _, _ in decoder:
+                now = time.perf_counter()
+                # Per-frame cost of each batch as the consumer sees it
+                result.latencies.append((now - last) / len(frames))
+                last = now
+                sampled += len(frames)
+        finally:
+            decoder.close()
+        return sampled
+
+    def inference(result: StageResult) -> float:
+        for frames, _ in decoded:
+            started = time.perf_counter()
+            sharding.infer_pose_batch(model, device, frames, imgsz)
+            result.latencies.append(time.perf_counter() - started)
+        return frame_total
+
+    def postprocess(result: StageResult) -> float:
+        accumulator = ScoreAccumulator(full)
+        for batch, timestamps in inferred:
+            started = time.perf_counter()
+            accumulator.add_batch(batch, timestamps)
+            result.latencies.append(time.perf_counter() - started)
+        return frame_total
+
+    accumulator = ScoreAccumulator(full)
+    for batch, timestamps in inferred:
+        accumulator.add_batch(batch, timestamps)
+
+    def aggregation(result: StageResult) -> float:
+        started = time.perf_counter()
+        accumulator.report(timeline=True)
+        result.latencies.append(time.perf_counter() - started)
+        return frame_total
+
+    scorer = SessionScorer()
+
+    def transcribe(result: StageResult) -> float:
+        started = time.perf_counter()
+        transcript = scorer._transcribe_audio(audio, settings=settings, timer=telemetry.StageTimer())
+        result.latencies.append(time.perf_counter() - started)
+        if "error" in transcript:
+            raise RuntimeError(f"Transcription failed: {transcript['error']}")
+        return len(audio) / synthetic.AUDIO_RATE
+
+    def end_to_end(result: StageResult) -> float:
+        started = time.perf_counter()
+        report = scorer.analyze_video_file(video_path, "video/mp4", shards=shards, profile=settings["name"])
+        result.latencies.append(time.perf_counter() - started)
+        return report["timing"]["counters"].get("frames_sampled", 0)
+
+    runners = {
+        "decode": ("frames", decode),
+        "inference": ("frames", inference),
+        "postprocess": ("frames", postprocess),
+        "aggregation": ("frames", aggregation),
+        "transcription": ("audio_s", transcribe),
+        "end_to_end": ("frames", end_to_end),
+    }
+    for name in stages:
+        unit, run = runners[name]
+        print(f"  {name}...", flush=True)
+        results[name] = measure(name, unit, repeat, warmup, run)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print a stage-by-stage comparison and return the regressions found"""
+    if current["config"] != baseline.get("config"):
+        print("Warning: benchmark configuration differs from the baseline; numbers may not be comparable")
+
+    regressions = []
+    print(f"\n{'stage':<14}{'throughput':>14}{'baseline':>12}{'change':>9}{'p95 ms':>12}{'baseline':>12}{'change':>9}")
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            print(f"{name:<14}{stage['throughput'] or 0:>14.1f}{'-':>12}")
+            continue
+        throughput_change = (stage["throughput"] / base["throughput"] - 1) if base["throughput"] else 0.0
+        p95_change = (stage["p95_ms"] / base["p95_ms"] - 1) if base["p95_ms"] else 0.0
+        print(f"{name:<14}{stage['throughput']:>14.1f}{base['throughput']:>12.1f}{throughput_change:>+9.1%}"
+              f"{stage['p95_ms']:>12.2f}{base['p95_ms']:>12.2f}{p95_change:>+9.1%}")
+        if throughput_change < -tolerance:
+            regressions.append(f"{name}: throughput {throughput_change:+.1%}")
+        if p95_change > tolerance:
+            regressions.append(f"{name}: p95 latency {p95_change:+.1%}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic media length in seconds")
+    parser.add_argument("--resolution", default="1280x720", help="Synthetic video size, WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=30.0, help="Synthetic video frame rate")
+    parser.add_argument("--video", help="Benchmark this recording instead of a synthetic one")
+    parser.add_argument("--profile", default=None, help="Analysis profile (default: ANALYSIS_PROFILE)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated subset of stages to run")
+    parser.add_argument("--shards", type=int, default=1, help="Shards for the end_to_end stage")
+    parser.add_argument("--repeat", type=int, default=3, help="Measured runs per stage")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per stage")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="Replace YOLO and Whisper with lightweight stubs to time everything around them")
+    parser.add_argument("--stub-pose-ms", type=float, default=0.0, help="Emulated stub pose cost per frame")
+    parser.add_argument("--stub-whisper-rtf", type=float, default=0.0, help="Emulated stub Whisper real-time factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --output")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative throughput drop or p95 rise counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        print(f"Unknown stages: {', '.join(sorted(unknown))}; choose from {', '.join(STAGES)}")
+        return 2
+
+    if args.stub_models:
+        install_stub_models(args.stub_pose_ms, args.stub_whisper_rtf)
+    settings = profiles.get_profile(args.profile)
+
+    with tempfile.TemporaryDirectory(prefix="eval-bench-") as workdir:
+        if args.video:
+            video_path = args.video
+            from app.analysis.audio import decode_audio
+            audio = decode_audio(video_path)
+        else:
+            video_path = os.path.join(workdir, "synthetic.mp4")
+            print(f"Generating {args.duration:.0f}s {width}x{height}@{args.fps:g} synthetic video...", flush=True)
+            synthetic.write_video(video_path, args.duration, width, height, args.fps, seed=args.seed)
+            audio = synthetic.synthetic_audio(args.duration, seed=args.seed)
+
+        print(f"Benchmarking profile '{settings['name']}' ({'stub' if args.stub_models else 'real'} models)")
+        results = bench_pipeline(video_path, audio, settings, args.repeat, args.warmup, args.shards, stages)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "video": os.path.basename(args.video) if args.video else "synthetic",
+            "duration_s": None if args.video else args.duration,
+            "resolution": None if args.video else f"{width}x{height}",
+            "fps": None if args.video else args.fps,
+            "stub_models": args.stub_models,
+            "stub_pose_ms": args.stub_pose_ms if args.stub_models else None,
+            "stub_whisper_rtf": args.stub_whisper_rtf if args.stub_models else None,
+            "shards": args.shards,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "analysis": result_cache.analysis_config(settings["name"]),
+        },
+        "stages": {name: result.summary() for name, result in results.items()},
+    }
+
+    print(f"\n{'stage':<14}{'throughput':>16}{'p50 ms':>10}{'p95 ms':>10}{'peak RSS':>11}")
+    for name, stage in report["stages"].items():
+        throughput = f"{stage['throughput']:.1f} {stage['unit']}/s" if stage["throughput"] else "-"
+        print(f"{name:<14}{throughput:>16}{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}"
+              f"{stage['peak_rss_mb']:>8.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions beyond {:.0%}:\n  {}".format(args.tolerance, "\n  ".join(regressions)))
+            if args.fail_on_regression:
+                return 1
+        else:
+            print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import os
+import time
+import zlib
+from types import SimpleNamespace
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app import model_registry
+from app.analysis import profiles, sharding
+
+# Upright frontal pose as fractions of the frame: COCO order (nose, eyes, ears, shoulders, elbows, wrists, hips, knees, ankles)
+BASE_POSE = np.array([
+    [0.50, 0.25], [0.47, 0.22], [0.53, 0.22], [0.44, 0.24], [0.56, 0.24],
+    [0.38, 0.40], [0.62, 0.40], [0.34, 0.55], [0.66, 0.55], [0.33, 0.68], [0.67, 0.68],
+    [0.42, 0.75], [0.58, 0.75], [0.42, 0.90], [0.58, 0.90], [0.42, 1.05], [0.58, 1.05],
+])
+
+
+class StubPoseModel:
+    """Stands in for YOLO pose: same call signature and result layout, NumPy instead of torch
+
+    Each frame gets one jittered person that drifts with the frame's
+    brightness centroid (nobody in about `absent_ratio` of frames, a second
+    box in `multi_ratio`) so every metric branch is exercised. The person is
+    a function of the frame content alone, so a frame scores the same
+    whichever process or batch it lands in. `cost_ms` sleeps per frame to
+    emulate a model of known speed; 0 measures the pipeline around inference
+    alone.
+    """
+
+    def __init__(self, cost_ms: float = 0.0, absent_ratio: float = 0.05, multi_ratio: float = 0.02, seed: int = 0):
+        self.cost_ms = cost_ms
+        self.absent_ratio = absent_ratio
+        self.multi_ratio = multi_ratio
+        self.seed = seed
+        self.calls = 0
+        self.conf, self.iou, self.max_det = 0.25, 0.45, 1
+
+    def __call__(self, frames: List[np.ndarray], verbose: bool = False, imgsz: int = 416, device: str = "cpu"):
+        if self.cost_ms:
+            time.sleep(self.cost_ms * len(frames) / 1000)
+        results = []
+        for frame in frames:
+            self.calls += 1
+            height, width = frame.shape[:2]
+            thumb = cv2.resize(frame, (16, 16), interpolation=cv2.INTER_AREA).mean(axis=2)
+            rng = np.random.default_rng([self.seed, zlib.crc32(thumb.astype(np.uint8).tobytes())])
+            if rng.random() < self.absent_ratio:
+                results.append(SimpleNamespace(keypoints=SimpleNamespace(data=np.zeros((0, 17, 3), np.float32)),
+                                               boxes=SimpleNamespace(data=np.zeros((0, 6), np.float32))))
+                continue
+
+            total = thumb.sum()
+            centroid = np.array([(thumb.sum(axis=0) * np.linspace(0, 1, 16)).sum(),
+                                 (thumb.sum(axis=1) * np.linspace(0, 1, 16)).sum()]) / total if total else 0.5
+            drift = np.clip((centroid - 0.5) * 0.5, -0.04, 0.04)
+            xy = (BASE_POSE + drift + rng.normal(0, 0.004, BASE_POSE.shape)) * [width, height]
+            conf = np.clip(rng.normal(0.85, 0.1, (17, 1)), 0, 1)
+            conf[13:] = 0.1  # Legs are usually out of frame
+            keypoints = np.concatenate([xy, conf], axis=1)[None].astype(np.float32)
+
+            boxes = [[0.3 * width, 0.15 * height, 0.7 * width, height, rng.uniform(0.6, 0.95), 0]]
+            if rng.random() < self.multi_ratio:
+                boxes.append([0.0, 0.2 * height, 0.25 * width, height, 0.5, 0])
+            results.append(SimpleNamespace(keypoints=SimpleNamespace(data=keypoints),
+                                           boxes=SimpleNamespace(data=np.asarray(boxes, dtype=np.float32))))
+        return results
+
+
+class StubWhisperModel:
+    """Stands in for faster-whisper: one segment per `segment_s` of audio
+
+    `rtf` sleeps for that fraction of the audio duration per call, so the
+    chunking and concurrency around transcription can be timed against a
+    model of known speed.
+    """
+
+    def __init__(self, rtf: float = 0.0, segment_s: float = 4.0, language: str = "en"):
+        self.rtf = rtf
+        self.segment_s = segment_s
+        self.language = language
+
+    def transcribe(self, audio: np.ndarray, beam_size: int = 5, language: Optional[str] = None, **kwargs):
+        duration = len(audio) / 16000
+        if self.rtf:
+            time.sleep(duration * self.rtf)
+        starts = np.arange(0.0, duration, self.segment_s)
+        segments = (
+            SimpleNamespace(start=float(start), end=float(min(start + self.segment_s, duration)),
+                            text=f" segment at {start:.1f} seconds")
+            for start in starts
+        )
+        return segments, SimpleNamespace(language=language or self.language, language_probability=1.0,
+                                         duration=duration)
+
+
+def install_stub_models(pose_cost_ms: float = 0.0, whisper_rtf: float = 0.0):
+    """Register stubs in the model registry under the names the scorer asks for
+
+    Shard workers run in spawned processes with registries of their own, so
+    they are set up to install the same stubs when they start.
+    """
+    model_registry.registry.register("pose", StubPoseModel(cost_ms=pose_cost_ms))
+    sizes = {settings["whisper_model"] for settings in profiles.PROFILES.values()}
+    sizes.add(os.getenv("WHISPER_MODEL", "large-v3"))
+    for size in sizes:
+        model_registry.registry.register(f"faster-whisper:{size}", StubWhisperModel(rtf=whisper_rtf))
+    sharding.set_worker_initializer(install_stub_models, (pose_cost_ms, whisper_rtf))
@@ -0,0 +1,106 @@
+from fractions import Fraction
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+AUDIO_RATE = 16000
+
+
+def synthetic_audio(duration_s: float, sample_rate: int = AUDIO_RATE, seed: int = 0) -> np.ndarray:
+    """Speech-like float32 audio: harmonic bursts of 1-4 s separated by 0.3-2 s pauses"""
+    rng = np.random.default_rng(seed)
+    total = int(duration_s * sample_rate)
+    audio = (rng.standard_normal(total) * 0.002).astype(np.float32)  # Room noise
+
+    pos = int(rng.uniform(0.2, 1.0) * sample_rate)
+    while pos < total:
+        length = min(int(rng.uniform(1.0, 4.0) * sample_rate), total - pos)
+        t = np.arange(length) / sample_rate
+        pitch = rng.uniform(100, 220)
+        # Voiced sound: a few harmonics with a syllable-rate envelope and pitch drift
+        phase = 2 * np.pi * np.cumsum(pitch * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))) / sample_rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 5) * t)) * np.hanning(length)
+        audio[pos:pos + length] += (0.2 * voice * envelope).astype(np.float32)
+        pos += length + int(rng.uniform(0.3, 2.0) * sample_rate)
+
+    return np.clip(audio, -1.0, 1.0)
+
+
+def _draw_person(frame: np.ndarray, center: Tuple[int, int], scale: float, yaw: float):
+    """Head, eyes and shoulders the pose stubs (and a real pose model) can pick up"""
+    cx, cy = center
+    head = int(40 * scale)
+    eye_dx = int(head * 0.35 * np.cos(np.radians(yaw)))
+    cv2.ellipse(frame, (cx, cy + int(4.2 * head)), (int(2.6 * head), int(2.4 * head)), 0, 180, 360, (60, 80, 140), -1)
+    cv2.circle(frame, (cx, cy), head, (150, 180, 220), -1)
+    for dx in (-eye_dx, eye_dx):
+        cv2.circle(frame, (cx + dx, cy - head // 5), max(2, head // 8), (30, 30, 30), -1)
+    cv2.line(frame, (cx - int(2.2 * head), cy + int(2.0 * head)), (cx + int(2.2 * head), cy + int(2.0 * head)),
+             (200, 200, 200), max(2, head // 6))
+
+
+def synthetic_frames(duration_s: float, width: int, height: int, fps: float, seed: int = 0):
+    """Yield BGR frames of a figure that alternates between still spells and movement"""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(40, 90, (height, width, 3), dtype=np.uint8), (0, 0), 9)
+    scale = min(width, height) / 360
+    count = int(duration_s * fps)
+
+    x, y, yaw = width / 2, height / 3, 0.0
+    for i in range(count):
+        t = i / fps
+        # Move for 3 s out of every 8 s so adaptive sampling has both regimes to work with
+        if t % 8 < 3:
+            x = width / 2 + np.sin(t * 1.7) * width * 0.15
+            y = height / 3 + np.sin(t * 2.3) * height * 0.05
+            yaw = np.sin(t * 1.1) * 40
+        frame = background.copy()
+        _draw_person(frame, (int(x), int(y)), scale, yaw)
+        cv2.putText(frame, f"{t:7.2f}", (10, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6 * scale, (255, 255, 255), 1)
+        yield frame
+
+
+def write_video(path: str, duration_s: float, width: int = 1280, height: int = 720, fps: float = 30.0,
+                with_audio: bool = True, seed: int = 0) -> str:
+    """Encode a synthetic H.264/AAC MP4 (PyAV), falling back to an mp4v video-only file (OpenCV)"""
+    try:
+        import av
+    except ImportError:
+        av = None
+
+    if av is None:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        for frame in synthetic_frames(duration_s, width, height, fps, seed):
+            writer.write(frame)
+        writer.release()
+        return path
+
+    rate = Fraction(fps).limit_denominator(1001)
+    with av.open(path, mode="w") as container:
+        # Every stream has to exist before the first packet is muxed
+        video = container.add_stream("libx264" if "libx264" in av.codecs_available else "mpeg4", rate=rate)
+        video.width, video.height, video.pix_fmt = width, height, "yuv420p"
+        audio_stream = container.add_stream("aac", rate=AUDIO_RATE, layout="mono") if with_audio else None
+
+        for frame in synthetic_frames(duration_s, width, height, fps, seed):
+            for packet in video.encode(av.VideoFrame.from_ndarray(frame, format="bgr24")):
+                container.mux(packet)
+        for packet in video.encode():
+            container.mux(packet)
+
+        if audio_stream is not None:
+            samples = synthetic_audio(duration_s, AUDIO_RATE, seed)
+            block = 1024
+            for start in range(0, len(samples), block):
+                frame = av.AudioFrame.from_ndarray(samples[start:start + block].reshape(1, -1), format="flt",
+                                                   layout="mono")
+                frame.sample_rate = AUDIO_RATE
+                frame.pts = start
+                frame.time_base = Fraction(1, AUDIO_RATE)
+                for packet in audio_stream.encode(frame):
+                    container.mux(packet)
+            for packet in audio_stream.encode():
+                container.mux(packet)
+    return path
@@ -5,37 +5,140 @@ let recognition;
 let isListening = false;
 let speechSynthesis = window.speechSynthesis;
 let isAIMainView = true; // true = AI main, false = User main
-
-// WebSocket connection
-function connectWebSocket() {
+let sessionId = null; // Server-side session id, used to resume after a reconnect
+let streamingMessage = null; // Chat bubble receiving ai_response_delta text
+let streamingText = '';
+let scoreWs = null; // Live scoring socket (/ws/score)
+let liveTimer = null;
+
+const LIVE_FPS = 3; // Camera frames per second sent for live scoring
+const LIVE_FRAME_WIDTH = 320; // Frames are downscaled to this width before JPEG encoding
+const ICE_GATHERING_TIMEOUT_MS = 2000; // Offer is sent once candidates are gathered or this elapses
+const WEBRTC_REPORT_TIMEOUT_MS = 10000; // How long ending a session waits for the WebRTC live_report
+let webrtcReportDone = null; // Resolves the pending wait for the WebRTC live_report
+const RECONNECT_BASE_MS = 500; // First reconnect delay; doubles (with jitter) on each failed attempt
+const RECONNECT_MAX_MS = 10000;
+const RECONNECT_ATTEMPTS = 8; // Give up and end the session after this many failed reconnects
+let reconnectAttempts = 0;
+let reconnectTimer = null;
+let sessionTopic = null; // Title and description, to start over if the server no longer has the session
+
+// WebSocket connection; `onOpen` runs once it is open
+function connectWebSocket(onOpen) {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
+    const query = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : '';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws${query}`);
+    const reconnecting = sessionId !== null;
+    ws = socket;
+
+    socket.onopen = function () {
+        if (onOpen) {
+            onOpen();
+        }
+    };
 
-    ws.onmessage = function (event) {
+    socket.onmessage = function (event) {
         const data = JSON.parse(event.data);
 
-        if (data.type === 'ai_response') {
-            addMessage('AI', data.content, 'ai');
+        if (data.type === 'session') {
+            sessionId = data.session_id;
+            if (reconnecting) {
+                handleReconnected(data.resumed);
+            }
+        } else if (data.type === 'ai_response_delta') {
+            // Show the reply as it streams in
+            streamingText += data.content;
+            if (!streamingMessage) {
+                streamingMessage = addMessage('AI', streamingText, 'ai');
+            } else {
+                streamingMessage.innerHTML = `<strong>AI:</strong> ${streamingText}`;
+                const chatContainer = document.getElementById('chatContainer');
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            }
+        } else if (data.type === 'ai_response') {
+            if (streamingMessage) {
+                streamingMessage.innerHTML = `<strong>AI:</strong> ${data.content}`;
+                streamingMessage = null;
+                streamingText = '';
+            } else {
+                addMessage('AI', data.content, 'ai');
+            }
+            if (data.ttft_ms != null) {
+                console.log(`AI time to first token: ${data.ttft_ms} ms`);
+            }
 
             if (data.speak) {
                 speakText(data.content);
             }
         } else if (data.type === 'webrtc_answer') {
             handleWebRTCAnswer(data.sdp);
+        } else if (data.type === 'live_metrics' || data.type === 'live_report') {
+            // Scores of the camera and microphone streamed over WebRTC
+            handleLiveMessage(data);
+            if (data.type === 'live_report' && webrtcReportDone) {
+                webrtcReportDone();
+            }
+        } else if (data.type === 'webrtc_error') {
+            console.error('WebRTC error:', data.detail);
+            fallBackToLiveScoring();
         }
     };
 
-    ws.onclose = function (event) {
-        addMessage('System', 'Backend disconnected. Session ended.', 'ai');
-        endSession();
+    socket.onclose = function (event) {
+        // endSession() detaches the socket before closing it; anything else is unexpected
+        if (socket !== ws) {
+            return;
+        }
+        if (!sessionId) {
+            addMessage('System', 'Backend disconnected. Session ended.', 'ai');
+            endSession();
+            return;
+        }
+        scheduleReconnect();
     };
 
-    ws.onerror = function (error) {
-        addMessage('System', 'Connection error. Please restart the backend.', 'ai');
-        endSession();
+    socket.onerror = function (error) {
+        // Always followed by onclose, which decides whether to reconnect
+        console.error('WebSocket error:', error);
     };
 }
 
+// Reconnect to the same server-side session, backing off between attempts
+function scheduleReconnect() {
+    if (reconnectAttempts >= RECONNECT_ATTEMPTS) {
+        addMessage('System', 'Backend disconnected. Session ended.', 'ai');
+        endSession();
+        return;
+    }
+    if (reconnectAttempts === 0) {
+        addMessage('System', 'Connection lost. Reconnecting...', 'ai');
+    }
+    const delay = Math.min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** reconnectAttempts) * (0.5 + Math.random() / 2);
+    reconnectAttempts += 1;
+    reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        connectWebSocket();
+    }, delay);
+}
+
+function handleReconnected(resumed) {
+    reconnectAttempts = 0;
+    if (resumed) {
+        addMessage('System', 'Reconnected.', 'ai');
+    } else if (sessionTopic) {
+        // The server expired the conversation while we were away; open it again on the same topic
+        addMessage('System', 'Reconnected. The previous conversation expired, starting it again.', 'ai');
+        ws.send(JSON.stringify({ type: 'start_session', ...sessionTopic }));
+    }
+
+    // The server closes a connection's peer when the connection drops, so media is offered again
+    if (peerConnection) {
+        peerConnection.close();
+        peerConnection = null;
+        initWebRTC();
+    }
+}
+
 // Speech synthesis with auto-restart listening
 function speakText(text) {
     // Stop any ongoing speech
@@ -254,23 +357,21 @@ function startAISession() {
     document.getElementById('sessionActive').style.display = 'block';
 
     // Initialize components
-    connectWebSocket();
+    sessionTopic = { title: title, description: description };
     initSpeechRecognition();
-    setupCamera();
+    const cameraReady = setupCamera();
 
     // Auto-start voice recognition after WebSocket connects
-    if (ws) {
-        ws.onopen = function () {
-            ws.send(JSON.stringify({
-                type: 'start_session',
-                title: title,
-                description: description
-            }));
+    connectWebSocket(function () {
+        ws.send(JSON.stringify({
+            type: 'start_session',
+            title: title,
+            description: description
+        }));
 
-            // Initiate WebRTC
-            initWebRTC();
-        };
-    }
+        // Initiate WebRTC once the camera is up, so its tracks are part of the offer
+        cameraReady.then(initWebRTC);
+    });
 
     // Auto-start listening only
     setTimeout(() => {
@@ -305,15 +406,31 @@ function endSession() {
     // Force stop voice recognition
     stopVoiceRecognition();
 
+    // Ask for the live score report before the camera goes away
+    stopLiveScoring();
+
     // Stop speech synthesis
     if (speechSynthesis.speaking) {
         speechSynthesis.cancel();
     }
 
-    // Close WebSocket
+    // Close WebSocket, releasing the server-side session (after the WebRTC report, if any)
+    if (reconnectTimer) {
+        clearTimeout(reconnectTimer);
+        reconnectTimer = null;
+    }
+    reconnectAttempts = 0;
+    sessionId = null;
+    sessionTopic = null;
     if (ws) {
-        ws.close();
+        const socket = ws;
         ws = null;
+        finishWebRTC(socket).then(() => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify({ type: 'end_session' }));
+            }
+            socket.close();
+        });
     }
 
     // Force stop all media tracks
@@ -347,6 +464,8 @@ function endSession() {
         document.getElementById('sessionSetup').style.display = 'block';
         document.getElementById('sessionActive').style.display = 'none';
         document.getElementById('chatContainer').innerHTML = '';
+        streamingMessage = null;
+        streamingText = '';
         document.getElementById('sessionTitle').value = '';
         document.getElementById('sessionDescription').value = '';
 
@@ -378,7 +497,7 @@ function sendMessage() {
     const input = document.getElementById('messageInput');
     const message = input.value.trim();
 
-    if (message && ws) {
+    if (message && ws && ws.readyState === WebSocket.OPEN) {
         addMessage('You', message, 'user');
         ws.send(JSON.stringify({
             type: 'user_message',
@@ -395,6 +514,7 @@ function addMessage(sender, content, className) {
     messageDiv.innerHTML = `<strong>${sender}:</strong> ${content}`;
     chatContainer.appendChild(messageDiv);
     chatContainer.scrollTop = chatContainer.scrollHeight;
+    return messageDiv;
 }
 
 // Setup camera
@@ -416,7 +536,90 @@ async function setupCamera() {
     }
 }
 
+// Live scoring: stream downscaled camera frames, show rolling metrics
+function startLiveScoring() {
+    if (!localStream || scoreWs) {
+        return;
+    }
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/score`);
+    scoreWs = socket;
+
+    const video = document.createElement('video');
+    video.muted = true;
+    video.srcObject = localStream;
+    video.play().catch(() => { });
+    const canvas = document.createElement('canvas');
+
+    socket.onopen = function () {
+        updateLiveMetrics('📊 Live scoring...');
+        liveTimer = setInterval(() => sendLiveFrame(socket, video, canvas), 1000 / LIVE_FPS);
+    };
+
+    socket.onmessage = function (event) {
+        handleLiveMessage(JSON.parse(event.data));
+    };
+
+    socket.onerror = function (error) {
+        console.log('Live scoring error:', error);
+    };
+}
+
+function handleLiveMessage(data) {
+    if (data.type === 'live_metrics') {
+        updateLiveMetrics(`📊 Attention ${formatScore(data.attention)} · Posture ${formatScore(data.posture)} · ` +
+            `Engagement ${formatScore(data.engagement)} · Eye contact ${formatScore(data.eye_contact_quality)}`);
+    } else if (data.type === 'live_report') {
+        console.log('Live score report:', data);
+        updateLiveMetrics(`📊 Session score: ${formatScore(data.session_analysis.overall_score)}`);
+    }
+}
+
+function sendLiveFrame(socket, video, canvas) {
+    // Skip a tick while earlier frames are still queued on the socket
+    if (socket.readyState !== WebSocket.OPEN || socket.bufferedAmount > 0 || !video.videoWidth) {
+        return;
+    }
+    canvas.width = LIVE_FRAME_WIDTH;
+    canvas.height = Math.round(video.videoHeight * LIVE_FRAME_WIDTH / video.videoWidth);
+    canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
+    canvas.toBlob(blob => {
+        if (blob && socket.readyState === WebSocket.OPEN) {
+            socket.send(blob);
+        }
+    }, 'image/jpeg', 0.7);
+}
+
+function stopLiveScoring() {
+    if (liveTimer) {
+        clearInterval(liveTimer);
+        liveTimer = null;
+    }
+    if (scoreWs) {
+        // The server answers with live_report and closes the socket
+        if (scoreWs.readyState === WebSocket.OPEN) {
+            scoreWs.send(JSON.stringify({ type: 'end' }));
+        }
+        scoreWs = null;
+    }
+}
+
+function formatScore(value) {
+    return value == null ? '–' : Math.round(value);
+}
+
+function updateLiveMetrics(text) {
+    const metricsDiv = document.getElementById('liveMetrics');
+    if (metricsDiv) {
+        metricsDiv.textContent = text;
+    }
+}
+
 async function initWebRTC() {
+    if (!localStream) {
+        return;
+    }
     try {
         console.log("Initializing WebRTC...");
         const configuration = {
@@ -424,38 +627,83 @@ async function initWebRTC() {
         };
         peerConnection = new RTCPeerConnection(configuration);
 
-        // Add local tracks to connection
-        if (localStream) {
-            localStream.getTracks().forEach(track => {
-                peerConnection.addTrack(track, localStream);
-            });
-        }
+        // Camera and microphone are scored by the server as they arrive
+        localStream.getTracks().forEach(track => {
+            peerConnection.addTrack(track, localStream);
+        });
 
-        // Handle ICE candidates
-        peerConnection.onicecandidate = function (event) {
-            if (event.candidate) {
-                // In a real app, send candidate to server
-                // ws.send(JSON.stringify({type: 'ice_candidate', candidate: event.candidate}));
+        peerConnection.onconnectionstatechange = function () {
+            if (peerConnection && peerConnection.connectionState === 'failed') {
+                console.error('WebRTC connection failed');
+                fallBackToLiveScoring();
             }
         };
 
         // Create Offer
         const offer = await peerConnection.createOffer();
         await peerConnection.setLocalDescription(offer);
+        await iceGatheringComplete(peerConnection);
 
-        // Send offer to server
-        if (ws) {
+        // Send offer (with the gathered candidates) to server
+        if (ws && ws.readyState === WebSocket.OPEN) {
             ws.send(JSON.stringify({
                 type: 'webrtc_offer',
-                sdp: offer.sdp
+                sdp: peerConnection.localDescription.sdp
             }));
         }
 
     } catch (e) {
         console.error("WebRTC Init Error:", e);
+        fallBackToLiveScoring();
     }
 }
 
+function iceGatheringComplete(pc) {
+    return new Promise(resolve => {
+        if (pc.iceGatheringState === 'complete') {
+            resolve();
+            return;
+        }
+        const timer = setTimeout(resolve, ICE_GATHERING_TIMEOUT_MS);
+        pc.addEventListener('icegatheringstatechange', () => {
+            if (pc.iceGatheringState === 'complete') {
+                clearTimeout(timer);
+                resolve();
+            }
+        });
+    });
+}
+
+// Without a working peer connection, score JPEG snapshots over /ws/score instead
+function fallBackToLiveScoring() {
+    if (peerConnection) {
+        peerConnection.close();
+        peerConnection = null;
+    }
+    startLiveScoring();
+}
+
+// Ask the server for the report of the streamed media, then close the peer connection
+function finishWebRTC(socket) {
+    const pc = peerConnection;
+    peerConnection = null;
+    if (!pc) {
+        return Promise.resolve();
+    }
+    return new Promise(resolve => {
+        if (socket.readyState !== WebSocket.OPEN || pc.connectionState !== 'connected') {
+            resolve();
+            return;
+        }
+        webrtcReportDone = resolve;
+        setTimeout(resolve, WEBRTC_REPORT_TIMEOUT_MS);
+        socket.send(JSON.stringify({ type: 'webrtc_end' }));
+    }).then(() => {
+        webrtcReportDone = null;
+        pc.close();
+    });
+}
+
 async function handleWebRTCAnswer(sdp) {
     if (peerConnection) {
         try {
@@ -466,6 +714,7 @@ async function handleWebRTCAnswer(sdp) {
             console.log("WebRTC Answer processed");
         } catch (e) {
             console.error("Error setting remote description:", e);
+            fallBackToLiveScoring();
         }
     }
 }
@@ -494,6 +743,8 @@ window.addEventListener('beforeunload', function (e) {
         recognition.abort();
     }
     if (ws) {
-        ws.close();
+        const socket = ws;
+        ws = null; // Leaving the page is not a connection loss to recover from
+        socket.close();
     }
 });
\ No newline at end of file
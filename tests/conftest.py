@@ -0,0 +1,38 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+# Run from a checkout without installing; no real API keys or GPU are needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("SCORER_DEVICE", "cpu")
+
+
+@pytest.fixture(scope="module")
+def serve_app():
+    """Runs ASGI apps with uvicorn on free local ports for the module; call it with an app to get its URL"""
+    import uvicorn
+
+    servers = []
+
+    def serve(app) -> str:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        deadline = time.monotonic() + 10
+        while not server.started and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{port}"
+
+    yield serve
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(timeout=5)
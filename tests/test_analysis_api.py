@@ -0,0 +1,47 @@
+"""Upload analysis endpoints answered from the result cache"""
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.result_cache import ResultCache
+
+UPLOAD = b"not really a video, but only its hash matters for a cache hit"
+
+
+@pytest.fixture
+def cached_result(tmp_path, monkeypatch):
+    cache = ResultCache(path=str(tmp_path / "results.sqlite3"))
+    monkeypatch.setattr(main, "result_cache", cache)
+    result = {
+        "session_analysis": {"overall_score": 80.0},
+        "analysis_profile": {"name": "balanced", "elapsed_s": 42.0},
+        "timing": {"total_s": 42.0, "stages": {"pose_inference": 30.0}, "counters": {"frames_sampled": 120}},
+    }
+    cache.put(ResultCache.key(hashlib.sha256(UPLOAD).hexdigest(), "video/mp4", profile="balanced"), result)
+    return result
+
+
+def analyze(**params):
+    return TestClient(main.app).post("/analyze-session", params={"profile": "balanced", **params},
+                                     files={"video": ("talk.mp4", UPLOAD, "video/mp4")})
+
+
+def test_cache_hit_reports_its_own_timing(cached_result):
+    response = analyze(timing=True)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["cache_hit"] is True
+    assert report["session_analysis"] == cached_result["session_analysis"]
+    assert report["analysis_profile"] == {"name": "balanced"}
+    assert report["timing"]["cache_hit"] is True
+    assert report["timing"]["total_s"] < cached_result["timing"]["total_s"]
+    assert set(report["timing"]) == {"cache_hit", "total_s"}
+
+
+def test_synchronous_analysis_keeps_no_job(cached_result):
+    jobs = len(main.job_manager.jobs)
+    assert analyze().status_code == 200
+    # The result went back in the response, so nothing is kept for polling
+    assert len(main.job_manager.jobs) == jobs
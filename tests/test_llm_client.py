@@ -0,0 +1,89 @@
+"""LLMClient retries and fair queuing against benchmarks.mock_llm"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from groq import AsyncGroq, RateLimitError
+
+from benchmarks.mock_llm import REPLY, create_app
+from app import llm_client
+from app.llm_client import FairLimiter, LLMClient
+
+RETRY_AFTER_S = 0.3
+
+
+def client(url: str, **kwargs) -> LLMClient:
+    return LLMClient(AsyncGroq(api_key="test", base_url=url, max_retries=0), **kwargs)
+
+
+async def reply(llm: LLMClient, model: str = "mock") -> str:
+    return "".join([delta async for delta in llm.stream_chat([{"role": "user", "content": "Hi"}], model)])
+
+
+def stats(url: str) -> dict:
+    return httpx.get(f"{url}/stats").json()
+
+
+def test_rate_limited_request_is_retried_after_retry_after(serve_app):
+    url = serve_app(create_app(latency_ms=10, jitter_ms=0, token_ms=0, retry_after_s=RETRY_AFTER_S,
+                               rate_limit_first=1))
+    retries = llm_client.LLM_RETRIES.value(model="retry-after", reason="rate_limited")
+
+    started = time.perf_counter()
+    text = asyncio.run(reply(client(url, max_retries=2), model="retry-after"))
+
+    assert text == REPLY
+    assert time.perf_counter() - started >= RETRY_AFTER_S
+    assert stats(url) == {"requests": 2, "rate_limited": 1, "slow": 0}
+    assert llm_client.LLM_RETRIES.value(model="retry-after", reason="rate_limited") == retries + 1
+
+
+def test_gives_up_after_max_retries(serve_app, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_MAX_S", 0.05)  # Caps the Retry-After wait too
+    url = serve_app(create_app(latency_ms=10, jitter_ms=0, rate_limit_ratio=1.0))
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(reply(client(url, max_retries=llm_client.LLM_MAX_RETRIES), model="give-up"))
+
+    assert stats(url)["requests"] == llm_client.LLM_MAX_RETRIES + 1
+    assert llm_client.LLM_REQUESTS.value(model="give-up", status="error") == 1
+
+
+def test_limiter_serves_waiters_in_arrival_order(serve_app):
+    url = serve_app(create_app(latency_ms=20, jitter_ms=0, token_ms=0))
+    llm = client(url, max_concurrency=1)
+    served = []
+
+    async def request(i: int):
+        async for _ in llm.stream_chat([{"role": "user", "content": "Hi"}], "fifo"):
+            served.append(i)
+            break
+
+    async def contend():
+        tasks = []
+        for i in range(6):
+            tasks.append(asyncio.create_task(request(i)))
+            await asyncio.sleep(0)  # Each request reaches the limiter before the next is created
+        assert llm.limiter.active == 1 and llm.limiter.waiting == 5
+        tasks[3].cancel()  # A waiter that gives up must not disturb the others' order
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(contend())
+    assert served == [0, 1, 2, 4, 5]
+    assert llm.limiter.active == 0 and llm.limiter.waiting == 0
+
+
+def test_limiter_hands_slots_over_before_new_arrivals():
+    async def scenario():
+        limiter = FairLimiter(1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        # The slot now belongs to the queued waiter, not to whoever asks next
+        assert not limiter.try_acquire()
+        await waiter
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
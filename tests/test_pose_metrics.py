@@ -0,0 +1,26 @@
+"""Pose metrics across analysis profiles (stub pose model)"""
+import numpy as np
+
+from benchmarks.stubs import StubPoseModel
+from app.analysis import keypoint_metrics, sharding
+from app.analysis.profiles import PROFILES
+
+
+def profile_metrics(imgsz: int):
+    # The stub places its person by frame content; flat frames look the same at any size
+    model = StubPoseModel(absent_ratio=0.0, multi_ratio=0.0)
+    frames = [np.full((imgsz, imgsz, 3), 10 * i, dtype=np.uint8) for i in range(8)]
+    batch = sharding.infer_pose_batch(model, "cpu", frames, imgsz)
+    columns, _ = keypoint_metrics.compute_frame_metrics(batch, full=True)
+    return columns
+
+
+def test_same_frames_score_alike_under_every_profile():
+    reference = profile_metrics(PROFILES["balanced"]["imgsz"])
+    assert reference["movement_stability"][1:].max() < 100  # The stub person moves, so the check has teeth
+    for name, settings in PROFILES.items():
+        columns = profile_metrics(settings["imgsz"])
+        for metric, values in reference.items():
+            # Keypoints are float32 pixels and yaw/pitch/roll are rounded to 0.01 degrees
+            np.testing.assert_allclose(columns[metric], values, atol=0.05, err_msg=f"{name}: {metric}")
+
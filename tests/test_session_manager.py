@@ -0,0 +1,121 @@
+"""Streamed conversation replies against benchmarks.mock_llm, a local OpenAI/Groq-compatible server"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from groq import AsyncGroq
+
+from benchmarks.mock_llm import REPLY, create_app
+from app import main
+from app.llm_backends import GroqBackend, LLMRouter
+from app.llm_client import LLMClient
+from app.response_cache import ResponseCache
+from app.session_manager import AISessionManager
+from app.session_registry import SessionRegistry
+
+LATENCY_MS = 50
+
+
+@pytest.fixture(scope="module")
+def mock_llm_url(serve_app):
+    return serve_app(create_app(latency_ms=LATENCY_MS, jitter_ms=0, token_ms=1))
+
+
+def session_manager(url: str) -> AISessionManager:
+    # A fresh client per test: its connection pool belongs to the event loop that first uses it
+    client = LLMClient(AsyncGroq(api_key="test", base_url=url, max_retries=0))
+    return AISessionManager(client=LLMRouter({"groq": GroqBackend(client=client)}),
+                            greetings=ResponseCache(max_items=0))
+
+
+def test_websocket_streams_deltas_then_final_reply(mock_llm_url, monkeypatch):
+    monkeypatch.setattr(main.session_registry, "factory", lambda: session_manager(mock_llm_url))
+    with TestClient(main.app).websocket_connect("/ws") as ws:
+        assert ws.receive_json()["type"] == "session"
+        ws.send_text(json.dumps({"type": "start_session", "title": "Chess openings", "description": ""}))
+
+        deltas = []
+        while True:
+            frame = ws.receive_json()
+            if frame["type"] != "ai_response_delta":
+                break
+            deltas.append(frame["content"])
+
+    assert len(deltas) > 1
+    assert frame["type"] == "ai_response"
+    assert frame["final"] is True and frame["speak"] is True
+    assert frame["content"] == "".join(deltas) == REPLY
+    assert frame["ttft_ms"] >= LATENCY_MS
+
+
+def test_history_is_updated_only_after_the_reply_completes(mock_llm_url):
+    async def scenario():
+        manager = session_manager(mock_llm_url)
+        await manager.start_session("Chess openings", "")
+        assert manager.memory.messages() == [{"role": "assistant", "content": REPLY}]
+
+        # Stop reading after the first delta, as when the client disconnects mid-reply
+        stream = manager.process_user_input_stream("Which opening should I learn first?")
+        first = await stream.__anext__()
+        await stream.aclose()
+        assert first and first != REPLY
+        assert len(manager.memory) == 1
+
+        reply = await manager.process_user_input("Which opening should I learn first?")
+        assert reply == REPLY
+        assert manager.memory.messages()[-2:] == [
+            {"role": "user", "content": "Which opening should I learn first?"},
+            {"role": "assistant", "content": REPLY},
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_time_to_first_token_is_recorded(mock_llm_url):
+    async def scenario():
+        manager = session_manager(mock_llm_url)
+        assert manager.last_ttft_ms is None
+        await manager.start_session("Chess openings", "Learning the Sicilian")
+        greeting_ttft = manager.last_ttft_ms
+        await manager.process_user_input("Why is it popular?")
+        return greeting_ttft, manager.last_ttft_ms
+
+    greeting_ttft, turn_ttft = asyncio.run(scenario())
+    assert greeting_ttft >= LATENCY_MS
+    assert turn_ttft >= LATENCY_MS
+
+
+def test_end_session_closes_the_socket(mock_llm_url, monkeypatch):
+    monkeypatch.setattr(main.session_registry, "factory", lambda: session_manager(mock_llm_url))
+    with TestClient(main.app).websocket_connect("/ws") as ws:
+        session_id = ws.receive_json()["session_id"]
+        ws.send_text(json.dumps({"type": "end_session"}))
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+    assert session_id not in main.session_registry.sessions
+
+
+def test_registry_keeps_a_running_memory_total(mock_llm_url):
+    async def scenario():
+        registry = SessionRegistry(factory=lambda: session_manager(mock_llm_url))
+        first, manager, _ = registry.acquire()
+        second, other, _ = registry.acquire()
+        await manager.start_session("Chess openings", "")
+        await other.start_session("Sourdough baking", "")
+        registry.touch(first)
+        registry.touch(second)
+        assert registry.memory_bytes() == sum(entry["manager"].memory_bytes() for entry in registry.sessions.values())
+
+        # Over the cap the detached session goes first, taking its share of the total with it
+        registry.release(second)
+        registry.max_sessions = 1
+        registry.sweep()
+        assert list(registry.sessions) == [first]
+        assert registry.memory_bytes() == manager.memory_bytes()
+
+        registry.remove(first)
+        assert registry.memory_bytes() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+"""Sharded video analysis against the serial path (stub pose and Whisper models)"""
+import pytest
+
+from benchmarks import synthetic
+from benchmarks.stubs import install_stub_models
+from app.analysis import sharding, video_scorer
+
+install_stub_models()
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    # 24 s at 3 analyzed fps is enough batches for plan_shards to split in two
+    return synthetic.write_video(str(tmp_path_factory.mktemp("video") / "talk.mp4"), 24, 320, 240, 10.0)
+
+
+def without_timing(report):
+    report.pop("timing")
+    report["analysis_profile"].pop("elapsed_s")
+    return report
+
+
+def test_sharded_report_matches_serial(video_path):
+    # Shards run in spawned worker processes, which install the stubs from their pool initializer
+    assert len(sharding.plan_shards(video_path, 2, video_scorer.BATCH_SIZE)) == 2
+    scorer = video_scorer.SessionScorer()
+    serial = scorer.analyze_video_file(video_path, "video/mp4", shards=1)
+    sharded = scorer.analyze_video_file(video_path, "video/mp4", shards=2)
+    assert without_timing(sharded) == without_timing(serial)
+
+
+def test_adaptive_sampling_runs_serially(video_path, monkeypatch):
+    monkeypatch.setattr(video_scorer, "ADAPTIVE_SAMPLING", True)
+    monkeypatch.setattr(sharding, "submit_shards", lambda *args, **kwargs: pytest.fail("sharded with adaptive sampling"))
+    report = video_scorer.SessionScorer().analyze_video_file(video_path, "video/mp4", shards=2)
+    assert "frames_skipped_adaptive" in report["timing"]["counters"]
@@ -0,0 +1,135 @@
+"""WebRTC ingestion against a local aiortc peer standing in for the browser (stub pose and Whisper models)"""
+import asyncio
+import time
+from fractions import Fraction
+
+import av
+import numpy as np
+import pytest
+from aiortc import MediaStreamTrack, RTCConfiguration, RTCPeerConnection, RTCSessionDescription
+
+from benchmarks import synthetic
+from benchmarks.stubs import install_stub_models
+from app import live_scoring
+from app.analysis.audio import SAMPLE_RATE
+from app.webrtc_handler import InvalidSignal, WebRTCHandler
+
+install_stub_models()
+
+
+class CameraTrack(MediaStreamTrack):
+    kind = "video"
+
+    def __init__(self, fps: int = 30):
+        super().__init__()
+        self.fps = fps
+        self.frames = synthetic.synthetic_frames(30, 320, 240, fps)
+        self.pts = 0
+
+    async def recv(self):
+        await asyncio.sleep(1 / self.fps)
+        frame = av.VideoFrame.from_ndarray(next(self.frames), format="bgr24")
+        frame.pts, frame.time_base = self.pts, Fraction(1, 90000)
+        self.pts += 90000 // self.fps
+        return frame
+
+
+class MicrophoneTrack(MediaStreamTrack):
+    kind = "audio"
+    rate = 48000
+    samples_per_frame = 960  # 20 ms
+
+    def __init__(self):
+        super().__init__()
+        self.audio = (synthetic.synthetic_audio(30, self.rate) * 32767).astype(np.int16)
+        self.position = 0
+
+    async def recv(self):
+        await asyncio.sleep(self.samples_per_frame / self.rate)
+        chunk = self.audio[self.position:self.position + self.samples_per_frame]
+        if len(chunk) < self.samples_per_frame:
+            chunk = np.zeros(self.samples_per_frame, np.int16)
+        frame = av.AudioFrame.from_ndarray(chunk.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate, frame.pts, frame.time_base = self.rate, self.position, Fraction(1, self.rate)
+        self.position += self.samples_per_frame
+        return frame
+
+
+async def offer(*tracks) -> RTCPeerConnection:
+    pc = RTCPeerConnection(RTCConfiguration(iceServers=[]))
+    for track in tracks:
+        pc.addTrack(track)
+    await pc.setLocalDescription(await pc.createOffer())
+    return pc
+
+
+def test_loopback_peer_is_scored_live_and_reported():
+    async def scenario():
+        handler = WebRTCHandler()
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        browser = await offer(CameraTrack(), MicrophoneTrack())
+        try:
+            answer = await handler.handle_offer("conn", browser.localDescription.sdp, send, "fast")
+            await browser.setRemoteDescription(RTCSessionDescription(sdp=answer, type="answer"))
+
+            deadline = time.monotonic() + 20
+            while not messages and time.monotonic() < deadline:
+                await asyncio.sleep(0.2)
+            assert messages and messages[0]["type"] == "live_metrics"
+
+            report = await handler.finish_connection("conn")
+        finally:
+            await browser.close()
+        assert not handler.peer_connections
+        return report
+
+    report = asyncio.run(scenario())
+    assert report["type"] == "live_report"
+    assert report["live"]["frames_analyzed"] > 0
+    assert report["live"]["audio_s"] > 0
+    assert "audio_transcription" in report
+
+
+@pytest.mark.parametrize("sdp", ["", "not sdp", "v=0\r\nm=garbage\r\n", None, {"sdp": "v=0"}])
+def test_malformed_offer_is_rejected_without_a_peer(sdp):
+    async def scenario():
+        handler = WebRTCHandler()
+        with pytest.raises(InvalidSignal):
+            await handler.handle_offer("conn", sdp)
+        assert not handler.peer_connections
+
+    asyncio.run(scenario())
+
+
+def test_malformed_ice_candidate_is_rejected():
+    async def scenario():
+        handler = WebRTCHandler()
+        browser = await offer(CameraTrack())
+        try:
+            await handler.handle_offer("conn", browser.localDescription.sdp)
+            for candidate in ({"candidate": "garbage"}, {"candidate": "candidate:1"}, {"candidate": 5}, "candidate"):
+                with pytest.raises(InvalidSignal):
+                    await handler.handle_ice_candidate("conn", candidate)
+            # The end-of-candidates marker and unknown connections are ignored
+            assert await handler.handle_ice_candidate("conn", {"candidate": ""}) is False
+            assert await handler.handle_ice_candidate("other", {"candidate": "candidate:1"}) is False
+            assert "conn" in handler.peer_connections
+        finally:
+            await handler.close_all()
+            await browser.close()
+
+    asyncio.run(scenario())
+
+
+def test_microphone_audio_is_capped(monkeypatch):
+    monkeypatch.setattr(live_scoring, "LIVE_MAX_AUDIO_S", 1.0)
+    live = live_scoring.LiveScoringSession("fast")
+    chunk = np.ones(SAMPLE_RATE // 4, np.int16)
+    for _ in range(6):
+        live.add_audio(chunk)
+    assert live.audio_samples == SAMPLE_RATE
+    assert live.audio_samples_dropped == SAMPLE_RATE // 2